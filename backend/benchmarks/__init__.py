@@ -0,0 +1,4 @@
+"""
+Benchmark and load-test scripts for the Workshop API
+Run them from the backend folder, e.g. `python -m benchmarks.load_test`
+"""
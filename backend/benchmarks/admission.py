@@ -0,0 +1,149 @@
+"""
+Admission control benchmark: goodput beyond saturation
+
+Open-loop Poisson arrivals (independent of response times, like real
+clients) of a read/write mix against the app in process, on a temporary copy
+of users.db, at increasing offered rates, with admission control off and on.
+
+Goodput counts the successful (2xx) responses that completed within the
+latency objective (--slo-ms), per second: answers that come too late are
+as useless to the client as errors. Without admission control every arrival
+is accepted, so past saturation the backlog (coroutines, sessions, waits for
+the SQLite write lock) grows and latency with it until almost nothing meets
+the objective. With it, the excess is rejected at once (429/503 with
+Retry-After) and the admitted requests keep meeting it.
+
+Usage (from the backend folder):
+    python -m benchmarks.admission --mode LOW_LATENCY --rates 100 200 400 800 --duration 5
+"""
+import argparse
+import asyncio
+import gc
+import random
+import time
+import uuid
+
+from benchmarks.load_test import percentile
+from config import LatencyMode, settings
+
+
+class Step:
+    """Outcomes of one offered rate"""
+
+    def __init__(self):
+        self.good: list[float] = []      # Successful within the objective
+        self.late = 0                    # Successful but over the objective
+        self.rejected = 0                # 429 / 503 from admission control
+        self.errors = 0                  # Other 5xx and timeouts
+        self.rejection_latency: list[float] = []
+        self.outstanding = 0
+        self.max_outstanding = 0
+
+
+async def issue(client, step: Step, write_share: float, slo: float, timeout: float, scheduled: float):
+    """Send one read or write; latency counts from the scheduled arrival"""
+    step.outstanding += 1
+    step.max_outstanding = max(step.max_outstanding, step.outstanding)
+    try:
+        if random.random() < write_share:
+            token = uuid.uuid4().hex[:12]
+            request = client.post("/users", json={
+                "name": f"Admission {token}", "email": f"admission.{token}@bench.example", "role": "Bench"
+            })
+        else:
+            request = client.get(f"/users/{random.randint(1, 5000)}")
+        response = await asyncio.wait_for(request, timeout)
+        status_code = response.status_code
+    except Exception:  # Timeout, or an unhandled app error ("database is locked")
+        status_code = 599
+    finally:
+        step.outstanding -= 1
+    elapsed = time.perf_counter() - scheduled
+    if status_code in (429, 503):
+        step.rejected += 1
+        step.rejection_latency.append(elapsed)
+    elif status_code >= 500:
+        step.errors += 1
+    elif elapsed <= slo:  # 200/201, and 404 for IDs that do not exist (answered reads)
+        step.good.append(elapsed)
+    else:
+        step.late += 1
+
+
+async def offered_load(client, rate: float, duration: float, args) -> Step:
+    """Poisson arrivals at `rate` per second for `duration` seconds, then wait for every answer"""
+    step = Step()
+    tasks: set[asyncio.Task] = set()
+    scheduled = time.perf_counter()
+    deadline = scheduled + duration
+    while True:
+        scheduled += random.expovariate(rate)
+        if scheduled >= deadline:
+            break
+        wait = scheduled - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        task = asyncio.create_task(issue(client, step, args.write_share, args.slo_ms / 1000,
+                                         args.timeout, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return step
+
+
+async def main_async(args):
+    from benchmarks.harness import in_process_client
+
+    async with in_process_client(timeout=args.timeout) as client:
+        from utils.admission import admission
+
+        await client.post("/latency", json={"mode": args.mode})
+        limits = ", ".join(f"{name} {stats['limit']}" for name, stats in admission.stats()["classes"].items())
+        print(f"🚀 {args.mode}, {args.write_share:.0%} writes, objective {args.slo_ms:g} ms, "
+              f"{args.duration:g} s per rate")
+        print(f"   In flight: {limits}; queue budget {admission.queue_budget * 1000:g} ms")
+        print(f"\n{'offered/s':>10}{'admission':>11}{'goodput/s':>11}{'p99 ms':>9}{'late':>7}"
+              f"{'rejected':>10}{'reject ms':>11}{'errors':>8}{'max open':>10}")
+        for rate in args.rates:
+            for enabled in (False, True):
+                admission.enabled = enabled
+                step = await offered_load(client, rate, args.duration, args)
+                rejection_ms = percentile(step.rejection_latency, 50) * 1000 if step.rejection_latency else 0.0
+                print(f"{rate:>10g}{'on' if enabled else 'off':>11}{len(step.good) / args.duration:>11.0f}"
+                      f"{percentile(step.good, 99) * 1000 if step.good else 0.0:>9.0f}{step.late:>7}"
+                      f"{step.rejected:>10}{rejection_ms:>11.1f}{step.errors:>8}{step.max_outstanding:>10}")
+                # Let the server drain (aiosqlite threads, garbage of the previous step) before the next step
+                gc.collect()
+                await asyncio.sleep(2)
+        admission.enabled = settings.ADMISSION_CONTROL
+        await client.post("/latency/reset")
+        print("\ngoodput: 2xx (and 404) answers within the objective; late: answered after it; "
+              "reject ms: median time to a 429/503")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control goodput benchmark")
+    parser.add_argument("--mode", choices=[mode.value for mode in LatencyMode], default="LOW_LATENCY",
+                        help="Latency mode during the run")
+    parser.add_argument("--rates", type=float, nargs="+", default=[100, 200, 400, 800], help="Offered requests/s")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per offered rate")
+    parser.add_argument("--write-share", type=float, default=0.5, help="Share of POST /users (rest: GET /users/{id})")
+    parser.add_argument("--slo-ms", type=float, default=1000, help="Latency objective of a useful answer")
+    parser.add_argument("--timeout", type=float, default=10, help="Client timeout in seconds")
+    parser.add_argument("--max-reads", type=int, default=settings.ADMISSION_MAX_IN_FLIGHT["read"])
+    parser.add_argument("--max-writes", type=int, default=settings.ADMISSION_MAX_IN_FLIGHT["write"])
+    parser.add_argument("--queue-budget-ms", type=float, default=settings.ADMISSION_QUEUE_BUDGET * 1000,
+                        help="Longest wait for a slot")
+    args = parser.parse_args()
+    # Must be set before utils/admission.py is imported (the controller is created at import)
+    settings.ADMISSION_MAX_IN_FLIGHT = {**settings.ADMISSION_MAX_IN_FLIGHT,
+                                        "read": args.max_reads, "write": args.max_writes}
+    settings.ADMISSION_QUEUE_BUDGET = args.queue_budget_ms / 1000
+    settings.LOG_LEVEL = "WARNING"  # One log line per created user would compete for the CPU
+    random.seed(0)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Batch read benchmark: one request per user card vs one batch lookup
+
+Runs the app in process, on a temporary copy of users.db, under a latency
+mode (LOW_LATENCY by default: 100 ms per read). Creates enough users, then
+fetches pages of N random existing IDs (plus one missing ID) with:
+- sequential GET /users/{id}: one card after the other
+- concurrent GET /users/{id}: all the cards of the page at once
+- POST /users/batch-get: one request with every ID
+- GET /users?ids=...: the same lookup as a (cacheable) GET
+
+Every path runs with cold caches (user_row_cache cleared), then warm.
+Reports ms per page, HTTP requests and SQL statements per page.
+
+Usage (from the backend folder):
+    python -m benchmarks.batch_get --pages 20 50 200
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from sqlalchemy import event
+
+from config import LatencyMode, settings
+
+
+async def main_async(args):
+    from benchmarks.harness import in_process_client
+
+    async with in_process_client(timeout=120) as client:
+        from database import engine
+        from utils.cache import user_list_cache, user_row_cache
+
+        statements: list[str] = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record_statement(conn, cursor, statement, *_):
+            statements.append(statement)
+
+        needed = max(args.pages)
+        ids = (await client.get("/users", params={"fields": "id"})).json()
+        if len(ids) < needed:
+            run = uuid.uuid4().hex[:8]
+            await client.post("/users/bulk", json=[
+                {"name": f"Card {index}", "email": f"card.{run}.{index}@bench.example", "role": "Bench"}
+                for index in range(needed - len(ids))
+            ])
+            ids = (await client.get("/users", params={"fields": "id"})).json()
+        existing = [user["id"] for user in ids]
+        missing_id = max(existing) + 1_000_000
+
+        async def sequential(page):
+            for user_id in page:
+                await client.get(f"/users/{user_id}")
+            return len(page)
+
+        async def concurrent(page):
+            await asyncio.gather(*(client.get(f"/users/{user_id}") for user_id in page))
+            return len(page)
+
+        async def batch_post(page):
+            response = await client.post("/users/batch-get", json={"ids": page})
+            assert response.json()["missing"] == [missing_id]
+            return 1
+
+        async def batch_get(page):
+            response = await client.get("/users", params={"ids": ",".join(map(str, page))})
+            assert response.json()["missing"] == [missing_id]
+            return 1
+
+        paths = [
+            ("GET /users/{id} x N, sequential", sequential),
+            ("GET /users/{id} x N, concurrent", concurrent),
+            ("POST /users/batch-get", batch_post),
+            ("GET /users?ids=...", batch_get),
+        ]
+
+        await client.post("/latency", json={"mode": args.mode})
+        print(f"🚀 {args.mode}: pages of N random users + 1 missing ID")
+        print(f"\n{'N':>5}  {'path':<34}{'cache':>6}{'ms':>9}{'requests':>10}{'statements':>12}")
+        for size in args.pages:
+            page = random.sample(existing, size) + [missing_id]
+            for label, path in paths:
+                user_row_cache.clear()
+                user_list_cache.clear()
+                for cache in ("cold", "warm"):
+                    if cache == "warm" and path is batch_get:
+                        user_list_cache.clear()  # The row cache only, not the cached response body
+                    statements.clear()
+                    start = time.perf_counter()
+                    requests = await path(page)
+                    elapsed = time.perf_counter() - start
+                    print(f"{size:>5}  {label:<34}{cache:>6}{elapsed * 1000:>9.1f}{requests:>10}{len(statements):>12}")
+            print()
+        await client.post("/latency/reset")
+        print("statements: SQL statements executed for the page (every read also pays the simulated delay)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch read benchmark")
+    parser.add_argument("--mode", choices=[mode.value for mode in LatencyMode], default="LOW_LATENCY",
+                        help="Latency mode during the run")
+    parser.add_argument("--pages", type=int, nargs="+", default=[20, 50, 200], help="Users per page")
+    args = parser.parse_args()
+    if max(args.pages) + 1 > settings.BATCH_GET_MAX_IDS:
+        parser.error(f"pages are limited to {settings.BATCH_GET_MAX_IDS - 1} users (BATCH_GET_MAX_IDS)")
+    settings.LOG_LEVEL = "WARNING"  # One log line per request would dominate the sequential path
+    random.seed(0)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Change feed fan-out benchmark
+
+Connects many idle in-process subscribers to a ChangeFeed, publishes events
+and measures publish cost and delivery latency (publish → every subscriber
+has received the event). Subscribers at the same position share the same
+encoded bytes, so the cost per event grows with the number of subscribers
+(one wakeup each) but not with subscribers × payload size.
+
+Usage (from the backend folder):
+    python -m benchmarks.change_feed --subscribers 100 1000 5000 --events 200
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.load_test import percentile
+from utils.changes import ChangeFeed
+
+
+async def run(subscribers: int, events: int, payload_bytes: int) -> dict:
+    """Publish `events` one at a time to `subscribers` and time the deliveries"""
+    feed = ChangeFeed(max_events=10_000, heartbeat=60)
+    received = [0] * subscribers
+    all_received = asyncio.Event()
+    target = 0
+    done = 0
+    # Distinct bytes objects delivered for the current event (1 = shared by everyone)
+    chunk_ids: set[int] = set()
+    max_distinct_chunks = 0
+
+    async def consume(index: int):
+        nonlocal done
+        async for chunk in feed.subscribe(None):
+            if chunk.startswith(b"id:"):
+                chunk_ids.add(id(chunk))
+                received[index] += chunk.count(b"\nevent:")
+                if received[index] == target:
+                    done += 1
+                    if done == subscribers:
+                        all_received.set()
+
+    tasks = [asyncio.create_task(consume(index)) for index in range(subscribers)]
+    await asyncio.sleep(0.1)
+
+    padding = "x" * payload_bytes
+    publish_times: list[float] = []
+    delivery_times: list[float] = []
+    for event_number in range(events):
+        target += 1
+        done = 0
+        all_received.clear()
+        start = time.perf_counter()
+        feed.publish([(event_number + 1, "updated", {"id": event_number, "name": padding})])
+        publish_times.append(time.perf_counter() - start)
+        await all_received.wait()
+        delivery_times.append(time.perf_counter() - start)
+        max_distinct_chunks = max(max_distinct_chunks, len(chunk_ids))
+        chunk_ids.clear()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "subscribers": subscribers,
+        "publish_us": percentile(publish_times, 50) * 1e6,
+        "delivery_p50_ms": percentile(delivery_times, 50) * 1000,
+        "delivery_p99_ms": percentile(delivery_times, 99) * 1000,
+        "per_subscriber_us": percentile(delivery_times, 50) / subscribers * 1e6,
+        "distinct_chunks": max_distinct_chunks,
+    }
+
+
+async def main_async(subscriber_counts: list[int], events: int, payload_bytes: int):
+    """Run every subscriber count and print a table"""
+    print(f"🚀 {events} events of ~{payload_bytes} bytes per run")
+    print(f"{'subscribers':>12}{'publish µs':>12}{'p50 ms':>9}{'p99 ms':>9}{'µs/sub':>9}{'chunks':>9}")
+    for subscribers in subscriber_counts:
+        result = await run(subscribers, events, payload_bytes)
+        print(
+            f"{result['subscribers']:>12}{result['publish_us']:>12.1f}"
+            f"{result['delivery_p50_ms']:>9.2f}{result['delivery_p99_ms']:>9.2f}"
+            f"{result['per_subscriber_us']:>9.2f}{result['distinct_chunks']:>9}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change feed fan-out benchmark")
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[100, 1000, 5000], help="Subscriber counts")
+    parser.add_argument("--events", type=int, default=200, help="Events published per run")
+    parser.add_argument("--payload-bytes", type=int, default=1000, help="Approximate payload size")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.subscribers, args.events, args.payload_bytes))
+
+
+if __name__ == "__main__":
+    main()
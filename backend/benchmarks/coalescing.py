@@ -0,0 +1,83 @@
+"""
+Request coalescing benchmark (single-flight reads)
+
+Sends bursts of identical concurrent GET /users and GET /users/{id} requests
+to the app in process (on a temporary copy of users.db filled with extra
+users), with coalescing disabled and enabled. The read caches are cleared
+before every burst, as after a write, so each burst starts cold.
+
+Usage (from the backend folder):
+    python -m benchmarks.coalescing --burst 100 --bursts 20 --users 10000 --page 1000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event
+
+from benchmarks.harness import in_process_client
+
+
+async def burst(client, path: str, params: dict, size: int) -> float:
+    """Send `size` identical requests at once and return the wall time"""
+    start = time.perf_counter()
+    responses = await asyncio.gather(*(client.get(path, params=params) for _ in range(size)))
+    elapsed = time.perf_counter() - start
+    if any(response.status_code != 200 for response in responses):
+        raise RuntimeError(f"{path}: unexpected status {responses[0].status_code}")
+    return elapsed
+
+
+async def main_async(args):
+    async with in_process_client(timeout=60) as client:
+        from database import engine
+        from utils.cache import user_list_cache, user_row_cache
+        from utils.coalesce import user_flight, user_list_flight
+
+        statements = 0
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count_statement(*_):
+            nonlocal statements
+            statements += 1
+
+        for start in range(0, args.users, 5000):
+            rows = [{"name": f"Bench User {index}", "email": f"coalesce{index}@bench.example", "role": "Bench"}
+                    for index in range(start, min(start + 5000, args.users))]
+            await client.post("/users/bulk", json=rows)
+        await client.post("/latency", json={"mode": args.latency_mode})
+
+        targets = [("GET /users", "/users", {"limit": args.page}), ("GET /users/1", "/users/1", {})]
+        print(f"🚀 {args.bursts} bursts of {args.burst} identical requests "
+              f"({args.latency_mode}, page of {args.page} users)")
+        print(f"\n{'endpoint':>14}{'coalescing':>12}{'burst ms':>10}{'req/s':>9}{'CPU ms':>9}{'queries':>9}")
+        for label, path, params in targets:
+            for enabled in (False, True):
+                user_flight.enabled = user_list_flight.enabled = enabled
+                wall = 0.0
+                cpu_start = time.process_time()
+                statements = 0
+                for _ in range(args.bursts):
+                    user_list_cache.clear()
+                    user_row_cache.clear()
+                    wall += await burst(client, path, params, args.burst)
+                cpu = time.process_time() - cpu_start
+                print(f"{label:>14}{'on' if enabled else 'off':>12}{wall / args.bursts * 1000:>10.1f}"
+                      f"{args.burst * args.bursts / wall:>9.0f}{cpu / args.bursts * 1000:>9.1f}"
+                      f"{statements / args.bursts:>9.1f}")
+        print("\nPer burst: wall time, CPU time of the process and SQL statements executed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight coalescing benchmark")
+    parser.add_argument("--burst", type=int, default=100, help="Identical concurrent requests per burst")
+    parser.add_argument("--bursts", type=int, default=20, help="Bursts per configuration")
+    parser.add_argument("--users", type=int, default=10_000, help="Users added to the temporary database")
+    parser.add_argument("--page", type=int, default=1000, help="Page size of GET /users")
+    parser.add_argument("--latency-mode", default="LOW_LATENCY", help="Simulated latency mode")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Response compression benchmark: bandwidth vs CPU
+
+1. Codecs: compresses GET /users bodies of 100, 1k and 10k users with every
+   installed encoding and a few levels, and reports the size ratio, the
+   compression time, and the time to deliver the body (compression + transfer)
+   on 10 Mbit/s, 100 Mbit/s and 1 Gbit/s links compared to sending it raw.
+2. End to end: CPU per GET /users?limit=1000 in process, without and with
+   Accept-Encoding, when the body and its compressed variant are cached
+   (repeated request) and when the list cache is cleared before every
+   request (query, encoding and compression on every request).
+
+Usage (from the backend folder):
+    python -m benchmarks.compression --users 100 1000 10000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.harness import in_process_client
+from utils.compression import ENCODINGS, compress
+from utils.serialization import dumps
+
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 9, 11), "zstd": (1, 3, 9, 19)}
+LINKS = {"10 Mbit/s": 10e6, "100 Mbit/s": 100e6, "1 Gbit/s": 1e9}
+
+
+def users_body(count: int) -> bytes:
+    """GET /users body with `count` realistic users"""
+    roles = ["Admin", "Developer", "Designer", "Manager", "Analyst"]
+    return dumps([
+        {"id": index, "name": f"User Number{index}", "email": f"user.number{index}@example.com",
+         "role": roles[index % len(roles)]}
+        for index in range(1, count + 1)
+    ])
+
+
+def best_time(function, repeat: int = 5) -> float:
+    """Best wall time of `repeat` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def codec_table(user_counts: list[int]):
+    """Print ratio, compression time and delivery time per encoding and level"""
+    print(f"🚀 Encodings installed: {', '.join(ENCODINGS)}")
+    link_header = "".join(f"{name:>13}" for name in LINKS)
+    for count in user_counts:
+        body = users_body(count)
+        print(f"\n{count} users, {len(body) / 1024:.1f} KiB raw — delivery ms (compression + transfer)")
+        print(f"{'encoding':>10}{'level':>6}{'ratio':>8}{'KiB':>9}{'comp ms':>9}{'MB/s':>8}{link_header}")
+        raw_links = "".join(f"{len(body) * 8 / bandwidth * 1000:>13.2f}" for bandwidth in LINKS.values())
+        print(f"{'identity':>10}{'-':>6}{1:>8.2f}{len(body) / 1024:>9.1f}{0:>9.2f}{'-':>8}{raw_links}")
+        for encoding in ENCODINGS:
+            for level in LEVELS[encoding]:
+                compressed = compress(encoding, body, level)
+                seconds = best_time(lambda: compress(encoding, body, level))
+                links = "".join(
+                    f"{(seconds + len(compressed) * 8 / bandwidth) * 1000:>13.2f}" for bandwidth in LINKS.values()
+                )
+                print(f"{encoding:>10}{level:>6}{len(body) / len(compressed):>8.2f}{len(compressed) / 1024:>9.1f}"
+                      f"{seconds * 1000:>9.2f}{len(body) / seconds / 1e6:>8.0f}{links}")
+
+
+async def end_to_end(requests: int):
+    """CPU per GET /users?limit=1000 request: raw, cached compressed variant, compressed each time"""
+    async with in_process_client(timeout=60) as client:
+        from utils.cache import user_list_cache
+
+        for start in range(0, 1000, 500):
+            await client.post("/users/bulk", json=[
+                {"name": f"User Number{index}", "email": f"compress{index}@example.com", "role": "Developer"}
+                for index in range(start, start + 500)
+            ])
+
+        print(f"\nGET /users?limit=1000, {requests} requests in process")
+        print(f"{'case':>44}{'CPU ms/req':>12}{'bytes sent':>12}")
+        cases = [("identity, cached body", "identity", False)]
+        cases += [(f"{encoding}, cached compressed variant", encoding, False) for encoding in ENCODINGS]
+        cases += [("identity, list cache cleared", "identity", True)]
+        cases += [(f"{encoding}, list cache cleared (compresses)", encoding, True) for encoding in ENCODINGS]
+        for label, accept_encoding, clear_cache in cases:
+            response = await client.get("/users", params={"limit": 1000}, headers={"Accept-Encoding": accept_encoding})
+            start = time.process_time()
+            for _ in range(requests):
+                if clear_cache:
+                    user_list_cache.clear()
+                response = await client.get(
+                    "/users", params={"limit": 1000}, headers={"Accept-Encoding": accept_encoding}
+                )
+            cpu = (time.process_time() - start) / requests
+            print(f"{label:>44}{cpu * 1000:>12.2f}{response.headers['content-length']:>12}")
+        print("\nCPU of the whole process: includes the client (and its decompression)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 10_000], help="Body sizes (users)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per end-to-end case")
+    args = parser.parse_args()
+    codec_table(args.users)
+    asyncio.run(end_to_end(args.requests))
+
+
+if __name__ == "__main__":
+    main()
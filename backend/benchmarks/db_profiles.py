@@ -0,0 +1,135 @@
+"""
+SQLite performance profile benchmark
+
+Runs concurrent readers and writers directly against the database for each
+profile in DatabaseConfig and compares throughput, latency and lock errors.
+Every profile gets a fresh temporary database.
+
+Usage (from the backend folder):
+    python -m benchmarks.db_profiles --readers 20 --writers 10 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.load_test import percentile
+from config import DatabaseProfile
+from database import Base, create_engine_for_profile
+from models import UserDB
+
+
+async def reader(engine, deadline: float, max_id: int, samples: list[float], errors: list[str]):
+    """Point lookups and small pages, one connection checkout per query"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with engine.connect() as conn:
+                if random.random() < 0.8:
+                    user_id = random.randint(1, max_id)
+                    await conn.execute(select(UserDB.__table__).where(UserDB.id == user_id))
+                else:
+                    after_id = random.randint(0, max_id)
+                    result = await conn.execute(
+                        select(UserDB.__table__).where(UserDB.id > after_id).order_by(UserDB.id).limit(50)
+                    )
+                    result.all()
+        except OperationalError as exc:
+            errors.append(str(exc.orig))
+        samples.append(time.perf_counter() - start)
+
+
+async def writer(engine, deadline: float, max_id: int, samples: list[float], errors: list[str]):
+    """One INSERT or UPDATE per transaction (one commit per request, like the API)"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with engine.begin() as conn:
+                if random.random() < 0.5:
+                    token = uuid.uuid4().hex[:12]
+                    await conn.execute(insert(UserDB), {
+                        "name": f"Bench {token}", "email": f"bench.{token}@example.com", "role": "Bench"
+                    })
+                else:
+                    user_id = random.randint(1, max_id)
+                    await conn.execute(update(UserDB).where(UserDB.id == user_id).values(role="Updated"))
+        except OperationalError as exc:
+            errors.append(str(exc.orig))
+        samples.append(time.perf_counter() - start)
+
+
+async def run_profile(profile: DatabaseProfile, rows: int, readers: int, writers: int, duration: float) -> dict:
+    """Benchmark one profile on a fresh database"""
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine_for_profile(url, profile)
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(UserDB), [
+                {"name": f"User {i}", "email": f"user{i}@example.com", "role": "Seed"} for i in range(rows)
+            ])
+        async with engine.connect() as conn:
+            max_id = await conn.scalar(select(func.max(UserDB.id)))
+
+        read_samples: list[float] = []
+        write_samples: list[float] = []
+        errors: list[str] = []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(reader(engine, deadline, max_id, read_samples, errors) for _ in range(readers)),
+            *(writer(engine, deadline, max_id, write_samples, errors) for _ in range(writers)),
+        )
+        await engine.dispose()
+
+    return {
+        "profile": profile.value,
+        "reads_per_second": len(read_samples) / duration,
+        "writes_per_second": len(write_samples) / duration,
+        "read_p50": percentile(read_samples, 50),
+        "read_p99": percentile(read_samples, 99),
+        "write_p50": percentile(write_samples, 50),
+        "write_p99": percentile(write_samples, 99),
+        "errors": len(errors),
+    }
+
+
+async def run(rows: int, readers: int, writers: int, duration: float, profiles: list[DatabaseProfile]):
+    """Benchmark every profile and print a comparison table"""
+    print(f"🚀 {readers} readers + {writers} writers for {duration:.0f}s per profile ({rows} seeded rows)")
+    results = []
+    for profile in profiles:
+        results.append(await run_profile(profile, rows, readers, writers, duration))
+
+    print(f"\n{'profile':<13}{'reads/s':>10}{'writes/s':>10}{'read p50':>10}{'read p99':>10}"
+          f"{'write p50':>11}{'write p99':>11}{'errors':>8}")
+    for result in results:
+        print(
+            f"{result['profile']:<13}{result['reads_per_second']:>10.0f}{result['writes_per_second']:>10.0f}"
+            f"{result['read_p50']*1000:>8.1f}ms{result['read_p99']*1000:>8.1f}ms"
+            f"{result['write_p50']*1000:>9.1f}ms{result['write_p99']*1000:>9.1f}ms{result['errors']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SQLite performance profiles")
+    parser.add_argument("--rows", type=int, default=10000, help="Users seeded before the run")
+    parser.add_argument("--readers", type=int, default=20, help="Concurrent reader tasks")
+    parser.add_argument("--writers", type=int, default=10, help="Concurrent writer tasks")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per profile")
+    parser.add_argument("--profile", action="append", choices=[p.value for p in DatabaseProfile],
+                        help="Profile to run (repeatable, default: all)")
+    args = parser.parse_args()
+
+    profiles = [DatabaseProfile(p) for p in args.profile] if args.profile else list(DatabaseProfile)
+    asyncio.run(run(args.rows, args.readers, args.writers, args.duration, profiles))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Group commit benchmark: per-request commits vs batched commits
+
+Concurrent writers (closed loop, each sends its next write when the previous
+one completes) create, update and delete users through the app in process,
+on a temporary copy of users.db, with GROUP_COMMIT off and on. A few writes
+reuse an existing email, so failed operations inside a batch are included.
+
+Reports writes per second, p50/p99 latency, the number of transactions
+(commits), and rejected (4xx) and failed (5xx) writes per configuration.
+
+Usage (from the backend folder):
+    python -m benchmarks.group_commit --writers 1 8 32 64 --writes 20
+    python -m benchmarks.group_commit --profile DEFAULT   # rollback journal, fsync on every commit
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from config import DatabaseProfile, settings
+from benchmarks.load_test import percentile
+
+
+async def writer(client, index: int, writes: int, samples: list[float], failures: list[int]):
+    """Create a user, then alternate updates and a final delete"""
+    user_id = None
+    for step in range(writes):
+        start = time.perf_counter()
+        try:
+            if user_id is None:
+                # 1 in 10 creates reuses an email: rejected inside the batch
+                email = "duplicate@bench.example" if random.random() < 0.1 else f"w{index}.{step}@bench.example"
+                user = {"name": f"Writer {index}", "email": email, "role": "Bench"}
+                response = await client.post("/users", json=user)
+                if response.status_code == 201:
+                    user_id = response.json()["id"]
+            elif step == writes - 1:
+                response = await client.delete(f"/users/{user_id}")
+            else:
+                response = await client.patch(f"/users/{user_id}", json={"role": f"Bench {step}"})
+            status_code = response.status_code
+        except Exception:  # Unhandled app error (e.g. "database is locked" after busy_timeout)
+            status_code = 500
+        samples.append(time.perf_counter() - start)
+        if status_code >= 400:
+            failures.append(status_code)
+
+
+async def main_async(args):
+    from benchmarks.harness import in_process_client
+
+    async with in_process_client(timeout=120) as client:
+        from services.user_service import user_write_queue
+        from utils.admission import admission
+
+        admission.enabled = False  # Every writer reaches the write path (no 503 past ADMISSION_MAX_WRITES)
+        await client.post("/users", json={"name": "Taken", "email": "duplicate@bench.example", "role": "Bench"})
+        print(f"🚀 {settings.DATABASE_PROFILE.value} profile, {args.writes} writes per writer "
+              f"(max batch {user_write_queue.max_batch}, max delay {user_write_queue.max_delay * 1000:g} ms)")
+        print(f"\n{'writers':>8}{'group commit':>14}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'commits':>9}{'rejected':>10}{'errors':>8}")
+        for writers in args.writers:
+            for enabled in (False, True):
+                user_write_queue.enabled = enabled
+                batches_before = user_write_queue.batches
+                samples: list[float] = []
+                failures: list[int] = []
+                start = time.perf_counter()
+                await asyncio.gather(*(writer(client, index, args.writes, samples, failures)
+                                       for index in range(writers)))
+                elapsed = time.perf_counter() - start
+                # Per-request path: one commit per successful write
+                rejected = sum(1 for status_code in failures if status_code < 500)
+                errors = len(failures) - rejected
+                commits = (user_write_queue.batches - batches_before) if enabled else len(samples) - len(failures)
+                print(f"{writers:>8}{'on' if enabled else 'off':>14}{len(samples) / elapsed:>10.0f}"
+                      f"{percentile(samples, 50) * 1000:>9.1f}{percentile(samples, 99) * 1000:>9.1f}"
+                      f"{commits:>9}{rejected:>10}{errors:>8}")
+        print("\nrejected: duplicate emails (4xx), answered individually in both modes; errors: 5xx")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Group commit benchmark")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 8, 32, 64], help="Concurrent writers")
+    parser.add_argument("--writes", type=int, default=20, help="Writes per writer")
+    parser.add_argument("--profile", choices=[profile.value for profile in DatabaseProfile],
+                        default=settings.DATABASE_PROFILE.value, help="SQLite profile (DATABASE_PROFILE)")
+    args = parser.parse_args()
+    # Must be set before database.py is imported (the engine is created at import)
+    settings.DATABASE_PROFILE = DatabaseProfile(args.profile)
+    random.seed(0)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""
+Benchmark harness for the Workshop API
+
+Replays a workload mix against the app, either in-process (httpx ASGI
+transport on a temporary copy of the database) or against a running server,
+for each latency mode. Clients run closed-loop (fixed concurrency) or
+open-loop (Poisson arrivals at a fixed rate, latency measured from the
+scheduled arrival so queueing is not hidden).
+
+Reports throughput and p50/p95/p99/p999 per mode and operation, and can write
+the results as JSON to compare runs across commits.
+
+Usage (from the backend folder):
+    python -m benchmarks.harness --in-process --workload read-heavy --concurrency 50 --duration 10
+    python -m benchmarks.harness --url http://localhost:8000 --workload mixed --rate 200 --modes NO_LATENCY LOW_LATENCY
+    python -m benchmarks.harness --in-process --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from benchmarks.load_test import (
+    op_create_user, op_delete_user, op_get_user, op_list_users, op_update_user, percentile,
+)
+from config import LatencyMode, settings
+
+
+PERCENTILES = (50, 95, 99, 99.9)
+
+# Size of the id range probed by cache-hostile reads
+ID_SPACE = 5000
+
+
+# ============================================
+# Extra operations
+# ============================================
+
+async def op_list_random(client: httpx.AsyncClient, created: list[int]) -> int:
+    """GET /users with a random page, filter and projection (defeats the list cache)"""
+    params = {"after_id": random.randint(0, ID_SPACE), "limit": random.randint(1, 200)}
+    if random.random() < 0.5:
+        params["fields"] = random.choice(["name", "email", "name,role", "email,role"])
+    if random.random() < 0.3:
+        params["email_prefix"] = random.choice("abcdefghijklmnopqrstuvwxyz")
+    response = await client.get("/users", params=params)
+    return response.status_code
+
+
+async def op_get_random(client: httpx.AsyncClient, created: list[int]) -> int:
+    """GET /users/{id} on a random id (mostly cache misses, some 404)"""
+    response = await client.get(f"/users/{random.randint(1, ID_SPACE)}")
+    return response.status_code
+
+
+async def op_bulk_create(client: httpx.AsyncClient, created: list[int]) -> int:
+    """POST /users/bulk with 100 new users"""
+    token = uuid.uuid4().hex[:8]
+    response = await client.post("/users/bulk", json=[
+        {"name": f"Bulk {token} {i}", "email": f"bulk.{token}.{i}@example.com", "role": "Load Tester"}
+        for i in range(100)
+    ])
+    if response.status_code == 200:
+        created.extend(item["id"] for item in response.json()["results"] if item["status"] == "created")
+    return response.status_code
+
+
+async def op_bulk_update(client: httpx.AsyncClient, created: list[int]) -> int:
+    """PATCH /users/bulk on up to 100 users created by this run"""
+    if not created:
+        return await op_bulk_create(client, created)
+    ids = random.sample(created, min(100, len(created)))
+    role = random.choice(["Developer", "Designer"])
+    response = await client.patch("/users/bulk", json=[{"id": user_id, "role": role} for user_id in ids])
+    return response.status_code
+
+
+async def op_bulk_delete(client: httpx.AsyncClient, created: list[int]) -> int:
+    """DELETE /users/bulk on up to 100 users created by this run"""
+    if len(created) < 200:
+        return await op_bulk_create(client, created)
+    ids = [created.pop(random.randrange(len(created))) for _ in range(100)]
+    response = await client.request("DELETE", "/users/bulk", json={"ids": ids})
+    return response.status_code
+
+
+OPERATIONS = {
+    "list": op_list_users,
+    "get": op_get_user,
+    "create": op_create_user,
+    "update": op_update_user,
+    "delete": op_delete_user,
+    "list_random": op_list_random,
+    "get_random": op_get_random,
+    "bulk_create": op_bulk_create,
+    "bulk_update": op_bulk_update,
+    "bulk_delete": op_bulk_delete,
+}
+
+# Workload name -> {operation: weight}
+WORKLOADS = {
+    "mixed": {"list": 30, "get": 40, "create": 15, "update": 10, "delete": 5},
+    "read-heavy": {"list": 20, "get": 75, "create": 2, "update": 2, "delete": 1},
+    "write-heavy": {"list": 5, "get": 15, "create": 40, "update": 30, "delete": 10},
+    "bulk": {"list": 20, "bulk_create": 40, "bulk_update": 30, "bulk_delete": 10},
+    "cache-hostile": {"list_random": 40, "get_random": 50, "create": 5, "update": 5},
+}
+
+
+# ============================================
+# Targets
+# ============================================
+
+@asynccontextmanager
+async def in_process_client(timeout: float):
+    """
+    Client bound to the app through the ASGI transport
+    The app runs on a temporary copy of users.db, so the real file is untouched
+    """
+    directory = tempfile.mkdtemp(prefix="workshop-bench-")
+    if os.path.exists("users.db"):
+        shutil.copy("users.db", os.path.join(directory, "users.db"))
+    # Must be set before database.py is imported (the engine is created at import)
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}"
+    try:
+        from main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+                yield client
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@asynccontextmanager
+async def url_client(url: str, concurrency: int, timeout: float):
+    """Client for a running server"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        yield client
+
+
+# ============================================
+# Load generation
+# ============================================
+
+class Recorder:
+    """Latency samples and error counts per operation"""
+
+    def __init__(self, operations: list[str]):
+        self.samples: dict[str, list[float]] = {name: [] for name in operations}
+        self.errors: dict[str, int] = {name: 0 for name in operations}
+        self.dropped = 0
+
+    async def issue(self, client: httpx.AsyncClient, name: str, created: list[int], started: float):
+        """Run one operation; latency counts from `started` (scheduled time in open loop)"""
+        try:
+            status_code = await OPERATIONS[name](client, created)
+        except httpx.HTTPError:
+            status_code = 599
+        self.samples[name].append(time.perf_counter() - started)
+        if status_code >= 500:
+            self.errors[name] += 1
+
+
+async def closed_loop(client: httpx.AsyncClient, workload: dict[str, int], concurrency: int,
+                      deadline: float, created: list[int], recorder: Recorder):
+    """Fixed number of clients, each sending its next request when the previous one completes"""
+    names = list(workload)
+    weights = list(workload.values())
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            await recorder.issue(client, random.choices(names, weights)[0], created, time.perf_counter())
+
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, workload: dict[str, int], rate: float, max_outstanding: int,
+                    deadline: float, created: list[int], recorder: Recorder):
+    """
+    Poisson arrivals at `rate` requests per second, independent of response times
+    Arrivals beyond `max_outstanding` in-flight requests are dropped and counted
+    """
+    names = list(workload)
+    weights = list(workload.values())
+    tasks: set[asyncio.Task] = set()
+    scheduled = time.perf_counter()
+
+    while True:
+        scheduled += random.expovariate(rate)
+        if scheduled >= deadline:
+            break
+        wait = scheduled - time.perf_counter()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if len(tasks) >= max_outstanding:
+            recorder.dropped += 1
+            continue
+        task = asyncio.create_task(recorder.issue(client, random.choices(names, weights)[0], created, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    """Throughput and percentiles (seconds) per operation and overall"""
+    def stats(samples: list[float], errors: int) -> dict:
+        result = {"count": len(samples), "errors": errors}
+        for pct in PERCENTILES:
+            result[f"p{pct:g}".replace(".", "")] = percentile(samples, pct)
+        result["max"] = max(samples, default=0.0)
+        return result
+
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    return {
+        "elapsed": elapsed,
+        "throughput": len(all_samples) / elapsed if elapsed else 0.0,
+        "dropped": recorder.dropped,
+        "overall": stats(all_samples, sum(recorder.errors.values())),
+        "operations": {
+            name: stats(samples, recorder.errors[name])
+            for name, samples in recorder.samples.items() if samples
+        },
+    }
+
+
+async def run_mode(client: httpx.AsyncClient, mode: str, args) -> dict:
+    """Warm up, then run the workload under one latency mode"""
+    workload = WORKLOADS[args.workload]
+    await client.post("/latency", json={"mode": mode})
+    created: list[int] = []
+
+    if args.warmup > 0:
+        warmup = Recorder(list(workload))
+        await closed_loop(client, workload, args.concurrency, time.perf_counter() + args.warmup, created, warmup)
+
+    recorder = Recorder(list(workload))
+    start = time.perf_counter()
+    deadline = start + args.duration
+    if args.rate:
+        await open_loop(client, workload, args.rate, args.max_outstanding, deadline, created, recorder)
+    else:
+        await closed_loop(client, workload, args.concurrency, deadline, created, recorder)
+    elapsed = time.perf_counter() - start
+
+    # Leave the database as we found it
+    try:
+        for offset in range(0, len(created), 1000):
+            await client.request("DELETE", "/users/bulk", json={"ids": created[offset:offset + 1000]})
+    except httpx.HTTPError as exc:
+        print(f"⚠️  Cleanup failed: {exc!r}")
+
+    return summarize(recorder, elapsed)
+
+
+# ============================================
+# Reporting
+# ============================================
+
+def git_commit() -> Optional[str]:
+    """Current commit hash, if run inside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_mode_report(mode: str, summary: dict):
+    """Print throughput and percentiles of one mode"""
+    dropped = f", {summary['dropped']} dropped" if summary["dropped"] else ""
+    print(f"\n📊 {mode}: {summary['overall']['count']} requests in {summary['elapsed']:.1f}s "
+          f"→ {summary['throughput']:.1f} req/s{dropped}")
+    print(f"{'op':<13}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'p999 ms':>10}")
+    rows = list(summary["operations"].items()) + [("ALL", summary["overall"])]
+    for name, stats in rows:
+        print(
+            f"{name:<13}{stats['count']:>8}{stats['errors']:>8}"
+            f"{stats['p50']*1000:>10.1f}{stats['p95']*1000:>10.1f}"
+            f"{stats['p99']*1000:>10.1f}{stats['p999']*1000:>10.1f}"
+        )
+
+
+def print_comparison(baseline: dict, current: dict):
+    """Print throughput and p99 changes against a previous results file"""
+    print(f"\n🔍 Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')})")
+    print(f"{'mode':<16}{'req/s':>10}{'Δ req/s':>10}{'p99 ms':>10}{'Δ p99':>10}")
+    for mode, summary in current["modes"].items():
+        previous = baseline.get("modes", {}).get(mode)
+        if previous is None:
+            continue
+        throughput_change = (summary["throughput"] / previous["throughput"] - 1) if previous["throughput"] else 0.0
+        p99, previous_p99 = summary["overall"]["p99"], previous["overall"]["p99"]
+        p99_change = (p99 / previous_p99 - 1) if previous_p99 else 0.0
+        print(f"{mode:<16}{summary['throughput']:>10.1f}{throughput_change:>+10.1%}"
+              f"{p99*1000:>10.1f}{p99_change:>+10.1%}")
+
+
+async def run(args) -> dict:
+    """Run the workload for every requested latency mode"""
+    if args.in_process:
+        target = in_process_client(args.timeout)
+        target_name = "in-process"
+    else:
+        target = url_client(args.url, args.concurrency, args.timeout)
+        target_name = args.url
+
+    load = f"open loop at {args.rate:g} req/s" if args.rate else f"{args.concurrency} closed-loop clients"
+    print(f"🚀 {args.workload} workload, {load}, {args.duration:g}s per mode against {target_name}")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "target": target_name,
+        "workload": args.workload,
+        "weights": WORKLOADS[args.workload],
+        "concurrency": None if args.rate else args.concurrency,
+        "rate": args.rate,
+        "duration": args.duration,
+        "modes": {},
+    }
+    async with target as client:
+        for mode in args.modes:
+            summary = await run_mode(client, mode, args)
+            results["modes"][mode] = summary
+            print_mode_report(mode, summary)
+        await client.post("/latency/reset")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark harness for the Workshop API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://localhost:8000", help="Base URL of a running server")
+    target.add_argument("--in-process", action="store_true",
+                        help="Run the app in this process on a temporary copy of users.db")
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="mixed", help="Operation mix")
+    parser.add_argument("--concurrency", type=int, default=50, help="Closed-loop clients (and warmup clients)")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in req/s")
+    parser.add_argument("--max-outstanding", type=int, default=1000,
+                        help="Open loop: arrivals beyond this many in-flight requests are dropped")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per latency mode")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before each mode")
+    parser.add_argument("--modes", nargs="+", choices=[mode.value for mode in LatencyMode],
+                        default=[mode.value for mode in LatencyMode], help="Latency modes to run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for the operation sequence")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Previous JSON results to compare with")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            print_comparison(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
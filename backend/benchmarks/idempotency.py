@@ -0,0 +1,99 @@
+"""
+Idempotency-Key benchmark: cost of a retried write and of a retry storm
+
+Runs the app in process, on a temporary copy of users.db, under a latency
+mode (LOW_LATENCY by default: 150 ms per write):
+
+1. Retry cost: N keyed POST /users, then the same N requests again (a
+   client retrying after a timeout). Reports ms per request and the SQL
+   statements per request of the originals and of the retries.
+2. Retry storm: K users created by D concurrent copies of the same
+   request each (clients retrying before the first answer), without and
+   with an Idempotency-Key. Reports the answers by status and how many
+   times the write path ran (INSERT INTO users statements).
+
+Usage (from the backend folder):
+    python -m benchmarks.idempotency --requests 100 --keys 20 --duplicates 25
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+from sqlalchemy import event
+
+from config import LatencyMode
+
+
+async def main_async(args):
+    from benchmarks.harness import in_process_client
+
+    async with in_process_client(timeout=120) as client:
+        from database import engine
+
+        statements: list[str] = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record_statement(conn, cursor, statement, *_):
+            statements.append(statement)
+
+        await client.post("/latency", json={"mode": args.mode})
+        run = uuid.uuid4().hex[:8]
+
+        def user(index: int) -> dict:
+            return {"name": f"Retry {index}", "email": f"retry.{run}.{index}@bench.example", "role": "Bench"}
+
+        # 1. Sequential retries of completed writes
+        print(f"🚀 {args.mode}: {args.requests} keyed POST /users, then the same requests again")
+        print(f"\n{'pass':>10}{'ms/req':>9}{'statements/req':>16}{'status':>10}{'replayed':>10}")
+        for label in ("original", "retry"):
+            statements.clear()
+            codes: Counter = Counter()
+            replayed = 0
+            start = time.perf_counter()
+            for index in range(args.requests):
+                response = await client.post("/users", json=user(index), headers={"Idempotency-Key": f"{run}-{index}"})
+                codes[response.status_code] += 1
+                replayed += response.headers.get("idempotent-replayed") == "true"
+            elapsed = time.perf_counter() - start
+            status = ",".join(str(code) for code in sorted(codes))
+            print(f"{label:>10}{elapsed / args.requests * 1000:>9.1f}{len(statements) / args.requests:>16.2f}"
+                  f"{status:>10}{replayed:>10}")
+
+        # 2. Concurrent duplicates of writes in progress
+        print(f"\n🌪️  Retry storm: {args.keys} users x {args.duplicates} concurrent copies of each POST /users")
+        print(f"\n{'key':>8}{'seconds':>9}{'write path runs':>17}  answers")
+        for keyed in (False, True):
+            statements.clear()
+            storm = f"{uuid.uuid4().hex[:8]}"
+            requests = []
+            for index in range(args.keys):
+                body = {**user(index), "email": f"storm.{storm}.{index}@bench.example"}
+                headers = {"Idempotency-Key": f"{storm}-{index}"} if keyed else {}
+                requests += [client.post("/users", json=body, headers=headers) for _ in range(args.duplicates)]
+            start = time.perf_counter()
+            responses = await asyncio.gather(*requests)
+            elapsed = time.perf_counter() - start
+            runs = sum(1 for statement in statements if statement.startswith("INSERT INTO users"))
+            answers = Counter(response.status_code for response in responses)
+            summary = ", ".join(f"{count} x {code}" for code, count in sorted(answers.items()))
+            print(f"{'yes' if keyed else 'no':>8}{elapsed:>9.2f}{runs:>17}  {summary}")
+
+        await client.post("/latency/reset")
+        print("\n409: email already registered (the copy ran again); 503: rejected by admission control")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Idempotency-Key benchmark")
+    parser.add_argument("--mode", choices=[mode.value for mode in LatencyMode], default="LOW_LATENCY",
+                        help="Latency mode during the run")
+    parser.add_argument("--requests", type=int, default=100, help="Sequential writes, then retries")
+    parser.add_argument("--keys", type=int, default=20, help="Distinct writes in the retry storm")
+    parser.add_argument("--duplicates", type=int, default=25, help="Concurrent copies of each write")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
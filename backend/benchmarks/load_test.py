@@ -0,0 +1,189 @@
+"""
+Concurrent mixed read/write load test
+
+Drives a running server with a fixed number of concurrent clients and
+reports throughput and latency percentiles per operation.
+
+Usage (from the backend folder, with the server already running):
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 50 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+
+# ============================================
+# Workload
+# ============================================
+
+async def op_list_users(client: httpx.AsyncClient, created: list[int]) -> int:
+    """GET /users"""
+    response = await client.get("/users")
+    return response.status_code
+
+
+async def op_get_user(client: httpx.AsyncClient, created: list[int]) -> int:
+    """GET /users/{id} on a known user"""
+    user_id = random.choice(created) if created else 1
+    response = await client.get(f"/users/{user_id}")
+    return response.status_code
+
+
+async def op_create_user(client: httpx.AsyncClient, created: list[int]) -> int:
+    """POST /users with a unique email"""
+    token = uuid.uuid4().hex[:12]
+    response = await client.post("/users", json={
+        "name": f"Load {token}",
+        "email": f"load.{token}@example.com",
+        "role": "Load Tester",
+    })
+    if response.status_code == 201:
+        created.append(response.json()["id"])
+    return response.status_code
+
+
+async def op_update_user(client: httpx.AsyncClient, created: list[int]) -> int:
+    """PATCH /users/{id} on a user created by this run"""
+    if not created:
+        return await op_create_user(client, created)
+    user_id = random.choice(created)
+    response = await client.patch(f"/users/{user_id}", json={"role": random.choice(["Developer", "Designer"])})
+    return response.status_code
+
+
+async def op_delete_user(client: httpx.AsyncClient, created: list[int]) -> int:
+    """DELETE /users/{id} on a user created by this run"""
+    if len(created) < 2:
+        return await op_create_user(client, created)
+    user_id = created.pop(random.randrange(len(created)))
+    response = await client.delete(f"/users/{user_id}")
+    return response.status_code
+
+
+# Operation name -> (function, weight)
+MIXED_WORKLOAD = {
+    "list":   (op_list_users, 30),
+    "get":    (op_get_user, 40),
+    "create": (op_create_user, 15),
+    "update": (op_update_user, 10),
+    "delete": (op_delete_user, 5),
+}
+
+
+# ============================================
+# Statistics
+# ============================================
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def print_report(results: dict[str, list[float]], errors: dict[tuple[str, str], int], elapsed: float):
+    """
+    Print throughput and latency percentiles per operation
+    Errors are split into 5xx responses and transport errors (timeouts,
+    connections closed by the server, e.g. by uvicorn after a 500 raised
+    by an unhandled exception)
+    """
+    total = sum(len(samples) for samples in results.values())
+    print(f"\n{'='*72}")
+    print(f"📊 {total} requests in {elapsed:.1f}s → {total / elapsed:.1f} req/s")
+    print(f"{'='*72}")
+    print(f"{'op':<8}{'count':>8}{'5xx':>8}{'conn':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+
+    all_samples = []
+    for name, samples in results.items():
+        all_samples.extend(samples)
+        print(
+            f"{name:<8}{len(samples):>8}{errors.get((name, '5xx'), 0):>8}{errors.get((name, 'conn'), 0):>8}"
+            f"{percentile(samples, 50)*1000:>11.1f}{percentile(samples, 95)*1000:>11.1f}"
+            f"{percentile(samples, 99)*1000:>11.1f}{max(samples, default=0)*1000:>11.1f}"
+        )
+    print(
+        f"{'ALL':<8}{len(all_samples):>8}"
+        f"{sum(n for (_, kind), n in errors.items() if kind == '5xx'):>8}"
+        f"{sum(n for (_, kind), n in errors.items() if kind == 'conn'):>8}"
+        f"{percentile(all_samples, 50)*1000:>11.1f}{percentile(all_samples, 95)*1000:>11.1f}"
+        f"{percentile(all_samples, 99)*1000:>11.1f}{max(all_samples, default=0)*1000:>11.1f}"
+    )
+
+
+# ============================================
+# Runner
+# ============================================
+
+async def worker(client: httpx.AsyncClient, deadline: float, created: list[int],
+                 results: dict[str, list[float]], errors: dict[tuple[str, str], int]):
+    """Closed-loop client: issue one request after another until the deadline"""
+    names = list(MIXED_WORKLOAD)
+    weights = [MIXED_WORKLOAD[name][1] for name in names]
+
+    while time.perf_counter() < deadline:
+        name = random.choices(names, weights)[0]
+        operation = MIXED_WORKLOAD[name][0]
+        start = time.perf_counter()
+        kind = None
+        try:
+            if await operation(client, created) >= 500:
+                kind = "5xx"
+        except httpx.HTTPError:
+            kind = "conn"
+        results[name].append(time.perf_counter() - start)
+        if kind is not None:
+            errors[(name, kind)] = errors.get((name, kind), 0) + 1
+
+
+async def run(url: str, concurrency: int, duration: float, latency_mode: str | None, timeout: float):
+    """Run the mixed workload against a server"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+        if latency_mode:
+            await client.post("/latency", json={"mode": latency_mode})
+
+        created: list[int] = []
+        results: dict[str, list[float]] = {name: [] for name in MIXED_WORKLOAD}
+        errors: dict[tuple[str, str], int] = {}
+
+        print(f"🚀 {concurrency} clients for {duration:.0f}s against {url}")
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            worker(client, deadline, created, results, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+        # Leave the database as we found it
+        try:
+            for user_id in created:
+                await client.delete(f"/users/{user_id}")
+            if latency_mode:
+                await client.post("/latency/reset")
+        except httpx.HTTPError as exc:
+            print(f"⚠️  Cleanup failed: {exc!r}")
+
+    print_report(results, errors, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent mixed read/write load test")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the running server")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Test duration in seconds")
+    parser.add_argument("--latency-mode", default=None, help="Latency mode to set before running")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.duration, args.latency_mode, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Read model memory benchmark: ORM objects vs column rows vs slotted dataclasses
+
+Fills a temporary database with N users (default 100k) and reads all of them
+once per path, in a new session each time:
+- ORM + response_model: UserDB instances validated into User and encoded by
+  FastAPI (the path of the reads before the column-level read model)
+- ORM objects: UserDB instances only (identity map and instance state)
+- row tuples: select(*USER_COLUMNS), SQLAlchemy Row objects
+- UserRow: the same rows mapped into the slotted read model (models.UserRow)
+- UserRow + dumps: the read model encoded to JSON bytes
+- get_users_json (cold): the GET /users fast path with every cache empty
+
+Reports the tracemalloc peak (memory allocated while the path runs, result
+included) in MiB and in bytes per row, and the time of a run without
+tracemalloc (tracing slows allocations down).
+
+Usage (from the backend folder):
+    python -m benchmarks.read_model --users 100000 --repeat 3
+"""
+import argparse
+import asyncio
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from config import settings
+
+
+async def run(users: int, repeat: int):
+    """Create the schema, then measure (the engine is always disposed)"""
+    from database import close_db, init_db
+
+    await init_db()
+    try:
+        await measure(users, repeat)
+    finally:
+        await close_db()
+
+
+async def measure(users: int, repeat: int):
+    """Fill the table and print one line per read path"""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute, serialize_response
+    from sqlalchemy import delete, select
+    from sqlalchemy.dialects.sqlite import insert
+
+    from database import SessionLocal
+    from models import USER_COLUMNS, UserDB, UserRow
+    from schemas import User, UserListQuery
+    from services.user_service import UserService
+    from utils.cache import user_list_cache, user_row_cache
+    from utils.serialization import dumps
+
+    async with SessionLocal() as db:
+        await db.execute(delete(UserDB))
+        for start in range(0, users, 10_000):
+            await db.execute(insert(UserDB), [
+                {"name": f"Benchmark User {index}", "email": f"user{index}@bench.example", "role": "Developer"}
+                for index in range(start, min(start + 10_000, users))
+            ])
+        await db.commit()
+
+    route = APIRoute("/users", lambda: None, response_model=list[User])
+    query = UserListQuery.model_construct(limit=users)  # Beyond the API's page size limit (not validated)
+
+    async def orm_response_model(db):
+        users = (await db.scalars(select(UserDB).order_by(UserDB.id))).all()
+        content = await serialize_response(field=route.response_field, response_content=users)
+        return JSONResponse(content).body
+
+    async def orm_objects(db):
+        return (await db.scalars(select(UserDB).order_by(UserDB.id))).all()
+
+    async def row_tuples(db):
+        return (await db.execute(select(*USER_COLUMNS).order_by(UserDB.id))).all()
+
+    async def read_model(db):
+        return [UserRow(*row) for row in await db.execute(select(*USER_COLUMNS).order_by(UserDB.id))]
+
+    async def read_model_encoded(db):
+        return dumps([UserRow(*row) for row in await db.execute(select(*USER_COLUMNS).order_by(UserDB.id))])
+
+    async def users_json_cold(db):
+        user_list_cache.clear()
+        user_row_cache.clear()
+        return (await UserService.get_users_json(db, query))[0].raw
+
+    paths = [
+        ("ORM + response_model", orm_response_model),
+        ("ORM objects", orm_objects),
+        ("row tuples", row_tuples),
+        ("UserRow", read_model),
+        ("UserRow + dumps", read_model_encoded),
+        ("get_users_json (cold)", users_json_cold),
+    ]
+
+    async def run_path(path) -> None:
+        # New session: the identity map of a previous run must not be reused
+        async with SessionLocal() as db:
+            result = await path(db)
+            del result
+
+    print(f"🚀 {users} users, tracemalloc peak per path, best time of {repeat} runs")
+    print(f"\n{'path':>24}{'peak MiB':>10}{'bytes/row':>11}{'ms':>9}")
+    baseline = None
+    for label, path in paths:
+        await run_path(path)  # Warm-up: compiled statement caches, imports
+        best = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            await run_path(path)
+            best = min(best, time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            async with SessionLocal() as db:
+                tracemalloc.reset_peak()
+                result = await path(db)
+                peak = tracemalloc.get_traced_memory()[1]
+                del result
+        finally:
+            tracemalloc.stop()
+        baseline = baseline or peak
+        print(f"{label:>24}{peak / 2**20:>10.1f}{peak / users:>11.0f}{best * 1000:>9.0f}"
+              f"{'' if peak == baseline else f'  ({baseline / peak:.1f}x less)'}")
+    user_list_cache.clear()
+    user_row_cache.clear()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read model memory benchmark")
+    parser.add_argument("--users", type=int, default=100_000, help="Users read by every path")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per path (best is kept)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="workshop-read-model-")
+    # Must be set before database.py is imported (the engine is created at import)
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}"
+    try:
+        asyncio.run(run(args.users, args.repeat))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Multi-worker scaling benchmark
+
+Starts serve.py with an increasing number of workers (each run on a fresh copy
+of users.db), drives it with closed-loop clients and reports how throughput
+scales with the number of worker processes.
+
+Usage (from the backend folder):
+    python -m benchmarks.scaling --workers 1 2 4 8 --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.harness import WORKLOADS, Recorder, closed_loop, summarize
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(directory: str, workers: int, port: int) -> subprocess.Popen:
+    """Launch serve.py in `directory` (its users.db) and wait until it answers"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--workers", str(workers),
+         "--port", str(port), "--host", "127.0.0.1"],
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": BACKEND_DIR, "LOG_LEVEL": "WARNING"},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"Server with {workers} workers did not start")
+
+
+def stop_server(process: subprocess.Popen):
+    """Graceful shutdown (SIGINT), then kill if needed"""
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def drive(port: int, workload: str, concurrency: int, duration: float, warmup: float) -> dict:
+    """Run the workload against the server and summarize it"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        weights = WORKLOADS[workload]
+        created: list[int] = []
+        if warmup > 0:
+            await closed_loop(client, weights, concurrency, time.perf_counter() + warmup, created, Recorder(list(weights)))
+        recorder = Recorder(list(weights))
+        start = time.perf_counter()
+        await closed_loop(client, weights, concurrency, start + duration, created, recorder)
+        return summarize(recorder, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput scaling across worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to run")
+    parser.add_argument("--workload", choices=list(WORKLOADS), default="read-heavy", help="Operation mix")
+    parser.add_argument("--concurrency", type=int, default=64, help="Closed-loop clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--port", type=int, default=8765, help="Port used by the servers")
+    args = parser.parse_args()
+
+    print(f"🚀 {args.workload} workload, {args.concurrency} clients, {args.duration:g}s per run "
+          f"({os.cpu_count()} CPUs)")
+    rows = []
+    for workers in args.workers:
+        directory = tempfile.mkdtemp(prefix="workshop-scaling-")
+        try:
+            if os.path.exists(os.path.join(BACKEND_DIR, "users.db")):
+                shutil.copy(os.path.join(BACKEND_DIR, "users.db"), directory)
+            process = start_server(directory, workers, args.port)
+            try:
+                summary = asyncio.run(drive(args.port, args.workload, args.concurrency, args.duration, args.warmup))
+            finally:
+                stop_server(process)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        rows.append((workers, summary))
+        print(f"   {workers} workers: {summary['throughput']:.0f} req/s")
+
+    baseline = rows[0][1]["throughput"] or 1.0
+    print(f"\n{'workers':>8}{'req/s':>10}{'speedup':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for workers, summary in rows:
+        overall = summary["overall"]
+        print(f"{workers:>8}{summary['throughput']:>10.0f}{summary['throughput'] / baseline:>8.2f}x"
+              f"{overall['p50']*1000:>9.1f}{overall['p99']*1000:>9.1f}{overall['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
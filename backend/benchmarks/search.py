@@ -0,0 +1,125 @@
+"""
+Search benchmark (GET /users/search, FTS5 index)
+
+Writes a users table with synthetic users in a temporary database (the schema
+of a users.db from before the search index), runs init_db() to migrate it and
+build the index, then times UserService.search_users for narrow and broad
+queries (exact word, prefixes, two words, a role, a single letter).
+
+Usage (from the backend folder):
+    python -m benchmarks.search --users 1000000 --repeat 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import string
+import tempfile
+import time
+
+from benchmarks.load_test import percentile
+from config import settings
+
+ROLES = ["Admin", "Developer", "Designer", "Manager", "Analyst", "Tester", "Support", "Sales"]
+
+
+def create_users(path: str, count: int, seed: int) -> list[str]:
+    """Create a users table with `count` synthetic users and return a sample of names"""
+    rng = random.Random(seed)
+    first_names = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))).title() for _ in range(3000)
+    ]
+    last_names = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))).title() for _ in range(5000)
+    ]
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+        "email VARCHAR NOT NULL UNIQUE, role VARCHAR NOT NULL)"
+    )
+    names = []
+
+    def rows():
+        for index in range(count):
+            first, last = rng.choice(first_names), rng.choice(last_names)
+            if len(names) < 1000:
+                names.append(f"{first} {last}")
+            yield f"{first} {last}", f"{first.lower()}.{last.lower()}{index}@example.com", rng.choice(ROLES)
+
+    connection.executemany("INSERT INTO users (name, email, role) VALUES (?, ?, ?)", rows())
+    connection.commit()
+    connection.close()
+    return names
+
+
+def queries(names: list[str], rng: random.Random) -> dict[str, list[str]]:
+    """Query strings per kind, built from existing names"""
+    sample = rng.sample(names, 50)
+    return {
+        "first name": [name.split()[0] for name in sample],
+        "3-char prefix": [name.split()[1][:3] for name in sample],
+        "two words": [f"{name.split()[0]} {name.split()[1][:2]}" for name in sample],
+        "role (broad)": ROLES,
+        "1 letter (broad)": list(string.ascii_lowercase),
+    }
+
+
+async def run(names: list[str], repeat: int, seed: int):
+    """Time every query kind and print a table"""
+    from database import SessionLocal
+    from schemas import UserSearchQuery
+    from services.user_service import UserService
+
+    rng = random.Random(seed)
+    print(f"\n{'query':>18}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'ranked':>8}")
+    async with SessionLocal() as db:
+        for kind, texts in queries(names, rng).items():
+            durations: list[float] = []
+            ranked = 0
+            for _ in range(repeat):
+                query = UserSearchQuery(q=rng.choice(texts), limit=20)
+                start = time.perf_counter()
+                result = await UserService.search_users(db, query)
+                durations.append(time.perf_counter() - start)
+                ranked += result["ranked"]
+            print(f"{kind:>18}{percentile(durations, 50)*1000:>9.2f}{percentile(durations, 99)*1000:>9.2f}"
+                  f"{max(durations)*1000:>9.2f}{ranked / repeat:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 search benchmark")
+    parser.add_argument("--users", type=int, default=1_000_000, help="Users in the table")
+    parser.add_argument("--repeat", type=int, default=50, help="Queries per kind")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="workshop-search-")
+    path = os.path.join(directory, "users.db")
+    try:
+        start = time.perf_counter()
+        names = create_users(path, args.users, args.seed)
+        print(f"🚀 {args.users} users written in {time.perf_counter() - start:.1f}s")
+
+        # Must be set before database.py is imported (the engine is created at import)
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{path}"
+        from database import close_db, init_db
+
+        async def benchmark():
+            start = time.perf_counter()
+            await init_db()
+            print(f"🔎 Startup migration and index build: {time.perf_counter() - start:.1f}s "
+                  f"(database: {os.path.getsize(path) / 1e6:.0f} MB)")
+            try:
+                await run(names, args.repeat, args.seed)
+            finally:
+                await close_db()
+
+        asyncio.run(benchmark())
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Response serialization microbenchmark (GET /users)
+
+Compares, for pages of 1k, 10k and 100k users in a temporary database:
+- response_model: ORM objects serialized by FastAPI for a
+  response_model=list[User] route (validation from attributes, JSON mode
+  dump, JSONResponse), the path GET /users used before the fast path
+- fast (cold): row tuples encoded straight to bytes (UserService.get_users_json)
+  with every cache empty
+- fast (warm rows): same query, but the encoded users come from user_row_cache
+  (the list cache is empty, e.g. after a write to another user)
+- list cache hit: the encoded body is served from the list cache
+
+Usage (from the backend folder):
+    python -m benchmarks.serialization --sizes 1000 10000 100000 --repeat 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from config import settings
+
+
+async def best_of(repeat: int, function) -> tuple[float, bytes]:
+    """Run an async function `repeat` times and return the best time and the last result"""
+    best = float("inf")
+    result = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def run(sizes: list[int], repeat: int):
+    """Create the schema, then measure (the engine is always disposed)"""
+    from database import close_db, init_db
+
+    await init_db()
+    try:
+        await measure(sizes, repeat)
+    finally:
+        await close_db()
+
+
+async def measure(sizes: list[int], repeat: int):
+    """Fill the table and print one line per page size"""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import APIRoute, serialize_response
+    from sqlalchemy import select
+    from sqlalchemy.dialects.sqlite import insert
+
+    from database import SessionLocal
+    from models import UserDB
+    from schemas import User, UserListQuery
+    from services.user_service import UserService
+    from utils.cache import user_list_cache, user_row_cache
+    from utils.serialization import JSON_ENCODER
+
+    async with SessionLocal() as db:
+        for start in range(0, max(sizes), 10_000):
+            await db.execute(insert(UserDB), [
+                {"name": f"Benchmark User {index}", "email": f"user{index}@bench.example", "role": "Developer"}
+                for index in range(start, min(start + 10_000, max(sizes)))
+            ])
+        await db.commit()
+
+    route = APIRoute("/users", lambda: None, response_model=list[User])
+
+    print(f"🚀 Encoder: {JSON_ENCODER}, best of {repeat} runs (ms, query included)")
+    print(f"\n{'rows':>8}{'response_model':>16}{'fast (cold)':>13}{'warm rows':>11}{'list hit':>10}{'speedup':>9}")
+    async with SessionLocal() as db:
+        for size in sizes:
+            # Beyond the API's page size limit (not validated)
+            query = UserListQuery.model_construct(limit=size)
+
+            async def response_model_path() -> bytes:
+                users = (await db.scalars(select(UserDB).order_by(UserDB.id).limit(size))).all()
+                content = await serialize_response(field=route.response_field, response_content=users)
+                return JSONResponse(content).body
+
+            async def fast_cold() -> bytes:
+                user_list_cache.clear()
+                user_row_cache.clear()
+                return (await UserService.get_users_json(db, query))[0].raw
+
+            async def fast_warm_rows() -> bytes:
+                user_list_cache.clear()
+                return (await UserService.get_users_json(db, query))[0].raw
+
+            async def list_hit() -> bytes:
+                return (await UserService.get_users_json(db, query))[0].raw
+
+            baseline, expected = await best_of(repeat, response_model_path)
+            cold, body = await best_of(repeat, fast_cold)
+            warm, _ = await best_of(repeat, fast_warm_rows)
+            hit, _ = await best_of(repeat, list_hit)
+            # Same users (key order differs: User declares id last)
+            assert json.loads(body) == json.loads(expected)
+            print(f"{size:>8}{baseline*1000:>16.1f}{cold*1000:>13.1f}{warm*1000:>11.1f}{hit*1000:>10.3f}"
+                  f"{baseline / cold:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GET /users serialization microbenchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="Page sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="workshop-serialization-")
+    # Must be set before database.py is imported (the engine is created at import)
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}"
+    try:
+        asyncio.run(run(args.sizes, args.repeat))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
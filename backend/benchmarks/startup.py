@@ -0,0 +1,187 @@
+"""
+Cold start benchmark: time from process start to the first request served
+
+1. Import profile: runs `python -X importtime -c "import main"` and reports
+   the import time per top-level package, and the app's own modules.
+2. Startup: starts uvicorn in a new process and polls GET /health until it
+   answers, for a new database created from the template, a new database
+   without template (schema creation and seeding), and an existing database
+   (schema marker up to date), with compiled bytecode (.pyc) available, and
+   once without it (as in an image built without `python -m compileall`).
+   Each case runs on its own temporary database.
+
+Usage (from the backend folder):
+    python -m benchmarks.startup --repeat 5 --target-ms 300
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Top-level modules of the app (everything else is a dependency or the standard library)
+APP_MODULES = {"main", "config", "database", "models", "schemas", "routers", "services", "utils", "data"}
+
+
+# ============================================
+# Import profile
+# ============================================
+
+def import_profile(top: int):
+    """Print the self import time of `import main` grouped by top-level package"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND, capture_output=True, text=True, check=True,
+    )
+    per_package: dict[str, int] = defaultdict(int)
+    app_modules: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        package = name.split(".")[0]
+        per_package[package] += int(self_us)
+        if package in APP_MODULES:
+            app_modules[name] = int(self_us)
+
+    total = sum(per_package.values())
+    print(f"🔬 import main: {total / 1000:.0f} ms of imports (self time per top-level package)")
+    print(f"\n{'package':>24}{'ms':>8}{'share':>8}")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:>24}{self_us / 1000:>8.1f}{self_us / total:>8.1%}")
+    app_total = sum(app_modules.values())
+    print(f"\nApp modules: {app_total / 1000:.0f} ms ({app_total / total:.0%})")
+    for name, self_us in sorted(app_modules.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:>24}{self_us / 1000:>8.1f}")
+
+
+# ============================================
+# Startup
+# ============================================
+
+def free_port() -> int:
+    """Port the OS reports as free"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(env: dict) -> float:
+    """Start uvicorn and return the seconds until GET /health answers 200"""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Cheap connection attempts until the port is open (the machine may have a single CPU)
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {process.returncode}")
+                time.sleep(0.005)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=5) as response:
+            if response.status != 200:
+                raise RuntimeError(f"GET /health answered {response.status}")
+        return time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def python_startup() -> float:
+    """Seconds to start and stop a bare interpreter (the floor of any cold start)"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return time.perf_counter() - start
+
+
+def lifespan_ms(repeat: int) -> float:
+    """Median startup time of the app itself (lifespan on an existing database), in a child process"""
+    code = (
+        "import asyncio, time\n"
+        "from main import app\n"
+        "async def run():\n"
+        "    start = time.perf_counter()\n"
+        "    async with app.router.lifespan_context(app):\n"
+        "        print((time.perf_counter() - start) * 1000)\n"
+        "asyncio.run(run())\n"
+    )
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="workshop-startup-") as directory:
+        env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}",
+               "LOG_LEVEL": "WARNING"}
+        for _ in range(repeat + 1):  # The first run creates the database
+            result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, env=env,
+                                    capture_output=True, text=True, check=True)
+            samples.append(float(result.stdout.split()[-1]))
+    return statistics.median(samples[1:])
+
+
+def startup(repeat: int, target_ms: float):
+    """Print the median time to the first request per database state"""
+    # (label, extra environment, reuse the database, empty bytecode cache)
+    cases = [
+        ("new database, template", {}, False, False),
+        ("new database, no template", {"DATABASE_TEMPLATE": ""}, False, False),
+        ("existing database", {}, True, False),
+        ("existing database, no .pyc", {}, True, True),
+    ]
+    print(f"\n🚀 Time to first request (uvicorn, median of {repeat})")
+    print(f"{'case':>28}{'median ms':>11}{'min ms':>9}")
+    floor = statistics.median(python_startup() for _ in range(repeat))
+    print(f"{'bare interpreter':>28}{floor * 1000:>11.0f}{'':>9}")
+    medians = {}
+    for label, extra_env, reuse, no_bytecode in cases:
+        samples = []
+        with tempfile.TemporaryDirectory(prefix="workshop-startup-") as directory:
+            env = {**os.environ, **extra_env,
+                   "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(directory, 'users.db')}"}
+            bytecode = os.path.join(directory, "pycache")
+            if no_bytecode:
+                env["PYTHONPYCACHEPREFIX"] = bytecode
+            if reuse:
+                time_to_first_request(env)  # Creates the database and its schema marker
+            for _ in range(repeat):
+                if not reuse:
+                    for suffix in ("", "-wal", "-shm"):
+                        if os.path.exists(os.path.join(directory, f"users.db{suffix}")):
+                            os.remove(os.path.join(directory, f"users.db{suffix}"))
+                shutil.rmtree(bytecode, ignore_errors=True)
+                samples.append(time_to_first_request(env))
+        medians[label] = statistics.median(samples)
+        print(f"{label:>28}{medians[label] * 1000:>11.0f}{min(samples) * 1000:>9.0f}")
+
+    best = min(medians.values()) * 1000
+    print(f"{'app startup (lifespan)':>28}{lifespan_ms(repeat):>11.0f}")
+    verdict = "✅" if best <= target_ms else "❌"
+    print(f"\n{verdict} Fastest cold start: {best:.0f} ms (target {target_ms:g} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Starts per case (median is reported)")
+    parser.add_argument("--top", type=int, default=12, help="Packages and modules listed in the import profile")
+    parser.add_argument("--target-ms", type=float, default=300, help="Target time to the first request")
+    parser.add_argument("--skip-imports", action="store_true", help="Do not print the import profile")
+    args = parser.parse_args()
+    if not args.skip_imports:
+        import_profile(args.top)
+    startup(args.repeat, args.target_ms)
+
+
+if __name__ == "__main__":
+    main()
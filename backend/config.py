@@ -49,6 +49,61 @@ class LatencyConfig:
         return cls.LATENCY_MODES.get(mode, cls.LATENCY_MODES[LatencyMode.NO_LATENCY])
 
 
+class DatabaseProfile(str, Enum):
+    """
+    Available SQLite performance profiles
+    """
+    DEFAULT = "DEFAULT"
+    WAL = "WAL"
+    PERFORMANCE = "PERFORMANCE"
+
+
+class DatabaseConfig:
+    """
+    SQLite pragmas and connection pool settings per profile
+    Pragmas are applied to every new connection
+    """
+    PROFILES = {
+        DatabaseProfile.DEFAULT: {
+            "pragmas": {},                      # SQLite defaults: rollback journal, synchronous=FULL
+            "pool_size": 5,
+            "max_overflow": 10,
+            "cached_statements": 128,           # sqlite3 default prepared-statement cache
+            "description": "SQLite and SQLAlchemy defaults"
+        },
+        DatabaseProfile.WAL: {
+            "pragmas": {
+                "journal_mode": "WAL",          # Readers do not block the writer
+                "synchronous": "FULL",
+                "busy_timeout": 5000,           # Wait up to 5s for the write lock
+            },
+            "pool_size": 10,
+            "max_overflow": 20,
+            "cached_statements": 128,
+            "description": "WAL journal, fully durable commits"
+        },
+        DatabaseProfile.PERFORMANCE: {
+            "pragmas": {
+                "journal_mode": "WAL",
+                "synchronous": "NORMAL",        # fsync at checkpoints only (safe with WAL)
+                "cache_size": -65536,           # 64 MiB page cache per connection
+                "mmap_size": 268435456,         # 256 MiB memory-mapped reads
+                "temp_store": "MEMORY",
+                "busy_timeout": 5000,
+            },
+            "pool_size": 10,
+            "max_overflow": 20,
+            "cached_statements": 512,           # Larger prepared-statement cache
+            "description": "WAL, synchronous=NORMAL, large page cache and mmap"
+        }
+    }
+    
+    @classmethod
+    def get_profile(cls, profile: DatabaseProfile) -> dict:
+        """Get configuration for a profile"""
+        return cls.PROFILES.get(profile, cls.PROFILES[DatabaseProfile.DEFAULT])
+
+
 class Settings:
     """Application configuration"""
     
@@ -60,18 +115,110 @@ class Settings:
     # Server
     HOST: str = "0.0.0.0"
     PORT:  int = 8000
+    WORKERS: int = int(os.getenv("WORKERS", os.cpu_count() or 1))  # serve.py only
+    
+    # Runtime state shared by workers (set by serve.py; empty = single process)
+    SHARED_STATE_PATH: str = os.getenv("SHARED_STATE_PATH", "")
     
-    # Database
-    DATABASE_URL: str = "sqlite:///./users.db"
+    # Database (async driver: sqlite+aiosqlite)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./users.db")
+    DATABASE_PROFILE: DatabaseProfile = DatabaseProfile(os.getenv("DATABASE_PROFILE", "PERFORMANCE"))
+    # Prebuilt database (schema + initial users) copied into place when the file does not exist
+    # (python -m data.build_template); empty: create the schema and seed instead
+    DATABASE_TEMPLATE: str = os.getenv(
+        "DATABASE_TEMPLATE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "users_template.db")
+    )
     
     # Latency (default mode)
     DEFAULT_LATENCY_MODE: LatencyMode = LatencyMode.NO_LATENCY
     
+    # Read cache (users)
+    CACHE_MAX_ENTRIES: int = 1024     # GET /users response bodies; 0 disables caching
+    CACHE_TTL_SECONDS: float = 30.0
+    ROW_CACHE_MAX_ENTRIES: int = 200_000   # Encoded JSON per user (no TTL); 0 disables it
+    
+    # Response compression (gzip; br and zstd when brotli / zstandard are installed)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))  # Smaller bodies are sent as is
+    COMPRESSION_ENCODINGS: list[str] = ["zstd", "br", "gzip"]   # Server preference order
+    COMPRESSION_LEVELS: dict[str, int] = {
+        "gzip": int(os.getenv("COMPRESSION_LEVEL_GZIP", 6)),     # 1-9
+        "br": int(os.getenv("COMPRESSION_LEVEL_BR", 4)),         # 0-11
+        "zstd": int(os.getenv("COMPRESSION_LEVEL_ZSTD", 3)),     # 1-22
+    }
+    
+    # Request coalescing: identical concurrent reads share one query and response body
+    COALESCE_READS: bool = os.getenv("COALESCE_READS", "true").lower() in ("1", "true", "yes")
+    
+    # Group commit: single-user writes are queued and committed in batches by one writer task
+    GROUP_COMMIT: bool = os.getenv("GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+    GROUP_COMMIT_MAX_BATCH: int = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))            # Writes per transaction
+    GROUP_COMMIT_MAX_DELAY: float = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 0)) / 1000  # 0: batch what is queued
+    
+    # Admission control (utils/admission.py): rate limits, then a bounded number of requests
+    # in flight per route class; requests wait for a slot at most ADMISSION_QUEUE_BUDGET
+    ADMISSION_CONTROL: bool = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+    ADMISSION_CLIENT_RATE: float = float(os.getenv("ADMISSION_CLIENT_RATE", 0))      # Requests/s per client; 0: no limit
+    ADMISSION_CLIENT_BURST: int = int(os.getenv("ADMISSION_CLIENT_BURST", 50))
+    ADMISSION_GLOBAL_RATE: float = float(os.getenv("ADMISSION_GLOBAL_RATE", 0))      # Requests/s in total; 0: no limit
+    ADMISSION_GLOBAL_BURST: int = int(os.getenv("ADMISSION_GLOBAL_BURST", 200))
+    ADMISSION_CLIENT_HEADER: str = os.getenv("ADMISSION_CLIENT_HEADER", "")  # Client identity (empty: client address)
+    ADMISSION_MAX_CLIENTS: int = 10_000                                       # Client buckets kept (least recent dropped)
+    ADMISSION_MAX_IN_FLIGHT: dict[str, int] = {
+        "read": int(os.getenv("ADMISSION_MAX_READS", 256)),
+        "write": int(os.getenv("ADMISSION_MAX_WRITES", 32)),
+        "admin": int(os.getenv("ADMISSION_MAX_ADMIN", 4)),
+    }
+    ADMISSION_QUEUE_BUDGET: float = float(os.getenv("ADMISSION_QUEUE_BUDGET_MS", 250)) / 1000
+    ADMISSION_MAX_LOOP_LAG: float = float(os.getenv("ADMISSION_MAX_LOOP_LAG_MS", 100)) / 1000  # 0: not checked
+    ADMISSION_ADMIN_PATHS: tuple[str, ...] = ("/latency", "/cache", "/users/reset")
+    # POST routes that only read (limited as reads)
+    ADMISSION_READ_POST_PATHS: tuple[str, ...] = ("/users/batch-get",)
+    # Never limited: monitoring, documentation and long-lived streams
+    ADMISSION_EXEMPT_PATHS: tuple[str, ...] = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json", "/users/changes")
+    
+    # Idempotency keys (utils/idempotency.py): POST /users, PATCH/PUT/DELETE /users/{id}
+    IDEMPOTENCY_HEADER: str = "Idempotency-Key"
+    IDEMPOTENCY_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 3600))  # Responses kept for retries
+    IDEMPOTENCY_LOCK_SECONDS: float = 60.0     # An unfinished original (crashed worker) can be taken over after this
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0     # Longest wait of a duplicate for the original in progress
+    IDEMPOTENCY_PURGE_SECONDS: float = 60.0    # Interval between deletions of expired keys
+    IDEMPOTENCY_MAX_KEY_LENGTH: int = 255
+    
+    # Bulk endpoints (POST/PATCH/DELETE /users/bulk)
+    BULK_MAX_ITEMS: int = 100_000
+    
+    # Batch read (GET /users?ids=... and POST /users/batch-get)
+    BATCH_GET_MAX_IDS: int = 1000
+    
+    # Export (GET /users/export): rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Import (POST /users/import)
+    IMPORT_BATCH_SIZE: int = 1000          # Rows written per transaction
+    IMPORT_MAX_REPORTED_ROWS: int = 1000   # Rejected/conflict rows listed in the response
+    IMPORT_MAX_LINE_LENGTH: int = 64 * 1024  # Characters per line (CSV record); longer ones are rejected
+    
+    # Change feed (GET /users/changes)
+    CHANGE_LOG_MAX_EVENTS: int = 10_000        # Events kept for Last-Event-ID resume
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive comment interval
+    CHANGE_FEED_POLL_SECONDS: float = 0.1        # Check for writes of other workers (shared table version)
+    
+    # Delta sync (GET /users/sync)
+    SYNC_MAX_LIMIT: int = 5000                  # Changes returned per page
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30     # Older deletions are forgotten (full resync)
+    
+    # Search (GET /users/search)
+    SEARCH_MAX_LIMIT: int = 100       # Results per page
+    SEARCH_RANK_WINDOW: int = 1000    # Matches ranked by relevance (broader queries: ID order)
+    
     # CORS
     CORS_ORIGINS: list[str] = ["*"]  # In production, specify origins
     
     # Logging
-    LOG_LEVEL: str = "INFO"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")          # DEBUG shows per-request messages
+    LOG_JSON: bool = os.getenv("LOG_JSON", "false").lower() in ("1", "true", "yes")
+    REQUEST_ID_HEADER: str = "X-Request-ID"
 
 
 # Global configuration instance
@@ -0,0 +1,55 @@
+"""
+Build the database template (DATABASE_TEMPLATE)
+
+A new database file starts as a copy of the template, which already has the
+schema, the schema marker and the initial users, so the first start skips
+schema creation and seeding. Rebuild it after changing the models or the
+initial data (an outdated template still works: init_db upgrades the copy).
+
+Usage (from the backend folder):
+    python -m data.build_template
+"""
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from config import settings
+
+
+async def build():
+    """Create the schema and seed the database at DATABASE_URL"""
+    from database import SessionLocal, close_db, init_db
+    from services.user_service import UserService
+
+    await init_db()
+    try:
+        async with SessionLocal() as db:
+            await UserService.seed_database_if_empty(db)
+    finally:
+        await close_db()
+
+
+def main():
+    target = settings.DATABASE_TEMPLATE
+    directory = tempfile.mkdtemp(prefix="workshop-template-")
+    path = os.path.join(directory, "users.db")
+    # Must be set before database.py is imported (the engine is created at import)
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{path}"
+    settings.DATABASE_TEMPLATE = ""
+    try:
+        asyncio.run(build())
+        # Single file (the journal mode is stored in the file; connections set WAL again) and compact
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=DELETE")
+        connection.execute("VACUUM")
+        connection.close()
+        shutil.copyfile(path, target)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    print(f"✅ Template written to {target} ({os.path.getsize(target) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
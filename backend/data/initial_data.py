@@ -17,4 +17,18 @@ def get_initial_users() -> list[UserDB]:
             email="stan_da_boss@rti.com",
             role="Da Boss"
         ),
+    ]
+
+
+def get_initial_user_rows() -> list[dict]:
+    """
+    Get initial users as column dictionaries
+    Used for bulk inserts (no ORM objects)
+    
+    Returns:
+        List of dictionaries with name, email and role
+    """
+    return [
+        {"name": user.name, "email": user.email, "role": user.role}
+        for user in get_initial_users()
     ]
\ No newline at end of file
@@ -1,41 +1,280 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from config import settings
-
-# SQLAlchemy engine creation
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} 
-)
+import os
+import shutil
+import sqlite3
+import zlib
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from config import DatabaseConfig, DatabaseProfile, settings
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def create_engine_for_profile(url: str, profile: DatabaseProfile) -> AsyncEngine:
+    """
+    Create the async engine (aiosqlite driver) for a performance profile
+    
+    Queries run on the driver's worker thread, so they never block the event loop.
+    The profile's pragmas are applied to every new connection.
+    
+    Args:
+        url: Database URL
+        profile: SQLite performance profile
+        
+    Returns:
+        Configured async engine
+    """
+    config = DatabaseConfig.get_profile(profile)
+    options = {"connect_args": {"cached_statements": config["cached_statements"]}}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # In-memory databases use a single static connection (no pool sizing)
+        options.update(pool_size=config["pool_size"], max_overflow=config["max_overflow"])
+    
+    new_engine = create_async_engine(url, **options)
+    pragmas = config["pragmas"]
+    
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    
+    return new_engine
+
 
-# Close sesión
-SessionLocal = sessionmaker(
-    autocommit=False,
+# SQLAlchemy async engine creation
+engine = create_engine_for_profile(settings.DATABASE_URL, settings.DATABASE_PROFILE)
+
+# Async session factory
+# expire_on_commit=False keeps returned objects readable after commit
+# (lazy reloads are not allowed with AsyncSession)
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
     autoflush=False,
-    bind=engine
+    expire_on_commit=False
 )
 
 # Models database
 Base = declarative_base()
 
 
-def init_db():
+async def init_db():
     """
     Initialize the database
-    Creates tables if they do not exist
+    
+    A new database file starts as a copy of DATABASE_TEMPLATE (schema and
+    initial users). Tables, indexes and triggers are then created or upgraded,
+    unless the schema marker (PRAGMA user_version) shows they are up to date.
     """
     from models import UserDB  # Import here to avoid circular imports
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database initialized")
+    fingerprint = schema_fingerprint()
+    _copy_template(fingerprint)
+    async with engine.begin() as conn:
+        current = (await conn.exec_driver_sql("PRAGMA user_version")).scalar()
+        if current != fingerprint:
+            await conn.run_sync(upgrade_schema)
+            await conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+            logger.info("🧱 Database schema created or upgraded (marker %d)", fingerprint)
+        await conn.run_sync(_prune_tombstones)
+    logger.info("✅ Database initialized")
+
+
+def schema_fingerprint() -> int:
+    """
+    Schema marker stored in PRAGMA user_version
+    
+    Checksum of the DDL init_db creates (tables, indexes, sync and search
+    triggers, search index), so any change to the models or the DDL makes
+    the next start check the schema again.
+    
+    Returns:
+        Positive 31-bit integer (user_version is a signed 32-bit integer)
+    """
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from models import SEARCH_INDEX_DDL, SEARCH_RANK_SQL, SEARCH_TRIGGERS, SYNC_TRIGGERS
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(str(CreateIndex(index).compile(dialect=engine.dialect)))
+    statements += [*SYNC_TRIGGERS, SEARCH_INDEX_DDL, SEARCH_RANK_SQL, *SEARCH_TRIGGERS]
+    return zlib.crc32("\n".join(statements).encode("utf-8")) & 0x7FFFFFFF
+
+
+def upgrade_schema(sync_conn):
+    """
+    Create the missing tables, columns, indexes and triggers
+    Safe to run on a database of any earlier version (or an empty one).
+    """
+    Base.metadata.create_all(sync_conn)
+    _add_sync_columns(sync_conn)
+    _add_idempotency_columns(sync_conn)
+    _create_missing_indexes(sync_conn)
+    _install_sync_triggers(sync_conn)
+    _install_search_index(sync_conn)
+
+
+def _copy_template(fingerprint: int):
+    """
+    Copy DATABASE_TEMPLATE into place if the database file does not exist yet
+    
+    The copy is only used if its schema marker matches the current schema (an
+    outdated or broken template is skipped: init_db creates the schema and
+    the users are seeded instead). It is linked into place atomically, so a
+    file another process has just created is never replaced. Where hard links
+    are not supported, it is renamed into place instead.
+    
+    Args:
+        fingerprint: Current schema marker (schema_fingerprint())
+    """
+    path = make_url(settings.DATABASE_URL).database
+    template = settings.DATABASE_TEMPLATE
+    if not path or path == ":memory:" or not template or os.path.exists(path) or not os.path.exists(template):
+        return
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        shutil.copyfile(template, temporary)
+        marker = _read_user_version(temporary)
+        if marker != fingerprint:
+            logger.warning(
+                "⚠️  Database template %s is out of date or unreadable (python -m data.build_template): not used",
+                template
+            )
+            return
+        try:
+            os.link(temporary, path)
+        except FileExistsError:
+            return
+        except OSError:
+            # No hard links on this filesystem: rename (not atomic with the check)
+            if os.path.exists(path):
+                return
+            os.replace(temporary, path)
+        logger.info("🌱 Database created from template %s", template)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def _read_user_version(path: str) -> Optional[int]:
+    """PRAGMA user_version of a database file (None if it is not a SQLite database)"""
+    try:
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return connection.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            connection.close()
+    except sqlite3.DatabaseError:
+        return None
+
+
+def _add_sync_columns(sync_conn):
+    """
+    Add the delta sync columns to a users table created before they existed
+    (ALTER TABLE; create_all does not change existing tables)
+    """
+    columns = {row[1] for row in sync_conn.exec_driver_sql("PRAGMA table_info(users)")}
+    if "version" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    if "updated_at" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE users ADD COLUMN updated_at VARCHAR")
+    if "created_version" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE users ADD COLUMN created_version INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_idempotency_columns(sync_conn):
+    """
+    Add the stored response headers to an idempotency_keys table created before they existed
+    (ALTER TABLE; create_all does not change existing tables)
+    """
+    columns = {row[1] for row in sync_conn.exec_driver_sql("PRAGMA table_info(idempotency_keys)")}
+    if "headers" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE idempotency_keys ADD COLUMN headers VARCHAR")
+
+
+def _install_sync_triggers(sync_conn):
+    """
+    Create the sync counter row and the triggers maintaining versions and tombstones
+    Rows written before the triggers existed join the sync at version 1.
+    Existing sync triggers are replaced (their DDL may have changed).
+    """
+    from models import SYNC_TRIGGERS, UTC_NOW_SQL
+    sync_conn.exec_driver_sql("INSERT OR IGNORE INTO sync_state (id, version, min_version) VALUES (1, 0, 0)")
+    backfilled = sync_conn.exec_driver_sql(
+        f"UPDATE users SET version = 1, updated_at = {UTC_NOW_SQL} WHERE version = 0"
+    ).rowcount
+    if backfilled:
+        sync_conn.exec_driver_sql("UPDATE sync_state SET version = max(version, 1) WHERE id = 1")
+    names = sync_conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'users_sync_%'"
+    ).scalars().all()
+    for name in names:
+        sync_conn.exec_driver_sql(f"DROP TRIGGER {name}")
+    for trigger in SYNC_TRIGGERS:
+        sync_conn.exec_driver_sql(trigger)
+
+
+def _install_search_index(sync_conn):
+    """
+    Create the FTS5 search index and the triggers keeping it up to date
+    A new index is built from the existing rows (once: triggers maintain it afterwards)
+    """
+    from models import SEARCH_INDEX_DDL, SEARCH_RANK_SQL, SEARCH_TRIGGERS
+    exists = sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'"
+    ).scalar()
+    if not exists:
+        sync_conn.exec_driver_sql(SEARCH_INDEX_DDL)
+        sync_conn.exec_driver_sql("INSERT INTO users_fts(users_fts) VALUES('rebuild')")
+        sync_conn.exec_driver_sql(SEARCH_RANK_SQL)
+        logger.info("🔎 Search index built")
+    for trigger in SEARCH_TRIGGERS:
+        sync_conn.exec_driver_sql(trigger)
+
 
-def get_db():
+def _prune_tombstones(sync_conn):
+    """
+    Delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS
+    Clients syncing from before the pruned versions get a full resync
+    """
+    from models import UTC_NOW_SQL
+    cutoff = UTC_NOW_SQL.replace("'now'", f"'now', '-{settings.SYNC_TOMBSTONE_RETENTION_DAYS} days'")
+    pruned_version = sync_conn.exec_driver_sql(
+        f"SELECT max(version) FROM user_tombstones WHERE deleted_at < {cutoff}"
+    ).scalar()
+    if pruned_version is not None:
+        sync_conn.exec_driver_sql(f"DELETE FROM user_tombstones WHERE version <= {int(pruned_version)}")
+        sync_conn.exec_driver_sql(
+            f"UPDATE sync_state SET min_version = max(min_version, {int(pruned_version)}) WHERE id = 1"
+        )
+
+
+def _create_missing_indexes(sync_conn):
+    """
+    Create indexes added to the models after the table already existed
+    (create_all skips existing tables together with their indexes)
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+
+
+async def close_db():
+    """
+    Close all pooled database connections
+    """
+    await engine.dispose()
+
+
+async def get_db():
     """
     Dependency to get database session
     Used with FastAPI Depends()
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
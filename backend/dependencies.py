@@ -2,13 +2,13 @@
 Shared dependencies for FastAPI
 """
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 
 
-def get_database_session() -> Session:
+def get_database_session() -> AsyncSession:
     """
     Dependency to get database session
     Wrapper over database.get_db() for clarity
     """
-    return Depends(get_db)
\ No newline at end of file
+    return Depends(get_db)
@@ -1,16 +1,35 @@
 """
 Application entry point
 Configures FastAPI and registers routers
+
+Each worker process runs the app in a single event loop thread. The
+in-process state of utils/ (caches, single-flights, change feed, write
+queue, admission control, idempotency keys, metrics) is only used from that
+thread, so it takes no locks. State shared between workers goes through
+SQLite or utils/shared_state.py.
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from config import settings
-from database import init_db, get_db
-from routers import users, latency  # ← IMPORT latency router
-from services.user_service import UserService
-from utils.delay import latency_manager  # ← IMPORT latency manager
+from database import init_db, close_db, engine, SessionLocal
+from routers import users, latency, cache, metrics  # ← IMPORT routers
+from services.user_service import UserService, user_changes, user_idempotency, user_write_queue
+from utils.admission import AdmissionMiddleware, admission
+from utils.cache import user_list_cache, user_row_cache
+from utils.coalesce import user_flight, user_list_flight
+from utils.compression import CompressionMiddleware, compression_stats
+from utils.delay import LatencyScopeMiddleware, latency_manager  # ← IMPORT latency manager
+from utils.idempotency import IdempotencyMiddleware
+from utils.log import RequestIdMiddleware, get_logger, setup_logging, shutdown_logging
+from utils.metrics import (
+    MetricsMiddleware, add_admission_collector, add_cache_collector, add_change_feed_collector, add_coalescing_collector,
+    add_compression_collector, add_group_commit_collector, add_idempotency_collector, add_pool_collector,
+    instrument_engine
+)
+
+logger = get_logger(__name__)
 
 
 @asynccontextmanager
@@ -20,32 +39,36 @@ async def lifespan(app: FastAPI):
     Runs on startup and shutdown
     """
     # Startup
-    print(f"\n{'='*60}")
-    print(f"🚀 Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    print(f"{'='*60}\n")
+    # Logging (background writer thread, level from LOG_LEVEL)
+    setup_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+    logger.info("🚀 Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
     
     # Initialize database
-    init_db()
+    await init_db()
     
     # Populate with initial data if empty
-    db = next(get_db())
-    UserService.seed_database_if_empty(db)
-    db.close()
+    async with SessionLocal() as db:
+        await UserService.seed_database_if_empty(db)
     
     # Show latency configuration
     config = latency_manager.get_config()
-    print(f"🎛️  Latency mode: {latency_manager.current_mode.value}")
-    print(f"   📖 Read:    {config['read']*1000:.0f}ms")
-    print(f"   ✏️  Write: {config['write']*1000:.0f}ms")
+    logger.info(
+        "🎛️  Latency mode: %s (read %.0fms / write %.0fms)",
+        latency_manager.current_mode.value, config['read'] * 1000, config['write'] * 1000
+    )
     
-    print(f"\n✅ Server ready at http://{settings.HOST}:{settings.PORT}")
-    print(f"📚 Documentation: http://{settings.HOST}:{settings.PORT}/docs")
-    print(f"🎛️  Latency: http://{settings.HOST}:{settings.PORT}/latency\n")
+    logger.info("✅ Server ready at http://%s:%s", settings.HOST, settings.PORT)
+    logger.info("📚 Documentation: http://%s:%s/docs", settings.HOST, settings.PORT)
+    logger.info("🎛️  Latency: http://%s:%s/latency", settings.HOST, settings.PORT)
     
     yield  # App is running here
     
     # Shutdown
-    print("\n👋 Closing application...")
+    await user_write_queue.close()  # Commit the queued writes (GROUP_COMMIT)
+    await admission.close()
+    await close_db()
+    logger.info("👋 Closing application...")
+    shutdown_logging()
 
 
 # Create FastAPI instance
@@ -56,6 +79,22 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Middleware stack: each add_middleware() wraps the previous ones, so the
+# order of a request is the reverse of the order below:
+# RequestId -> Metrics -> LatencyScope -> Compression -> CORS -> Idempotency -> Admission -> routes
+
+# Admission control: rate limits and bounded requests in flight (429/503 with Retry-After)
+# Inside CORS, so browsers can read the rejections
+app.add_middleware(AdmissionMiddleware, controller=admission, client_header=settings.ADMISSION_CLIENT_HEADER)
+
+# Idempotency-Key on single-user writes: retries replay the stored response
+# Outside admission control, so retries and duplicates do not take write slots;
+# its rejections (429/503) come before routing and are not stored
+app.add_middleware(
+    IdempotencyMiddleware, store=user_idempotency,
+    header_name=settings.IDEMPOTENCY_HEADER, max_key_length=settings.IDEMPOTENCY_MAX_KEY_LENGTH,
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -63,11 +102,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id", "ETag", "Last-Modified", "Retry-After", "Idempotent-Replayed",
+                    settings.REQUEST_ID_HEADER],
 )
 
+# Response compression (gzip/br/zstd negotiated with Accept-Encoding)
+app.add_middleware(CompressionMiddleware, min_size=settings.COMPRESSION_MIN_SIZE)
+
+# Request scope for per-route latency profiles
+app.add_middleware(LatencyScopeMiddleware)
+
+# Request metrics, inside RequestId only: the latency histogram includes
+# compression, CORS, idempotency waits and replays, admission queueing and
+# rejections, and the handler. The "delay" and "db" phases are measured in
+# the handler; "app" is the rest. Requests answered before routing (replays,
+# rejections) are labelled route="unmatched"
+app.add_middleware(MetricsMiddleware)
+
+# Correlation ID for log records (X-Request-ID)
+app.add_middleware(RequestIdMiddleware, header_name=settings.REQUEST_ID_HEADER)
+instrument_engine(engine)
+add_pool_collector(engine)
+add_cache_collector(user_list_cache, user_row_cache)
+add_change_feed_collector(user_changes)
+add_coalescing_collector(user_flight, user_list_flight)
+add_compression_collector(compression_stats)
+add_group_commit_collector(user_write_queue)
+add_admission_collector(admission)
+add_idempotency_collector(user_idempotency)
+
 # Register routers
 app.include_router(users.router)
 app.include_router(latency.router)  # ← REGISTER latency router
+app.include_router(cache.router)
+app.include_router(metrics.router)
 
 
 @app.get("/", tags=["info"])
@@ -83,18 +151,33 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "users": {
-                "GET /users": "List all users",
+                "GET /users": "List users (after_id, limit, role, email_prefix, fields)",
+                "GET /users/export": "Export users as NDJSON or CSV (streamed)",
+                "GET /users/changes": "Stream user changes (Server-Sent Events)",
+                "GET /users/sync": "Users changed or deleted since a version (delta sync)",
+                "GET /users/search?q=": "Full-text prefix search on name, email and role",
                 "GET /users/{id}": "Get a user",
                 "POST /users": "Create a user",
                 "PATCH /users/{id}": "Update a user",
                 "DELETE /users/{id}": "Delete a user",
+                "POST /users/import": "Import users from an NDJSON or CSV upload",
+                "POST /users/bulk": "Create many users",
+                "PATCH /users/bulk": "Update many users",
+                "DELETE /users/bulk": "Delete many users",
                 "POST /users/reset": "Reset database"
             },
             "latency": {
                 "GET /latency": "View current latency status",
                 "GET /latency/modes": "View all available modes",
-                "POST /latency": "Change latency mode",
+                "POST /latency": "Change latency mode or upload a per-route latency profile",
                 "POST /latency/reset": "Reset to default mode"
+            },
+            "cache": {
+                "GET /cache": "View user cache statistics",
+                "POST /cache/clear": "Clear the user caches"
+            },
+            "metrics": {
+                "GET /metrics": "Request latency histograms, pool and cache stats (Prometheus format)"
             }
         },
         "current_latency": {
@@ -1,9 +1,14 @@
 """
 SQLAlchemy models (represent database tables)
 """
-from sqlalchemy import Column, Integer, String
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import CheckConstraint, Column, Float, Integer, LargeBinary, String
 from database import Base
 
+# SQLite expression for the current UTC time (ISO 8601, milliseconds)
+UTC_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
 
 class UserDB(Base):
     """
@@ -14,13 +19,171 @@ class UserDB(Base):
         name: Full name of the user
         email: Unique email of the user
         role: Role of the user
+        version: Sync version of the last change (set by triggers)
+        created_version: Sync version of the creation (set by triggers)
+        updated_at: Time of the last change (set by triggers)
     """
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True, index=True)
-    role = Column(String, nullable=False)
+    role = Column(String, nullable=False, index=True)
+    version = Column(Integer, nullable=False, server_default="0", index=True)
+    created_version = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(String, nullable=True)
     
     def __repr__(self):
-        return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
\ No newline at end of file
+        return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
+
+
+class UserTombstoneDB(Base):
+    """
+    Deleted users, kept so delta sync can report deletions
+    
+    Attributes:
+        id: ID of the deleted user
+        version: Sync version of the deletion
+        deleted_at: Time of the deletion
+    """
+    __tablename__ = "user_tombstones"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, index=True)
+    deleted_at = Column(String, nullable=False)
+
+
+class SyncStateDB(Base):
+    """
+    Single-row table with the sync version counter
+    
+    Attributes:
+        version: Latest sync version (incremented by every user change)
+        min_version: Oldest version deltas can start from (older tombstones were pruned)
+    """
+    __tablename__ = "sync_state"
+    __table_args__ = (CheckConstraint("id = 1"),)
+    
+    id = Column(Integer, primary_key=True, default=1)
+    version = Column(Integer, nullable=False, default=0)
+    min_version = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKeyDB(Base):
+    """
+    Response of a write sent with an Idempotency-Key header (utils/idempotency.py)
+    
+    Attributes:
+        key: Idempotency-Key sent by the client
+        fingerprint: SHA-256 of the method, path and body of the original request
+        status_code: Status of the stored response (NULL while the original is in progress)
+        content_type: Content-Type of the stored response
+        headers: Location, ETag and Retry-After of the stored response (JSON list of [name, value])
+        body: Body of the stored response
+        expires_at: Unix time after which the key can be reused (and is purged)
+    """
+    __tablename__ = "idempotency_keys"
+    __table_args__ = {"sqlite_with_rowid": False}  # Rows stored in the primary key index
+    
+    key = Column(String, primary_key=True)
+    fingerprint = Column(LargeBinary, nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String, nullable=True)
+    headers = Column(String, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(Float, nullable=False, index=True)
+
+
+@dataclass(slots=True)
+class UserRow:
+    """
+    Read model of a user, built from a column tuple (select(*USER_COLUMNS))
+    
+    Plain slots: no ORM instance state, identity map entry or __dict__,
+    and no Pydantic validation. orjson encodes it natively.
+    """
+    id: int
+    name: str
+    email: str
+    role: str
+
+
+@dataclass(slots=True)
+class UserChangeRow(UserRow):
+    """Read model of a changed user for delta sync (select(*USER_CHANGE_COLUMNS))"""
+    version: int
+    updated_at: Optional[str]
+
+
+# Columns of the read models, in field order
+USER_COLUMNS = (UserDB.id, UserDB.name, UserDB.email, UserDB.role)
+USER_CHANGE_COLUMNS = USER_COLUMNS + (UserDB.version, UserDB.updated_at)
+
+
+# Triggers maintaining UserDB.version/updated_at, tombstones and the counter
+# (AFTER UPDATE OF the data columns only, so the stamping UPDATE does not recurse)
+SYNC_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_sync_insert AFTER INSERT ON users
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1;
+        UPDATE users SET version = (SELECT version FROM sync_state WHERE id = 1),
+                         created_version = (SELECT version FROM sync_state WHERE id = 1), updated_at = {UTC_NOW_SQL}
+        WHERE id = NEW.id;
+        DELETE FROM user_tombstones WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_sync_update AFTER UPDATE OF name, email, role ON users
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1;
+        UPDATE users SET version = (SELECT version FROM sync_state WHERE id = 1), updated_at = {UTC_NOW_SQL}
+        WHERE id = NEW.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS users_sync_delete AFTER DELETE ON users
+    BEGIN
+        UPDATE sync_state SET version = version + 1 WHERE id = 1;
+        INSERT OR REPLACE INTO user_tombstones (id, version, deleted_at)
+        VALUES (OLD.id, (SELECT version FROM sync_state WHERE id = 1), {UTC_NOW_SQL});
+    END
+    """,
+)
+
+
+# Full-text index of the users (external content: the text stays in 'users')
+# Prefix indexes of 1-3 characters keep prefix queries off full term scans
+SEARCH_INDEX_DDL = """
+    CREATE VIRTUAL TABLE users_fts USING fts5(
+        name, email, role,
+        content='users', content_rowid='id',
+        prefix='1 2 3', tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+
+# Default ranking: BM25 with matches in the name weighted over email and role
+SEARCH_RANK_SQL = "INSERT INTO users_fts(users_fts, rank) VALUES('rank', 'bm25(10.0, 5.0, 1.0)')"
+
+# Triggers keeping users_fts in sync with the users table
+SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO users_fts(rowid, name, email, role) VALUES (NEW.id, NEW.name, NEW.email, NEW.role);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email, role ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email, role) VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.role);
+        INSERT INTO users_fts(rowid, name, email, role) VALUES (NEW.id, NEW.name, NEW.email, NEW.role);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users
+    BEGIN
+        INSERT INTO users_fts(users_fts, rowid, name, email, role) VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.role);
+    END
+    """,
+)
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Router to inspect and clear the user read cache
+"""
+from fastapi import APIRouter
+from schemas import CacheStatus
+from utils.cache import user_list_cache, user_row_cache, users_version
+from utils.coalesce import user_flight, user_list_flight
+
+# Create router
+router = APIRouter(
+    prefix="/cache",
+    tags=["cache"],
+)
+
+
+def _cache_status() -> dict:
+    """Build the current cache status"""
+    return {
+        "table_version": users_version.version,
+        "etag": users_version.etag,
+        "last_modified": users_version.last_modified_http,
+        "user_list": user_list_cache.stats(),
+        "user_json": user_row_cache.stats(),
+        "coalescing": {flight.name: flight.stats() for flight in (user_flight, user_list_flight)},
+    }
+
+
+@router.get(
+    "",
+    response_model=CacheStatus,
+    summary="Get cache statistics"
+)
+async def get_cache_status():
+    """
+    Get hit/miss/eviction counters of the user caches, and how many
+    concurrent identical reads were coalesced
+    
+    Use them to size `CACHE_MAX_ENTRIES` and `CACHE_TTL_SECONDS`
+    """
+    return _cache_status()
+
+
+@router.post(
+    "/clear",
+    response_model=CacheStatus,
+    summary="Clear the user caches",
+    tags=["admin"]
+)
+async def clear_cache():
+    """
+    Drop every cached user and user list
+    
+    The table version is not changed, so client ETags stay valid
+    """
+    user_list_cache.clear()
+    user_row_cache.clear()
+    return _cache_status()
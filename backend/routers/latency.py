@@ -62,7 +62,7 @@ async def get_latency_modes():
 )
 async def set_latency_mode(request: LatencyModeRequest):
     """
-    Change the API's latency mode
+    Change the API's latency mode and/or upload a latency profile
     
     **Body:**
     ```json
@@ -71,6 +71,29 @@ async def set_latency_mode(request: LatencyModeRequest):
     }
     ```
     
+    **Profile (per route/method rules, first match applies):**
+    ```json
+    {
+      "profile": {
+        "name": "production-tail",
+        "seed": 42,
+        "rules": [
+          {
+            "route": "/users/{user_id}",
+            "method": "GET",
+            "delay": {"type": "lognormal", "median": 0.05, "sigma": 0.5},
+            "spike_probability": 0.01,
+            "spike": {"type": "uniform", "low": 1.0, "high": 3.0},
+            "error_probability": 0.005
+          }
+        ]
+      }
+    }
+    ```
+    Distributions: `constant`, `uniform`, `normal`, `lognormal`, `pareto`.
+    Requests matching no rule use the current mode. Sending only a mode
+    removes the active profile.
+    
     **Available modes:**
     - `NO_LATENCY`: No latency (0ms)
     - `LOW_LATENCY`: Low latency (100ms read / 150ms write)
@@ -83,7 +106,7 @@ async def set_latency_mode(request: LatencyModeRequest):
     **Effect:**
     All user endpoints will apply the new delays immediately
     """
-    status = LatencyService.set_latency_mode(request.mode)
+    status = LatencyService.apply_settings(request.mode, request.profile)
     return status
 
 
@@ -94,7 +117,7 @@ async def set_latency_mode(request: LatencyModeRequest):
 )
 async def reset_latency():
     """
-    Reset latency to the default mode (NO_LATENCY)
+    Reset latency to the default mode (NO_LATENCY) and remove the active profile
     
     **Returns:**
     Updated status with the default mode
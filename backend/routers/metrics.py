@@ -0,0 +1,28 @@
+"""
+Router exposing server-side metrics in Prometheus text format
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from utils.metrics import registry
+
+# Create router
+router = APIRouter(
+    tags=["metrics"],
+)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics"
+)
+async def get_metrics():
+    """
+    Get request latency histograms, in-flight requests, DB pool and cache stats
+    
+    Values are aggregated per worker process.
+    
+    Returns:
+        Metrics in Prometheus text exposition format (version 0.0.4)
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -1,12 +1,24 @@
 """
 Router with all endpoints related to users
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from database import get_db
-from schemas import User, UserCreate, UserUpdate
-from services.user_service import UserService
+from typing import Annotated, Awaitable, Callable, Hashable, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import SessionLocal, get_db
+from config import settings
+from schemas import (
+    User, UserCreate, UserUpdate, UserPartial, UserListQuery, UserExportQuery,
+    UserBulkUpdate, UserBulkDelete, BulkResult, ImportResult, UserSyncQuery, UserSyncResult,
+    UserSearchQuery, UserSearchResult, UserBatchGet, UserBatchResult
+)
+from services.user_service import UserService, user_changes
+from utils.cache import users_version
+from utils.coalesce import SingleFlight, user_flight, user_list_flight
+from utils.compression import PrecompressedBody, negotiate
 from utils.delay import delay_get, delay_post, delay_patch, delay_delete
+from utils.serialization import dumps
+from utils.streaming import EXPORT_MEDIA_TYPES, csv_stream, ndjson_stream, parse_csv, parse_ndjson
 
 # Create router
 router = APIRouter(
@@ -16,31 +28,359 @@ router = APIRouter(
 )
 
 
-@router.get("", response_model=list[User], summary="List all users")
-async def get_users(db: Session = Depends(get_db)):
+def _validators() -> dict[str, str]:
+    """ETag/Last-Modified validators of the current version of the users table"""
+    return {
+        "ETag": users_version.etag,
+        "Last-Modified": users_version.last_modified_http,
+        "Cache-Control": "no-cache",
+    }
+
+
+async def _coalesced_read(
+    request: Request,
+    flight: SingleFlight,
+    key: Hashable,
+    read: Callable[[], Awaitable[tuple[PrecompressedBody, dict[str, str]]]]
+) -> Response:
+    """
+    Answer a read through its single-flight: identical concurrent reads share
+    the simulated delay, the query and the serialized (and compressed) body
+    
+    The validators are taken before the read starts: if a write commits
+    meanwhile, the ETag is older than the body and only causes a refetch.
+    The table version is part of the key, so a read that starts after a
+    committed write never joins a flight started before it.
+    
+    Args:
+        request: Current request (for If-None-Match)
+        flight: Single-flight of the endpoint
+        key: Identifies identical reads (request parameters)
+        read: Coroutine function returning the body and extra headers
+        
+    Returns:
+        JSON response (compressed as negotiated with Accept-Encoding),
+        or 304 if the client's copy (If-None-Match) is current
+    """
+    headers = _validators()
+    if users_version.matches(request.headers.get("if-none-match")):
+        await delay_get()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body, read_headers = await flight.run((users_version.version, key), read)
+    content, content_encoding = body.encoded(negotiate(request.headers.get("accept-encoding")))
+    headers.update(read_headers)
+    headers["Vary"] = "Accept-Encoding"
+    if content_encoding is not None:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@router.get(
+    "",
+    response_model=list[UserPartial] | UserBatchResult,
+    response_model_exclude_unset=True,
+    summary="List users (paginated, filtered)"
+)
+async def get_users(query: Annotated[UserListQuery, Query()], request: Request):
     """
-    Get list of all users
+    Get list of users
     
+    - **after_id**: Cursor, only users with a greater ID are returned
+    - **limit**: Page size (all users if omitted)
+    - **role**: Only users with this role
+    - **email_prefix**: Only users whose email starts with this prefix
+    - **fields**: Comma-separated fields to return, e.g. `name,email` (ID always included)
+    - **ids**: Comma-separated IDs, e.g. `1,2,3`: batch lookup, same result as
+      `POST /users/batch-get` (cannot be combined with the other parameters)
     - **Simulates latency** according to configuration
-    - **Returns** list of users with all their data
+    - **Returns** list of users ordered by ID; when the page is full the
+      `X-Next-After-Id` header holds the cursor for the next page
+    - **304** if `If-None-Match` matches the current `ETag`
+    - **Coalesced**: identical concurrent requests share one read
+    """
+    async def read() -> tuple[PrecompressedBody, dict[str, str]]:
+        await delay_get()
+        if query.ids is not None:
+            async with SessionLocal() as db:
+                return PrecompressedBody(await UserService.get_users_by_ids_json(db, query.id_list)), {}
+        async with SessionLocal() as db:
+            body, next_after_id = await UserService.get_users_json(db, query)
+        headers = {}
+        if next_after_id is not None:
+            headers["X-Next-After-Id"] = str(next_after_id)
+        return body, headers
+    
+    return await _coalesced_read(request, user_list_flight, tuple(query.model_dump().values()), read)
+
+
+@router.get(
+    "/export",
+    summary="Export users as NDJSON or CSV (streamed)",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}}
+)
+async def export_users(query: Annotated[UserExportQuery, Query()]):
+    """
+    Stream users with a server-side cursor
+    
+    - **format**: `ndjson` (default) or `csv`
+    - **Same filters** as `GET /users` (after_id, limit, role, email_prefix, fields)
+    - **Memory stays flat**: rows are fetched and sent in batches
+    - **Trailer line** with the number of rows: `{"_count": N}` (NDJSON)
+      or `#count,N` (CSV)
+    """
+    await delay_get()
+    batches = UserService.stream_users(query)
+    if query.format == "csv":
+        body = csv_stream(batches, query.field_list)
+    else:
+        body = ndjson_stream(batches, query.field_list)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[query.format],
+        headers={"Content-Disposition": f'attachment; filename="users.{query.format}"'}
+    )
+
+
+@router.get(
+    "/changes",
+    summary="Stream user changes (Server-Sent Events)",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}}
+)
+async def user_changes_stream(
+    request: Request,
+    last_event_id: Optional[int] = Query(None, ge=0, description="Resume after this event (EventSource sends the Last-Event-ID header instead)")
+):
+    """
+    Server-Sent Events feed of user changes, to apply deltas instead of refetching the list
+    
+    - **created** / **updated**: `data` is the user
+    - **deleted**: `data` is `{"id": ...}`
+    - **reset**: the table was reset, or the changes since the requested
+      position can no longer be replayed; reload the full list
+    - **Resume**: reconnecting with `Last-Event-ID` (or `?last_event_id=`) replays
+      the events missed while disconnected
+    - **Keep-alive** comments are sent when idle
+    
+    Event IDs are the sync versions of the database (as in `GET /users/sync`),
+    so a client can resume on any worker process.
+    """
+    header = request.headers.get("last-event-id")
+    if header is not None:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be an integer")
+    return StreamingResponse(
+        user_changes.subscribe(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get(
+    "/sync",
+    response_model=UserSyncResult,
+    summary="Get users changed since a version (delta sync)"
+)
+async def sync_users(
+    query: Annotated[UserSyncQuery, Query()],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get only the users created, updated or deleted after version `since`
+    
+    - **since**: `version` returned by the previous sync (0 or omitted: full sync)
+    - **limit**: Maximum changes per response; if `has_more` is true, request
+      again with the returned `version`
+    - **reset**: true when the response is a full copy (first sync, or the
+      client is older than the retained deletions): replace the local copy
+    - **changed**: users in version order; **deleted**: IDs to remove
+    """
+    await delay_get()
+    result = await UserService.sync_users(db, query)
+    return Response(content=dumps(result), media_type="application/json")
+
+
+@router.get(
+    "/search",
+    response_model=UserSearchResult,
+    summary="Search users by name, email or role"
+)
+async def search_users(
+    query: Annotated[UserSearchQuery, Query()],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Full-text search with prefix matching (`q=ada lov` finds "Ada Lovelace")
+    
+    - **q**: Words to search; every word must match the start of a word in
+      the name, email or role (case and accents are ignored)
+    - **limit** / **offset**: Page of results; `has_more` tells if there is a next page
+    - **ranked**: true if results are ordered by relevance; very broad
+      queries (more than SEARCH_RANK_WINDOW matches) are returned in ID order
+    """
+    await delay_get()
+    result = await UserService.search_users(db, query)
+    return Response(content=dumps(result), media_type="application/json")
+
+
+@router.post(
+    "/import",
+    response_model=ImportResult,
+    response_model_exclude_none=True,
+    summary="Import users from an NDJSON or CSV upload (streamed)",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {media_type: {"schema": {"type": "string"}} for media_type in EXPORT_MEDIA_TYPES.values()}
+        }
+    }
+)
+async def import_users(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = Query(None, description="Upload format (taken from Content-Type if omitted)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import a large NDJSON or CSV upload
+    
+    - **Body**: raw NDJSON (one user object per line) or CSV with a
+      `name,email,role` header; files produced by `GET /users/export` work as is
+    - The upload is **parsed incrementally** and written in batches of
+      `IMPORT_BATCH_SIZE` rows, so it is never held in memory
+    - **Simulates latency** once for the whole import
+    - Lines (CSV records) longer than `IMPORT_MAX_LINE_LENGTH` are rejected
+    - **Returns** totals, per-batch throughput, rejected rows with reasons
+      and duplicate-email conflicts
+    """
+    file_format = format or _format_from_content_type(request.headers.get("content-type", ""))
+    await delay_post()
+    parser = parse_csv if file_format == "csv" else parse_ndjson
+    rows = parser(request.stream(), settings.IMPORT_MAX_LINE_LENGTH)
+    return await UserService.import_users(db, rows, file_format)
+
+
+def _format_from_content_type(content_type: str) -> str:
+    """Choose the import format from the Content-Type header"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    if media_type in ("application/x-ndjson", "application/jsonl", "application/json", "text/plain", ""):
+        return "ndjson"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f"Unsupported Content-Type {media_type}, use application/x-ndjson or text/csv (or ?format=)"
+    )
+
+
+# ============================================
+# Bulk operations
+# (declared before /{user_id} so "bulk" is not taken as an ID)
+# ============================================
+
+def _check_bulk_size(count: int):
+    """Reject bulk requests above the configured maximum"""
+    if count > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Bulk requests are limited to {settings.BULK_MAX_ITEMS} items ({count} sent)"
+        )
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkResult,
+    response_model_exclude_none=True,
+    summary="Create many users"
+)
+async def bulk_create_users(users: list[UserCreate], db: AsyncSession = Depends(get_db)):
+    """
+    Create many users in a single transaction
+    
+    - **Body**: list of users (name, email, role)
+    - **Simulates latency** once for the whole batch
+    - **Returns** a summary and one result per item: `created` (with its ID)
+      or `conflict` (email already registered or repeated in the batch)
+    """
+    _check_bulk_size(len(users))
+    await delay_post()
+    return await UserService.bulk_create_users(db, users)
+
+
+@router.patch(
+    "/bulk",
+    response_model=BulkResult,
+    response_model_exclude_none=True,
+    summary="Update many users"
+)
+async def bulk_update_users(updates: list[UserBulkUpdate], db: AsyncSession = Depends(get_db)):
+    """
+    Update many users in a single transaction
+    
+    - **Body**: list of partial updates, each with the `id` of the user to change
+    - **Simulates latency** once for the whole batch
+    - **Returns** a summary and one result per item: `updated`, `not_found`,
+      `conflict` (email already registered) or `invalid` (no fields)
+    """
+    _check_bulk_size(len(updates))
+    await delay_patch()
+    return await UserService.bulk_update_users(db, updates)
+
+
+@router.delete(
+    "/bulk",
+    response_model=BulkResult,
+    response_model_exclude_none=True,
+    summary="Delete many users"
+)
+async def bulk_delete_users(request: UserBulkDelete, db: AsyncSession = Depends(get_db)):
+    """
+    Delete many users in a single transaction
+    
+    - **Body**: `{"ids": [1, 2, 3]}`
+    - **Simulates latency** once for the whole batch
+    - **Returns** a summary and one result per item: `deleted` or `not_found`
+    """
+    _check_bulk_size(len(request.ids))
+    await delay_delete()
+    return await UserService.bulk_delete_users(db, request.ids)
+
+
+@router.post("/batch-get", response_model=UserBatchResult, summary="Get several users by ID")
+async def batch_get_users(request: UserBatchGet, db: AsyncSession = Depends(get_db)):
+    """
+    Get many users in one request and one query
+    
+    - **ids**: IDs of the users (up to `BATCH_GET_MAX_IDS`, duplicates returned once)
+    - **Simulates latency** once for the whole batch
+    - **Returns** `users`: found users keyed by ID, and `missing`: IDs that
+      do not exist (no 404), both in request order
+    - **Cached**: users are served from and stored in the same row cache as
+      `GET /users/{user_id}`
     """
     await delay_get()
-    users = UserService.get_all_users(db)
-    return users
+    return Response(content=await UserService.get_users_by_ids_json(db, request.ids), media_type="application/json")
 
 
 @router.get("/{user_id}", response_model=User, summary="Get a user by ID")
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, request: Request):
     """
     Get a specific user by their ID
     
     - **user_id**: ID of the user to search for
     - **Returns** complete user data
     - **Error 404** if the user does not exist
+    - **304** if `If-None-Match` matches the current `ETag`
+    - **Coalesced**: identical concurrent requests share one read
     """
-    await delay_get()
-    user = UserService.get_user_by_id(db, user_id)
-    return user
+    async def read() -> tuple[PrecompressedBody, dict[str, str]]:
+        await delay_get()
+        async with SessionLocal() as db:
+            return PrecompressedBody(await UserService.get_user_json(db, user_id)), {}
+    
+    return await _coalesced_read(request, user_flight, user_id, read)
 
 
 @router.post(
@@ -49,7 +389,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
     status_code=status.HTTP_201_CREATED,
     summary="Create a new user"
 )
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new user
     
@@ -57,10 +397,10 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
     - **email**: Unique email of the user
     - **role**: User role
     - **Returns** the created user with their ID
-    - **Error 400** if the email already exists
+    - **Error 409** if the email already exists
     """
     await delay_post()
-    new_user = UserService.create_user(db, user)
+    new_user = await UserService.create_user(db, user)
     return new_user
 
 
@@ -69,7 +409,7 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update an existing user (full or partial update)
@@ -78,14 +418,15 @@ async def update_user(
     - **Send the fields** you want to change
     - **Returns** the updated user
     - **Error 404** if the user does not exist
+    - **Error 409** if the new email already exists
     """
     await delay_patch()
-    updated_user = UserService.update_user(db, user_id, user_update)
+    updated_user = await UserService.update_user(db, user_id, user_update)
     return updated_user
 
 
 @router.delete("/{user_id}", summary="Delete a user")
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Delete a user
     
@@ -103,15 +444,12 @@ async def delete_user(user_id: int, db: Session = Depends(get_db)):
 
 
     await delay_delete()
-    user = UserService.get_user_by_id(db, user_id)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    result = UserService.delete_user(db, user_id)
+    result = await UserService.delete_user(db, user_id)
     return result
 
 
 @router.post("/reset", summary="Reset database", tags=["admin"])
-async def reset_database(db: Session = Depends(get_db)):
+async def reset_database(db: AsyncSession = Depends(get_db)):
     """
     Reset the database to initial data
     
@@ -121,5 +459,5 @@ async def reset_database(db: Session = Depends(get_db)):
     
     ⚠️ **Warning**: This operation is irreversible
     """
-    result = UserService.reset_database(db)
+    result = await UserService.reset_database(db)
     return result
\ No newline at end of file
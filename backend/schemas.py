@@ -2,9 +2,10 @@
 Pydantic schemas for data validation
 Defines the structure of data entering and leaving the API
 """
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from config import LatencyMode
+from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Literal, Optional
+from config import LatencyMode, settings
 
 
 # ============================================
@@ -47,19 +48,370 @@ class User(UserBase):
         from_attributes = True  # Allows conversion from SQLAlchemy model
 
 
+# Fields that can be requested with GET /users?fields=...
+USER_FIELDS = ("id", "name", "email", "role")
+
+
+class UserPartial(BaseModel):
+    """
+    Schema to RETURN a user projection (GET /users?fields=...)
+    Only the requested fields are present in the response
+    """
+    id: Optional[int] = None
+    name: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[str] = None
+
+
+class UserListQuery(BaseModel):
+    """
+    Query parameters for GET /users
+    Cursor (keyset) pagination on the user ID, filters and field projection
+    """
+    after_id: Optional[int] = Field(None, ge=0, description="Return users with an ID greater than this one (cursor)")
+    limit: Optional[int] = Field(None, ge=1, le=1000, description="Maximum number of users to return (page size)")
+    role: Optional[str] = Field(None, min_length=1, max_length=50, description="Only users with this exact role")
+    email_prefix: Optional[str] = Field(None, min_length=1, max_length=100, description="Only users whose email starts with this prefix")
+    fields: Optional[str] = Field(None, description="Comma-separated fields to return (id, name, email, role). The ID is always included")
+    ids: Optional[str] = Field(None, description=f"Comma-separated user IDs to look up in one query (at most {settings.BATCH_GET_MAX_IDS}), e.g. `1,2,3`. Cannot be combined with the other parameters")
+
+    @field_validator("fields")
+    @classmethod
+    def validate_fields(cls, value: Optional[str]) -> Optional[str]:
+        """Reject unknown field names"""
+        if value is None:
+            return value
+        requested = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in USER_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(USER_FIELDS)}")
+        return ",".join(requested)
+
+    @field_validator("ids")
+    @classmethod
+    def validate_ids(cls, value: Optional[str]) -> Optional[str]:
+        """Parse the IDs, drop duplicates (first occurrence kept) and bound their number"""
+        if value is None:
+            return value
+        try:
+            ids = list(dict.fromkeys(int(item) for item in value.split(",") if item.strip()))
+        except ValueError:
+            raise ValueError("ids must be comma-separated integers")
+        if not ids:
+            raise ValueError("ids must contain at least one ID")
+        if len(ids) > settings.BATCH_GET_MAX_IDS:
+            raise ValueError(f"At most {settings.BATCH_GET_MAX_IDS} ids per request")
+        return ",".join(map(str, ids))
+
+    @model_validator(mode="after")
+    def check_ids_alone(self):
+        """A batch lookup is neither paginated, filtered nor projected"""
+        if self.ids is not None:
+            combined = [name for name in ("after_id", "limit", "role", "email_prefix", "fields")
+                        if getattr(self, name) is not None]
+            if combined:
+                raise ValueError(f"ids cannot be combined with: {', '.join(combined)}")
+        return self
+
+    @property
+    def id_list(self) -> Optional[list[int]]:
+        """Requested IDs in request order (None if not a batch lookup)"""
+        return None if self.ids is None else [int(item) for item in self.ids.split(",")]
+
+    @property
+    def field_list(self) -> list[str]:
+        """Requested fields in table order, always including the ID"""
+        if not self.fields:
+            return list(USER_FIELDS)
+        requested = set(self.fields.split(","))
+        return [name for name in USER_FIELDS if name == "id" or name in requested]
+
+
+class UserExportQuery(UserListQuery):
+    """
+    Query parameters for GET /users/export
+    Same filters and projection as GET /users plus the output format
+    """
+    format: Literal["ndjson", "csv"] = Field("ndjson", description="Output format")
+
+
+# ============================================
+# BULK SCHEMAS
+# ============================================
+
+class UserBulkUpdate(UserUpdate):
+    """
+    Schema to UPDATE one user inside PATCH /users/bulk
+    """
+    id: int = Field(..., description="ID of the user to update")
+
+
+class UserBulkDelete(BaseModel):
+    """
+    Schema to DELETE several users with DELETE /users/bulk
+    """
+    ids: list[int] = Field(..., min_length=1, description="IDs of the users to delete")
+
+
+class BulkItemResult(BaseModel):
+    """
+    Result of one item of a bulk operation
+    """
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[int] = Field(None, description="User ID (assigned by the database for created users)")
+    status: Literal["created", "updated", "deleted", "conflict", "not_found", "invalid"]
+    detail: Optional[str] = Field(None, description="Reason when the item was not applied")
+
+
+class BulkResult(BaseModel):
+    """
+    Schema to return the outcome of a bulk operation
+    """
+    summary: dict[str, int] = Field(..., description="Number of items per status")
+    results: list[BulkItemResult] = Field(..., description="Per-item results, in request order")
+
+
+class ImportRowIssue(BaseModel):
+    """
+    A row of an import that was not created
+    """
+    line: int = Field(..., description="Line number in the upload (1-based)")
+    detail: str = Field(..., description="Reason why the row was not created")
+    email: Optional[str] = None
+
+
+class ImportBatchStats(BaseModel):
+    """
+    Throughput of one batch of an import
+    """
+    batch: int
+    rows: int = Field(..., description="Valid rows written in this batch")
+    created: int
+    conflicts: int
+    seconds: float = Field(..., description="Time spent writing the batch")
+    rows_per_second: float
+
+
+class ImportResult(BaseModel):
+    """
+    Schema to return the outcome of POST /users/import
+    """
+    format: Literal["ndjson", "csv"]
+    rows: int = Field(..., description="Data rows read from the upload")
+    created: int
+    rejected: int = Field(..., description="Rows that failed parsing or validation")
+    conflicts: int = Field(..., description="Rows with an email already registered")
+    seconds: float
+    rows_per_second: float
+    batches: list[ImportBatchStats]
+    rejected_rows: list[ImportRowIssue] = Field(..., description="First rejected rows with reasons")
+    conflict_rows: list[ImportRowIssue] = Field(..., description="First duplicate-email rows")
+
+
+# ============================================
+# BATCH READ SCHEMAS
+# ============================================
+
+class UserBatchGet(BaseModel):
+    """
+    Schema to look up several users with POST /users/batch-get
+    """
+    ids: list[int] = Field(..., min_length=1, max_length=settings.BATCH_GET_MAX_IDS, description="IDs of the users to return")
+
+
+class UserBatchResult(BaseModel):
+    """
+    Schema to return the users of a batch lookup, keyed by ID
+    """
+    users: dict[int, User] = Field(..., description="Found users by ID, in request order")
+    missing: list[int] = Field(..., description="Requested IDs that do not exist, in request order")
+
+
+# ============================================
+# SYNC SCHEMAS
+# ============================================
+
+class UserSyncQuery(BaseModel):
+    """
+    Query parameters of GET /users/sync
+    """
+    since: int = Field(0, ge=0, description="Version of the client's copy (0: full sync)")
+    limit: int = Field(1000, ge=1, le=settings.SYNC_MAX_LIMIT, description="Maximum changes returned")
+
+
+class UserVersioned(User):
+    """
+    Schema to return a user with its sync metadata
+    """
+    version: int = Field(..., description="Sync version of the last change")
+    updated_at: Optional[datetime] = Field(None, description="Time of the last change (UTC)")
+
+
+class UserSyncResult(BaseModel):
+    """
+    Schema to return the changes since a version
+    """
+    since: int = Field(..., description="Version the changes start from")
+    version: int = Field(..., description="Version to send as `since` in the next request")
+    reset: bool = Field(..., description="True for a full sync: replace the local copy with `changed`")
+    has_more: bool = Field(..., description="More changes are available, request again with `version`")
+    changed: list[UserVersioned] = Field(..., description="Users created or updated, in version order")
+    deleted: list[int] = Field(..., description="IDs of deleted users")
+
+
+# ============================================
+# SEARCH SCHEMAS
+# ============================================
+
+class UserSearchQuery(BaseModel):
+    """
+    Query parameters of GET /users/search
+    """
+    q: str = Field(..., min_length=1, max_length=200, description="Words to search in name, email and role (prefix match)")
+    limit: int = Field(20, ge=1, le=settings.SEARCH_MAX_LIMIT, description="Maximum number of users to return")
+    offset: int = Field(0, ge=0, description="Number of results to skip")
+
+
+class UserSearchResult(BaseModel):
+    """
+    Schema to return one page of search results
+    """
+    items: list[User] = Field(..., description="Matching users")
+    ranked: bool = Field(..., description="True if ordered by relevance, false if the query was too broad (ID order)")
+    has_more: bool = Field(..., description="More results are available with a higher offset")
+
+
 # ============================================
 # LATENCY SCHEMAS
 # ============================================
 
+LATENCY_DISTRIBUTION_PARAMS = {
+    "constant": ("value",),
+    "uniform": ("low", "high"),
+    "normal": ("mean", "stddev"),
+    "lognormal": ("median", "sigma"),
+    "pareto": ("scale", "alpha"),
+}
+
+
+class LatencyDistribution(BaseModel):
+    """
+    Delay distribution in seconds
+    
+    - constant: value
+    - uniform: low, high
+    - normal: mean, stddev (negative samples are clamped to 0)
+    - lognormal: median, sigma
+    - pareto: scale (minimum delay), alpha (shape, lower = heavier tail)
+    """
+    type: Literal["constant", "uniform", "normal", "lognormal", "pareto"] = "constant"
+    value: Optional[float] = Field(None, ge=0)
+    low: Optional[float] = Field(None, ge=0)
+    high: Optional[float] = Field(None, ge=0)
+    mean: Optional[float] = Field(None, ge=0)
+    stddev: Optional[float] = Field(None, ge=0)
+    median: Optional[float] = Field(None, gt=0)
+    sigma: Optional[float] = Field(None, ge=0)
+    scale: Optional[float] = Field(None, gt=0)
+    alpha: Optional[float] = Field(None, gt=0)
+    max: Optional[float] = Field(None, ge=0, description="Upper bound applied to every sample")
+    
+    @model_validator(mode="after")
+    def check_params(self):
+        """Require the parameters of the selected distribution"""
+        missing = [name for name in LATENCY_DISTRIBUTION_PARAMS[self.type] if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"{self.type} distribution requires: {', '.join(missing)}")
+        if self.type == "uniform" and self.low > self.high:
+            raise ValueError("uniform distribution requires low <= high")
+        return self
+
+
+class LatencyRule(BaseModel):
+    """
+    Simulated latency and faults for the requests matching a route and method
+    """
+    route: str = Field("*", description="Route template or glob, e.g. /users/{user_id} or /users*")
+    method: str = Field("*", description="HTTP method (GET, POST, PATCH, PUT, DELETE) or *")
+    delay: Optional[LatencyDistribution] = Field(
+        None, description="Base delay (default: the read/write delay of the current mode)"
+    )
+    spike_probability: float = Field(0.0, ge=0, le=1, description="Probability of adding a spike")
+    spike: Optional[LatencyDistribution] = Field(None, description="Extra delay added on a spike")
+    error_probability: float = Field(0.0, ge=0, le=1, description="Probability of failing with error_status")
+    error_status: int = Field(503, ge=500, le=599)
+    timeout_probability: float = Field(0.0, ge=0, le=1, description="Probability of hanging, then failing with 504")
+    timeout_seconds: float = Field(30.0, ge=0, description="How long an injected timeout hangs")
+    
+    @field_validator("method")
+    @classmethod
+    def normalize_method(cls, value: str) -> str:
+        """Methods are matched in upper case"""
+        return value.upper()
+    
+    @model_validator(mode="after")
+    def check_spike(self):
+        """A spike probability needs a spike distribution"""
+        if self.spike_probability > 0 and self.spike is None:
+            raise ValueError("spike is required when spike_probability > 0")
+        return self
+
+
+class LatencyProfile(BaseModel):
+    """
+    Set of latency rules; the first rule matching a request applies
+    Requests matching no rule use the delays of the current mode
+    """
+    name: str = Field("custom", max_length=100)
+    seed: Optional[int] = Field(None, description="Random seed for reproducible runs")
+    rules: list[LatencyRule] = Field(..., min_length=1, max_length=100)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "production-tail",
+                "seed": 42,
+                "rules": [
+                    {
+                        "route": "/users/{user_id}",
+                        "method": "GET",
+                        "delay": {"type": "lognormal", "median": 0.05, "sigma": 0.5, "max": 2.0},
+                        "spike_probability": 0.01,
+                        "spike": {"type": "uniform", "low": 1.0, "high": 3.0},
+                        "error_probability": 0.005
+                    },
+                    {
+                        "method": "POST",
+                        "delay": {"type": "pareto", "scale": 0.1, "alpha": 2.5, "max": 5.0},
+                        "timeout_probability": 0.001,
+                        "timeout_seconds": 10.0
+                    }
+                ]
+            }
+        }
+
+
 class LatencyModeRequest(BaseModel):
     """
-    Schema to change latency mode
+    Schema to change latency mode and/or upload a latency profile
+    
+    - Only mode: applies the mode and removes the active profile
+    - Only profile: activates the profile (unmatched requests keep the current mode)
+    - Both: applies the mode and activates the profile
     """
-    mode: LatencyMode = Field(
-        ..., 
+    mode: Optional[LatencyMode] = Field(
+        None, 
         description="Latency mode to apply",
         example="MEDIUM_LATENCY"
     )
+    profile: Optional[LatencyProfile] = Field(None, description="Per-route latency profile")
+    
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        """At least one of mode and profile is required"""
+        if self.mode is None and self.profile is None:
+            raise ValueError("mode or profile is required")
+        return self
 
 
 class LatencyStatus(BaseModel):
@@ -70,6 +422,7 @@ class LatencyStatus(BaseModel):
     read_delay: float = Field(... , description="Delay in seconds for read operations (GET)")
     write_delay: float = Field(..., description="Delay in seconds for write operations (POST/PATCH/DELETE)")
     description: str = Field(..., description="Description of current mode")
+    profile: Optional[LatencyProfile] = Field(None, description="Active latency profile")
 
 
 class LatencyModesInfo(BaseModel):
@@ -96,4 +449,47 @@ class LatencyModesInfo(BaseModel):
                     }
                 }
             }
-        }
\ No newline at end of file
+        }
+
+
+# ============================================
+# CACHE SCHEMAS
+# ============================================
+
+class CacheStats(BaseModel):
+    """
+    Schema to return the counters of one cache
+    """
+    size: int = Field(..., description="Number of cached entries")
+    max_entries: int = Field(..., description="Maximum number of entries (LRU eviction beyond)")
+    ttl_seconds: float = Field(..., description="Time to live of each entry (0: until invalidated)")
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int = Field(..., description="Entries dropped because the cache was full")
+    expirations: int = Field(..., description="Entries dropped because their TTL elapsed")
+    invalidations: int = Field(..., description="Entries dropped by writes")
+
+
+class CoalescingStats(BaseModel):
+    """
+    Schema to return the counters of one coalesced read endpoint
+    """
+    enabled: bool
+    in_flight: int = Field(..., description="Reads currently being executed")
+    executions: int = Field(..., description="Reads executed (delay, query and serialization)")
+    coalesced: int = Field(..., description="Requests that joined a read already in flight")
+    coalesced_ratio: float = Field(..., description="coalesced / (executions + coalesced)")
+    saved_seconds: float = Field(..., description="Execution time not repeated thanks to coalescing")
+
+
+class CacheStatus(BaseModel):
+    """
+    Schema to return the status of the user caches
+    """
+    table_version: int = Field(..., description="Version of the users table (bumped on every write)")
+    etag: str = Field(..., description="Current ETag of user reads")
+    last_modified: str = Field(..., description="Time of the last write (HTTP date)")
+    user_list: CacheStats = Field(..., description="Cache of GET /users (encoded response bodies)")
+    user_json: CacheStats = Field(..., description="Encoded JSON of each user (GET /users/{id}, batch lookups and full rows of GET /users)")
+    coalescing: dict[str, CoalescingStats] = Field(..., description="Coalesced reads per endpoint (user, user_list)")
\ No newline at end of file
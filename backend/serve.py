@@ -0,0 +1,74 @@
+"""
+Production launcher: runs the API with several uvicorn worker processes
+
+Workers share the latency mode/profile and the users table version through a
+memory-mapped state file (utils/shared_state.py), so POST /latency and cache
+invalidation apply to every worker.
+
+Usage (from the backend folder):
+    python serve.py --workers 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+import uvicorn
+
+from config import settings
+from utils.log import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+
+async def prepare_database():
+    """Create the schema and seed the database once, before the workers start"""
+    from database import SessionLocal, close_db, init_db
+    from services.user_service import UserService
+
+    await init_db()
+    async with SessionLocal() as db:
+        await UserService.seed_database_if_empty(db)
+    await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default=settings.HOST, help="Bind address")
+    parser.add_argument("--port", type=int, default=settings.PORT, help="Bind port")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS, help="Number of worker processes")
+    parser.add_argument("--state-file", default=None, help="Shared state file (default: a temporary file)")
+    parser.add_argument("--log-level", default="warning", help="uvicorn log level")
+    args = parser.parse_args()
+    setup_logging(settings.LOG_LEVEL, settings.LOG_JSON)
+
+    # Workers would otherwise race to create and seed an empty database
+    asyncio.run(prepare_database())
+
+    state_path = args.state_file or os.path.join(tempfile.gettempdir(), f"workshop-{os.getpid()}.state")
+
+    # A fresh file per launch: new boot ID for ETags, default latency settings
+    from utils.shared_state import SharedState, is_supported
+    if args.workers > 1 and not is_supported():
+        parser.error("several workers need a shared state file, which needs fcntl (not available on this platform)")
+    SharedState.create(state_path).close()
+    # Inherited by the worker processes (read by config.Settings at import)
+    os.environ["SHARED_STATE_PATH"] = state_path
+
+    logger.info("🚀 Starting %d workers on http://%s:%s (state: %s)", args.workers, args.host, args.port, state_path)
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level=args.log_level,
+            access_log=False,
+        )
+    finally:
+        if not args.state_file and os.path.exists(state_path):
+            os.remove(state_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 """
 Service to manage latency configuration
 """
+from typing import Optional
 from config import LatencyMode, LatencyConfig
+from schemas import LatencyProfile
 from utils.delay import latency_manager
 
 
@@ -23,7 +25,8 @@ class LatencyService:
             "current_mode": current_mode,
             "read_delay": config['read'],
             "write_delay": config['write'],
-            "description": config['description']
+            "description": config['description'],
+            "profile": latency_manager.profile
         }
     
     @staticmethod
@@ -40,6 +43,27 @@ class LatencyService:
         latency_manager.current_mode = mode
         return LatencyService.get_current_status()
     
+    @staticmethod
+    def apply_settings(mode: Optional[LatencyMode], profile: Optional[LatencyProfile]) -> dict:
+        """
+        Change the latency mode and/or the latency profile
+        
+        A mode without a profile removes the active profile, so
+        {"mode": ...} keeps its original meaning.
+        
+        Args:
+            mode: New latency mode (None keeps the current one)
+            profile: Latency profile to activate
+            
+        Returns:
+            Updated status
+        """
+        if mode is not None:
+            latency_manager.current_mode = mode
+        if profile is not None or latency_manager.profile is not None:
+            latency_manager.set_profile(profile)
+        return LatencyService.get_current_status()
+    
     @staticmethod
     def get_all_modes() -> dict:
         """
@@ -63,4 +87,6 @@ class LatencyService:
         """
         from config import settings
         latency_manager.current_mode = settings.DEFAULT_LATENCY_MODE
+        if latency_manager.profile is not None:
+            latency_manager.set_profile(None)
         return LatencyService.get_current_status()
\ No newline at end of file
@@ -2,63 +2,480 @@
 Business Logic for User Management
 Separates logic from endpoints
 """
-from sqlalchemy.orm import Session
+import re
+import time
+from collections import Counter
+from typing import AsyncIterator, Iterable, Optional
+from sqlalchemy import Row, Select, bindparam, delete, func, insert, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from models import UserDB
-from schemas import UserCreate, UserUpdate
-from data.initial_data import get_initial_users
+from pydantic import ValidationError
+from config import settings
+from database import SessionLocal
+from models import (
+    USER_CHANGE_COLUMNS, USER_COLUMNS, IdempotencyKeyDB, SyncStateDB, UserChangeRow, UserDB, UserRow, UserTombstoneDB
+)
+from schemas import USER_FIELDS, User, UserCreate, UserUpdate, UserListQuery, UserBulkUpdate, UserSyncQuery, UserSearchQuery
+from data.initial_data import get_initial_user_rows
+from utils.cache import MISSING, user_list_cache, user_row_cache, users_version
+from utils.changes import ChangeBatch, ChangeFeed
+from utils.compression import PrecompressedBody
+from utils.group_commit import GroupCommitQueue, WriteOperation
+from utils.idempotency import IdempotencyStore
+from utils.log import get_logger
+from utils.serialization import dumps, encode_rows, join_array
+from utils.streaming import ParsedRow
+
+logger = get_logger(__name__)
+
+# Maximum number of bound parameters per IN (...) query
+# (SQLite limits the number of variables of a statement)
+IN_CLAUSE_CHUNK_SIZE = 5000
+
+
+# Words of a search query (same boundaries as the unicode61 tokenizer:
+# letters and digits, underscore is a separator)
+SEARCH_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Matching IDs in index order, bounded by the rank window
+SEARCH_CANDIDATES_SQL = text("SELECT rowid FROM users_fts WHERE users_fts MATCH :match LIMIT :window")
+SEARCH_SQL = (
+    "SELECT users.id, users.name, users.email, users.role "
+    "FROM users_fts JOIN users ON users.id = users_fts.rowid "
+    "WHERE users_fts MATCH :match ORDER BY {order} LIMIT :limit OFFSET :offset"
+)
+SEARCH_RANKED_SQL = text(SEARCH_SQL.format(order="users_fts.rank"))
+SEARCH_UNRANKED_SQL = text(SEARCH_SQL.format(order="users_fts.rowid"))
+
+# Single-user writes, committed in batches by one writer task when GROUP_COMMIT is on
+user_write_queue = GroupCommitQueue(
+    "users", SessionLocal, settings.GROUP_COMMIT,
+    max_batch=settings.GROUP_COMMIT_MAX_BATCH, max_delay=settings.GROUP_COMMIT_MAX_DELAY,
+)
+
+# Stored responses of the single-user writes sent with an Idempotency-Key (IdempotencyMiddleware)
+user_idempotency = IdempotencyStore(
+    SessionLocal, IdempotencyKeyDB.__table__, settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS, wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    purge_seconds=settings.IDEMPOTENCY_PURGE_SECONDS,
+)
+
+
+def _chunks(items: list, size: int = IN_CLAUSE_CHUNK_SIZE):
+    """Split a list into consecutive chunks of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
 class UserService: 
     """Service to manage user operations"""
     
     @staticmethod
-    def get_all_users(db: Session) -> list[UserDB]:
+    async def get_users_json(
+        db: AsyncSession,
+        query: Optional[UserListQuery] = None
+    ) -> tuple[PrecompressedBody, Optional[int]]:
         """
-        Get all users
+        Get users, optionally one page at a time, as an encoded JSON array
+        
+        Uses keyset pagination on the ID (WHERE id > after_id ORDER BY id LIMIT n)
+        and selects only the requested columns, so the cost of a page depends
+        on its size and not on the size of the table. Rows are fetched as
+        tuples and encoded straight to JSON (no ORM objects or Pydantic
+        validation); full rows reuse the encoded users of user_row_cache,
+        and the list cache keeps whole response bodies (with their
+        compressed variants, see utils/compression.py).
         
         Args:
             db: Database session
+            query: Pagination, filters and projection (all users if None)
             
         Returns:
-            List of users
+            JSON array of users with the requested fields, and the ID of the
+            last user if the page is full (cursor of the next page)
+        """
+        query = query or UserListQuery()
+        cache_key = tuple(query.model_dump().values())
+        users_version.refresh()
+        cached = user_list_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
+        version = users_version.version
+        result = await db.execute(UserService._list_statement(query))
+        rows = result.all()
+        logger.debug("📋 Retrieved %d users from database", len(rows))
+        
+        # Do not cache a result that a concurrent write may have made stale
+        cacheable = users_version.version == version
+        if query.fields is None:
+            body = join_array(user_row_cache.encode_rows(rows, UserService._encode_user_row, store=cacheable))
+        else:
+            body = encode_rows(query.field_list, rows)
+        next_after_id = rows[-1][0] if query.limit is not None and len(rows) == query.limit else None
+        page = (PrecompressedBody(body), next_after_id)
+        if cacheable:
+            user_list_cache.set(cache_key, page)
+        return page
+    
+    @staticmethod
+    def _encode_user_row(row) -> bytes:
+        """Encode a full user row (id, name, email, role) as a JSON object"""
+        return dumps(dict(zip(USER_FIELDS, row)))
+    
+    @staticmethod
+    async def stream_users(query: UserListQuery) -> AsyncIterator[list[Row]]:
+        """
+        Stream users in batches with a server-side cursor (yield_per)
+        
+        Opens its own session, because the stream outlives the request
+        handler. Only one batch of rows is held in memory at a time.
+        
+        Args:
+            query: Filters and projection (same as GET /users)
+            
+        Yields:
+            Batches of at most EXPORT_BATCH_SIZE rows (tuples of query.field_list)
+        """
+        statement = UserService._list_statement(query).execution_options(
+            yield_per=settings.EXPORT_BATCH_SIZE
+        )
+        async with SessionLocal() as db:
+            result = await db.stream(statement)
+            async for partition in result.partitions():
+                yield partition
+    
+    @staticmethod
+    def _list_statement(query: UserListQuery) -> Select:
         """
-        users = db.query(UserDB).all()
-        print(f"📋 Retrieved {len(users)} users from database")
-        return users
+        Build the SELECT for a list query
+        
+        Keyset pagination on the ID (WHERE id > after_id ORDER BY id LIMIT n)
+        and only the requested columns
+        """
+        columns = [getattr(UserDB, name) for name in query.field_list]
+        statement = select(*columns).order_by(UserDB.id)
+        
+        if query.ids is not None:
+            statement = statement.where(UserDB.id.in_(query.id_list))
+        if query.after_id is not None:
+            statement = statement.where(UserDB.id > query.after_id)
+        if query.role is not None:
+            statement = statement.where(UserDB.role == query.role)
+        if query.email_prefix is not None:
+            # Range scan on the email index (LIKE would not use it in SQLite)
+            prefix = query.email_prefix
+            upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            statement = statement.where(UserDB.email >= prefix, UserDB.email < upper_bound)
+        if query.limit is not None:
+            statement = statement.limit(query.limit)
+        return statement
     
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> UserDB:
+    async def get_user_json(db: AsyncSession, user_id: int) -> bytes:
         """
-        Get a user by ID
+        Get a user by ID as an encoded JSON object (read-through user_row_cache)
         
         Args:
             db: Database session
             user_id: User ID
             
         Returns:
-            Found user
+            JSON object of the user
             
         Raises:
             HTTPException: If user does not exist
         """
-        user = db.query(UserDB).filter(UserDB.id == user_id).first()
+        users_version.refresh()
+        cached = user_row_cache.get(user_id)
+        if cached is not MISSING:
+            return cached
         
-        if not user:
+        version = users_version.version
+        row = (await db.execute(
+            select(*USER_COLUMNS).where(UserDB.id == user_id)
+        )).first()
+        if row is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"User with ID {user_id} not found"
             )
         
-        print(f"👤 User found: {user.name} (ID: {user.id})")
-        return user
+        encoded = UserService._encode_user_row(row)
+        # Do not cache a result that a concurrent write may have made stale
+        if users_version.version == version:
+            user_row_cache.set(user_id, encoded)
+        return encoded
+    
+    @staticmethod
+    async def get_users_by_ids_json(db: AsyncSession, user_ids: Iterable[int]) -> bytes:
+        """
+        Get several users by ID as an encoded JSON object keyed by ID
+        
+        The batch counterpart of get_user_json: IDs found in user_row_cache
+        are served from it, the others are read with one
+        WHERE id IN (...) query (per IN_CLAUSE_CHUNK_SIZE IDs) and cached,
+        so a page of N users costs one round trip instead of N.
+        
+        Args:
+            db: Database session
+            user_ids: User IDs (duplicates are returned once)
+            
+        Returns:
+            {"users": {"<id>": user, ...}, "missing": [id, ...]}, both in
+            request order
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        users_version.refresh()
+        found: dict[int, bytes] = {}
+        uncached = []
+        for user_id in user_ids:
+            cached = user_row_cache.get(user_id)
+            if cached is MISSING:
+                uncached.append(user_id)
+            else:
+                found[user_id] = cached
+        
+        if uncached:
+            version = users_version.version
+            rows = []
+            for chunk in _chunks(uncached):
+                rows.extend((await db.execute(select(*USER_COLUMNS).where(UserDB.id.in_(chunk)))).all())
+            logger.debug("📋 Retrieved %d of %d uncached users from database", len(rows), len(uncached))
+            # Do not cache results that a concurrent write may have made stale
+            cacheable = users_version.version == version
+            for row in rows:
+                encoded = UserService._encode_user_row(row)
+                found[row[0]] = encoded
+                if cacheable:
+                    user_row_cache.set(row[0], encoded)
+        
+        users = b",".join(b'"%d":%s' % (user_id, found[user_id]) for user_id in user_ids if user_id in found)
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        return b'{"users":{' + users + b'},"missing":' + dumps(missing) + b"}"
+    
+    @staticmethod
+    async def _sync_state(db: AsyncSession) -> tuple[int, int]:
+        """Latest sync version, and oldest version deltas can start from (last reset or pruned tombstones)"""
+        return tuple((await db.execute(
+            select(SyncStateDB.version, SyncStateDB.min_version).where(SyncStateDB.id == 1)
+        )).one())
+    
+    @staticmethod
+    async def _changes_since(
+        db: AsyncSession,
+        since: int,
+        high_water: int,
+        limit: int,
+        include_deleted: bool = True
+    ) -> list[tuple[int, Optional[Row], Optional[int]]]:
+        """
+        Read the users changed and deleted after a sync version
+        
+        Versions and tombstones are maintained by triggers, and both
+        queries are range scans on indexed version columns, so the cost
+        depends on the number of changes and not on the size of the table.
+        Changes are bounded by the version read first (high_water): writes
+        committed meanwhile get a higher version and are returned next time.
+        
+        Args:
+            db: Database session
+            since: Version to read from (exclusive)
+            high_water: Version to read up to (inclusive)
+            limit: Changes wanted (up to limit + 1 are returned, to detect more)
+            include_deleted: Whether to read the tombstones
+            
+        Returns:
+            Changes in version order: (version, user row ending with
+            created_version, None) or (version, None, deleted ID)
+        """
+        result = await db.execute(
+            select(*USER_CHANGE_COLUMNS, UserDB.created_version)
+            .where(UserDB.version > since, UserDB.version <= high_water)
+            .order_by(UserDB.version)
+            .limit(limit + 1)
+        )
+        changes = [(row.version, row, None) for row in result]
+        if include_deleted:
+            result = await db.execute(
+                select(UserTombstoneDB.version, UserTombstoneDB.id)
+                .where(UserTombstoneDB.version > since, UserTombstoneDB.version <= high_water)
+                .order_by(UserTombstoneDB.version)
+                .limit(limit + 1)
+            )
+            changes.extend((version, None, user_id) for version, user_id in result)
+            changes.sort(key=lambda change: change[0])
+        return changes[:limit + 1]
+    
+    @staticmethod
+    async def sync_users(db: AsyncSession, query: UserSyncQuery) -> dict:
+        """
+        Get the users created, updated or deleted after a sync version
+        
+        Args:
+            db: Database session
+            query: Version of the client's copy and page size
+            
+        Returns:
+            Changed users, deleted IDs and the version to sync from next
+        """
+        high_water, min_version = await UserService._sync_state(db)
+        
+        # Full sync for new clients, clients older than the last reset or the
+        # pruned tombstones, and clients ahead of the database (restored file)
+        reset = query.since == 0 or query.since < min_version or query.since > high_water
+        since = 0 if reset else query.since
+        changes = await UserService._changes_since(db, since, high_water, query.limit, include_deleted=not reset)
+        
+        has_more = len(changes) > query.limit
+        page = changes[:query.limit]
+        logger.debug("🔁 Sync since %d: %d changes", since, len(page))
+        return {
+            "since": since,
+            "version": page[-1][0] if has_more else high_water,
+            "reset": reset,
+            "has_more": has_more,
+            "changed": [UserChangeRow(*row[:-1]) for _, row, _ in page if row is not None],
+            "deleted": [user_id for _, _, user_id in page if user_id is not None],
+        }
+    
+    @staticmethod
+    async def read_changes(since: Optional[int], limit: int) -> ChangeBatch:
+        """
+        Source of the change feed (utils/changes.py): changes as events
+        
+        A user created after `since` is a created event, else an updated
+        one; the payload is the current user. Deletions are deleted events.
+        
+        Args:
+            since: Version to read from (None: only the current version)
+            limit: Maximum number of changes
+            
+        Returns:
+            Events in version order; reset if `since` is older than the
+            last reset or the pruned tombstones, or newer than the database
+        """
+        async with SessionLocal() as db:
+            high_water, min_version = await UserService._sync_state(db)
+            if since is None:
+                return ChangeBatch(high_water, False, [], False)
+            if since < min_version or since > high_water:
+                return ChangeBatch(high_water, True, [], False)
+            changes = await UserService._changes_since(db, since, high_water, limit)
+        
+        has_more = len(changes) > limit
+        page = changes[:limit]
+        events = [
+            (version, "deleted", {"id": user_id}) if row is None else
+            (version, "created" if row.created_version > since else "updated", dict(zip(USER_FIELDS, row)))
+            for version, row, user_id in page
+        ]
+        return ChangeBatch(page[-1][0] if has_more else high_water, False, events, has_more)
+    
+    @staticmethod
+    def _search_expression(q: str) -> Optional[str]:
+        """
+        Build the FTS5 MATCH expression of a search query
+        
+        Every word is quoted (user input cannot inject FTS5 syntax) and
+        matched as a prefix; all words must match (implicit AND).
+        
+        Returns:
+            MATCH expression, or None if the query has no words
+        """
+        words = SEARCH_WORD_PATTERN.findall(q)
+        if not words:
+            return None
+        return " ".join(f'"{word}"*' for word in words)
+    
+    @staticmethod
+    async def search_users(db: AsyncSession, query: UserSearchQuery) -> dict:
+        """
+        Full-text prefix search on name, email and role (FTS5 index)
+        
+        Ranking by BM25 scores every match, so it is only done when the query
+        matches at most SEARCH_RANK_WINDOW users (found with a bounded scan of
+        the index). Broader queries are returned in ID order: the first pages
+        come from the same scan, deeper pages from an unranked index query.
+        
+        Args:
+            db: Database session
+            query: Search words and page
+            
+        Returns:
+            Matching users, whether they are ranked, and whether there are more
+        """
+        match = UserService._search_expression(query.q)
+        if match is None:
+            return {"items": [], "ranked": True, "has_more": False}
+        
+        window = settings.SEARCH_RANK_WINDOW
+        params = {"match": match, "limit": query.limit + 1, "offset": query.offset}
+        candidates = (await db.execute(
+            SEARCH_CANDIDATES_SQL, {"match": match, "window": window + 1}
+        )).scalars().all()
+        ranked = len(candidates) <= window
+        if ranked:
+            result = await db.execute(SEARCH_RANKED_SQL, params)
+        elif query.offset + query.limit < len(candidates):
+            # Page inside the candidates: load the users by primary key
+            # (MATCH is evaluated once, which matters for long prefixes)
+            page_ids = candidates[query.offset:query.offset + query.limit + 1]
+            result = await db.execute(
+                select(UserDB.id, UserDB.name, UserDB.email, UserDB.role)
+                .where(UserDB.id.in_(page_ids))
+                .order_by(UserDB.id)
+            )
+        else:
+            result = await db.execute(SEARCH_UNRANKED_SQL, params)
+        users = [UserRow(*row) for row in result]
+        logger.debug("🔎 Search %r: %d results (ranked: %s)", match, len(users), ranked)
+        return {
+            "items": users[:query.limit],
+            "ranked": ranked,
+            "has_more": len(users) > query.limit,
+        }
+    
+    @staticmethod
+    async def _commit_write(db: AsyncSession, operation: WriteOperation):
+        """
+        Run a single-user write and commit it
+        
+        With GROUP_COMMIT the operation is queued and committed together with
+        other concurrent writes by the writer task (in its own session);
+        otherwise it is committed right away with the request's session.
+        
+        Args:
+            db: Database session of the request
+            operation: Applies the write (flushed, not committed) and returns
+                (result, action to run once committed)
+            
+        Returns:
+            Result of the operation
+        """
+        if user_write_queue.enabled:
+            # Give the request's connection back to the pool while waiting for the writer
+            await db.close()
+            return await user_write_queue.submit(operation)
+        try:
+            result, on_commit = await operation(db)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        on_commit()
+        return result
     
     @staticmethod
-    def create_user(db: Session, user_data: UserCreate) -> UserDB:
+    async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
         """
         Create a new user
         
+        One INSERT ... RETURNING: the unique index on email rejects duplicates,
+        so there is no SELECT beforehand and no refresh afterwards.
+        
         Args: 
             db: Database session
             user_data: User data to create
@@ -67,37 +484,36 @@ class UserService:
             Created user
             
         Raises:
-            HTTPException: If email already exists
+            HTTPException: 409 if the email already exists
         """
-        # Check if email already exists
-        existing = db.query(UserDB).filter(UserDB.email == user_data.email).first()
-        if existing:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Email {user_data.email} is already registered"
-            )
+        statement = insert(UserDB.__table__).values(**user_data.model_dump()).returning(*USER_COLUMNS)
         
-        # Create new user
-        new_user = UserDB(**user_data.model_dump())
+        async def operation(session: AsyncSession):
+            try:
+                row = (await session.execute(statement)).one()
+            except IntegrityError:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Email {user_data.email} is already registered"
+                )
+            created = User(**row._mapping)
+            
+            def on_commit():
+                UserService._invalidate([created.id])
+                logger.info("✨ User created: %s (ID: %d)", created.name, created.id)
+            
+            return created, on_commit
         
-        try:
-            db.add(new_user)
-            db.commit()
-            db.refresh(new_user)
-            print(f"✨ User created: {new_user.name} (ID: {new_user.id})")
-            return new_user
-        except IntegrityError: 
-            db.rollback()
-            raise HTTPException(
-                status_code=400,
-                detail="Error creating user (possible duplicate)"
-            )
+        return await UserService._commit_write(db, operation)
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_data: UserUpdate) -> UserDB:
+    async def update_user(db: AsyncSession, user_id: int, user_data: UserUpdate) -> User:
         """
         Update an existing user
         
+        One UPDATE ... RETURNING: no matching row means the user does not
+        exist, a unique index violation means the email is taken.
+        
         Args:
             db: Database session
             user_id: ID of user to update
@@ -107,11 +523,9 @@ class UserService:
             Updated user
             
         Raises:
-            HTTPException: If user does not exist
+            HTTPException: 400 if no field is sent, 404 if the user does not
+                exist, 409 if the new email already exists
         """
-        # Find user
-        user = UserService.get_user_by_id(db, user_id)
-        
         # Update only fields that were sent
         update_data = user_data.model_dump(exclude_unset=True)
         
@@ -121,26 +535,43 @@ class UserService:
                 detail="No fields provided to update"
             )
         
-        for key, value in update_data.items():
-            setattr(user, key, value)
+        statement = (
+            update(UserDB.__table__)
+            .where(UserDB.id == user_id)
+            .values(**update_data)
+            .returning(*USER_COLUMNS)
+        )
         
-        try:
-            db.commit()
-            db.refresh(user)
-            print(f"🔄 User updated: {user.name} (ID: {user.id})")
-            return user
-        except IntegrityError:
-            db.rollback()
-            raise HTTPException(
-                status_code=400,
-                detail="Error updating user (possible duplicate email)"
-            )
+        async def operation(session: AsyncSession):
+            try:
+                row = (await session.execute(statement)).one_or_none()
+            except IntegrityError:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Email {update_data.get('email')} is already registered"
+                )
+            if row is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"User with ID {user_id} not found"
+                )
+            updated = User(**row._mapping)
+            
+            def on_commit():
+                UserService._invalidate([user_id])
+                logger.info("🔄 User updated: %s (ID: %d)", updated.name, updated.id)
+            
+            return updated, on_commit
+        
+        return await UserService._commit_write(db, operation)
     
     @staticmethod
-    def delete_user(db: Session, user_id: int) -> dict:
+    async def delete_user(db: AsyncSession, user_id: int) -> dict:
         """
         Delete a user
         
+        One DELETE ... RETURNING: no returned row means the user does not exist.
+        
         Args:
             db: Database session
             user_id: ID of user to delete
@@ -149,19 +580,280 @@ class UserService:
             Confirmation message
             
         Raises:
-            HTTPException: If user does not exist
+            HTTPException: 404 if the user does not exist
+        """
+        statement = delete(UserDB.__table__).where(UserDB.id == user_id).returning(UserDB.name)
+        
+        async def operation(session: AsyncSession):
+            user_name = (await session.execute(statement)).scalar_one_or_none()
+            if user_name is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"User with ID {user_id} not found"
+                )
+            
+            def on_commit():
+                UserService._invalidate([user_id])
+                logger.info("🗑️ User deleted: %s (ID: %d)", user_name, user_id)
+            
+            return {"message": f"User {user_name} deleted successfully"}, on_commit
+        
+        return await UserService._commit_write(db, operation)
+    
+    @staticmethod
+    async def bulk_create_users(db: AsyncSession, users_data: list[UserCreate]) -> dict:
+        """
+        Create many users in a single transaction
+        
+        Email uniqueness is checked for the whole batch with IN (...) queries,
+        then all new users are inserted with one executemany INSERT.
+        ON CONFLICT DO NOTHING covers emails registered concurrently.
+        
+        Args:
+            db: Database session
+            users_data: Users to create
+            
+        Returns:
+            Summary and per-item results (created / conflict)
+        """
+        emails = [user.email for user in users_data]
+        existing = set()
+        for chunk in _chunks(emails):
+            result = await db.execute(select(UserDB.email).where(UserDB.email.in_(chunk)))
+            existing.update(result.scalars())
+        
+        results: list[dict] = []
+        rows: list[dict] = []
+        pending: dict[str, dict] = {}
+        for index, user in enumerate(users_data):
+            if user.email in existing:
+                results.append({"index": index, "status": "conflict", "detail": f"Email {user.email} is already registered"})
+            elif user.email in pending:
+                results.append({"index": index, "status": "conflict", "detail": f"Email {user.email} is repeated in the batch"})
+            else:
+                item = {"index": index, "status": "created"}
+                pending[user.email] = item
+                results.append(item)
+                rows.append(user.model_dump())
+        
+        if rows:
+            statement = (
+                sqlite_insert(UserDB)
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(UserDB.id, UserDB.email)
+            )
+            result = await db.execute(statement, rows)
+            for user_id, email in result.all():
+                pending.pop(email)["id"] = user_id
+            await db.commit()
+        
+        # Emails registered by a concurrent request between the check and the insert
+        for email, item in pending.items():
+            item.update(status="conflict", detail=f"Email {email} is already registered")
+        
+        created_ids = [item["id"] for item in results if item["status"] == "created"]
+        if created_ids:
+            UserService._invalidate(created_ids)
+        logger.info("✨ Bulk create: %d of %d users created", len(created_ids), len(users_data))
+        return UserService._bulk_result(results)
+    
+    @staticmethod
+    async def bulk_update_users(db: AsyncSession, updates: list[UserBulkUpdate]) -> dict:
+        """
+        Update many users in a single transaction
+        
+        Args:
+            db: Database session
+            updates: Partial updates, each with the ID of the user to change
+            
+        Returns:
+            Summary and per-item results (updated / not_found / conflict / invalid)
+            
+        Raises:
+            HTTPException: If a concurrent write made an email duplicate (409)
+        """
+        ids = list({item.id for item in updates})
+        found = set()
+        for chunk in _chunks(ids):
+            result = await db.execute(select(UserDB.id).where(UserDB.id.in_(chunk)))
+            found.update(result.scalars())
+        
+        new_emails = list({item.email for item in updates if item.email is not None})
+        email_owner: dict[str, int] = {}
+        for chunk in _chunks(new_emails):
+            result = await db.execute(select(UserDB.email, UserDB.id).where(UserDB.email.in_(chunk)))
+            email_owner.update((email, user_id) for email, user_id in result)
+        
+        results: list[dict] = []
+        # Parameter sets grouped by the columns they change (one executemany per group)
+        groups: dict[tuple, list[dict]] = {}
+        for index, item in enumerate(updates):
+            values = item.model_dump(exclude_unset=True, exclude={"id"})
+            if item.id not in found:
+                results.append({"index": index, "id": item.id, "status": "not_found", "detail": f"User with ID {item.id} not found"})
+            elif not values:
+                results.append({"index": index, "id": item.id, "status": "invalid", "detail": "No fields provided to update"})
+            elif "email" in values and email_owner.get(values["email"], item.id) != item.id:
+                results.append({"index": index, "id": item.id, "status": "conflict", "detail": f"Email {values['email']} is already registered"})
+            else:
+                if "email" in values:
+                    # Later items of the batch may not take this email
+                    email_owner[values["email"]] = item.id
+                results.append({"index": index, "id": item.id, "status": "updated"})
+                groups.setdefault(tuple(sorted(values)), []).append({"user_id": item.id, **values})
+        
+        if groups:
+            try:
+                # The SET clause is taken from the keys of the parameter sets
+                statement = update(UserDB.__table__).where(UserDB.__table__.c.id == bindparam("user_id"))
+                for params in groups.values():
+                    await db.execute(statement, params)
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail="Error updating users (duplicate email written concurrently), retry the batch"
+                )
+        
+        updated_ids = [item["id"] for item in results if item["status"] == "updated"]
+        if updated_ids:
+            UserService._invalidate(updated_ids)
+        logger.info("🔄 Bulk update: %d of %d users updated", len(updated_ids), len(updates))
+        return UserService._bulk_result(results)
+    
+    @staticmethod
+    async def bulk_delete_users(db: AsyncSession, user_ids: list[int]) -> dict:
+        """
+        Delete many users in a single transaction
+        
+        Args:
+            db: Database session
+            user_ids: IDs of the users to delete
+            
+        Returns:
+            Summary and per-item results (deleted / not_found)
+        """
+        deleted = set()
+        for chunk in _chunks(list(set(user_ids))):
+            result = await db.execute(delete(UserDB).where(UserDB.id.in_(chunk)).returning(UserDB.id))
+            deleted.update(result.scalars())
+        await db.commit()
+        
+        results = []
+        reported = set()
+        for index, user_id in enumerate(user_ids):
+            if user_id in deleted and user_id not in reported:
+                reported.add(user_id)
+                results.append({"index": index, "id": user_id, "status": "deleted"})
+            else:
+                results.append({"index": index, "id": user_id, "status": "not_found", "detail": f"User with ID {user_id} not found"})
+        
+        if deleted:
+            UserService._invalidate(deleted)
+        logger.info("🗑️ Bulk delete: %d of %d users deleted", len(deleted), len(user_ids))
+        return UserService._bulk_result(results)
+    
+    @staticmethod
+    async def import_users(db: AsyncSession, rows: AsyncIterator[ParsedRow], file_format: str) -> dict:
+        """
+        Import users from a parsed upload in fixed-size batches
+        
+        Rows are validated with UserCreate as they arrive and written every
+        IMPORT_BATCH_SIZE valid rows, so the upload is never held in memory.
+        The next rows are not read until the current batch is committed.
+        
+        Args:
+            db: Database session
+            rows: Parsed rows (line number, data, parse error)
+            file_format: Format of the upload (ndjson or csv)
+            
+        Returns:
+            Import report: totals, per-batch throughput, rejected and conflict rows
         """
-        user = UserService.get_user_by_id(db, user_id)
+        started = time.perf_counter()
+        report = {
+            "format": file_format,
+            "rows": 0,
+            "created": 0,
+            "rejected": 0,
+            "conflicts": 0,
+            "batches": [],
+            "rejected_rows": [],
+            "conflict_rows": [],
+        }
+        batch: list[UserCreate] = []
+        lines: list[int] = []
+        
+        async for line, data, error in rows:
+            report["rows"] += 1
+            if error is None:
+                try:
+                    batch.append(UserCreate.model_validate(data))
+                    lines.append(line)
+                except ValidationError as exc:
+                    error = "; ".join(
+                        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+                        for item in exc.errors()
+                    )
+            if error is not None:
+                report["rejected"] += 1
+                if len(report["rejected_rows"]) < settings.IMPORT_MAX_REPORTED_ROWS:
+                    report["rejected_rows"].append({"line": line, "detail": error})
+            
+            if len(batch) >= settings.IMPORT_BATCH_SIZE:
+                await UserService._import_batch(db, batch, lines, report)
+                batch, lines = [], []
         
-        user_name = user.name
-        db.delete(user)
-        db.commit()
+        if batch:
+            await UserService._import_batch(db, batch, lines, report)
         
-        print(f"🗑️ User deleted: {user_name} (ID: {user_id})")
-        return {"message": f"User {user_name} deleted successfully"}
+        report["seconds"] = round(time.perf_counter() - started, 4)
+        report["rows_per_second"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+        logger.info(
+            "📥 Import: %d created, %d rejected, %d conflicts",
+            report["created"], report["rejected"], report["conflicts"]
+        )
+        return report
+    
+    @staticmethod
+    async def _import_batch(db: AsyncSession, batch: list[UserCreate], lines: list[int], report: dict):
+        """Write one batch of an import and add its outcome to the report"""
+        started = time.perf_counter()
+        result = await UserService.bulk_create_users(db, batch)
+        seconds = time.perf_counter() - started
+        
+        created = result["summary"].get("created", 0)
+        conflicts = result["summary"].get("conflict", 0)
+        for item in result["results"]:
+            if item["status"] == "conflict" and len(report["conflict_rows"]) < settings.IMPORT_MAX_REPORTED_ROWS:
+                report["conflict_rows"].append({
+                    "line": lines[item["index"]],
+                    "email": batch[item["index"]].email,
+                    "detail": item["detail"]
+                })
+        
+        report["created"] += created
+        report["conflicts"] += conflicts
+        report["batches"].append({
+            "batch": len(report["batches"]) + 1,
+            "rows": len(batch),
+            "created": created,
+            "conflicts": conflicts,
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(batch) / seconds, 1) if seconds else 0.0
+        })
+    
+    @staticmethod
+    def _bulk_result(results: list[dict]) -> dict:
+        """Build the response of a bulk operation from its per-item results"""
+        return {
+            "summary": dict(Counter(item["status"] for item in results)),
+            "results": results
+        }
     
     @staticmethod
-    def reset_database(db: Session) -> dict:
+    async def reset_database(db: AsyncSession) -> dict:
         """
         Reset database to initial data
         
@@ -172,41 +864,65 @@ class UserService:
             Confirmation message with number of users created
         """
         # Delete all users
-        db.query(UserDB).delete()
-        db.commit()
+        await db.execute(delete(UserDB))
+        await db.commit()
         
-        # Create initial users
-        initial_users = get_initial_users()
+        # Create initial users (single executemany INSERT)
+        initial_users = get_initial_user_rows()
+        await db.execute(insert(UserDB), initial_users)
+        # Delta sync and the change feed tell clients to reload the whole list
+        await db.execute(update(SyncStateDB).where(SyncStateDB.id == 1).values(min_version=SyncStateDB.version))
         
-        for user in initial_users:
-            db.add(user)
+        await db.commit()
+        UserService._invalidate()
         
-        db.commit()
-        
-        print(f"🔄 Database reset with {len(initial_users)} users")
+        logger.info("🔄 Database reset with %d users", len(initial_users))
         return {
             "message": "Database reset successfully",
             "users_created": len(initial_users)
         }
     
     @staticmethod
-    def seed_database_if_empty(db: Session):
+    async def seed_database_if_empty(db: AsyncSession):
         """
         Populate database with initial data if empty
         
         Args:
             db: Database session
         """
-        count = db.query(UserDB).count()
+        count = await db.scalar(select(func.count()).select_from(UserDB))
         
         if count == 0:
-            print("🌱 Empty database. Creating initial users...")
-            initial_users = get_initial_users()
-            
-            for user in initial_users:
-                db.add(user)
+            logger.info("🌱 Empty database. Creating initial users...")
+            initial_users = get_initial_user_rows()
+            await db.execute(insert(UserDB), initial_users)
             
-            db.commit()
-            print(f"✅ {len(initial_users)} initial users created")
+            await db.commit()
+            logger.info("✅ %d initial users created", len(initial_users))
         else:
-            print(f"ℹ️ Database already has {count} users")
\ No newline at end of file
+            logger.info("ℹ️ Database already has %d users", count)
+    
+    @staticmethod
+    def _invalidate(user_ids: Optional[Iterable[int]] = None):
+        """
+        Drop cache entries affected by a committed write and bump the table version
+        
+        Args:
+            user_ids: IDs of the written users (None invalidates every user)
+        """
+        if user_ids is None:
+            user_row_cache.clear()
+        else:
+            for user_id in user_ids:
+                user_row_cache.invalidate(user_id)
+        user_list_cache.clear()
+        users_version.bump()
+        user_changes.notify()
+
+
+# Change feed (GET /users/changes), driven by the sync versions of the database
+user_changes = ChangeFeed(
+    settings.CHANGE_LOG_MAX_EVENTS, settings.CHANGE_FEED_HEARTBEAT_SECONDS,
+    source=UserService.read_changes, probe=lambda: users_version.version,
+    poll_interval=settings.CHANGE_FEED_POLL_SECONDS,
+)
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Shared fixtures: the app in process, on a fresh database in a temporary folder
+
+Run from the backend folder:
+    python -m pytest
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# The modules of the app are imported as top-level modules (config, main, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+
+# Must be set before database.py is imported (the engine is created at import)
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="workshop-tests-")
+settings.DATABASE_URL = f"sqlite+aiosqlite:///{os.path.join(DATABASE_DIRECTORY, 'users.db')}"
+settings.LOG_LEVEL = "WARNING"
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Client bound to the app; the database starts from the template (users.db is untouched)"""
+    from main import app
+
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
+
+@pytest.fixture
+def statements(client):
+    """First keyword of every SQL statement executed while the test runs"""
+    from database import engine
+
+    recorded: list[str] = []
+
+    def record_statement(conn, cursor, statement, *_):
+        recorded.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record_statement)
+    yield recorded
+    event.remove(engine.sync_engine, "before_cursor_execute", record_statement)
+
+
+@pytest.fixture
+def sqlite(client):
+    """Separate connection to the test database (writes that do not go through the app)"""
+    connection = sqlite3.connect(os.path.join(DATABASE_DIRECTORY, "users.db"), isolation_level=None,
+                                 check_same_thread=False)
+    yield connection
+    connection.close()
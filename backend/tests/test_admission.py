@@ -0,0 +1,118 @@
+"""
+Admission control (utils/admission.py): rate limits, slots and the FIFO queue budget
+"""
+import asyncio
+from collections import OrderedDict
+
+import httpx
+import pytest
+
+from utils.admission import AdmissionController, AdmissionMiddleware, Rejected, admission
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """One token per client, refilled every 10 s"""
+    monkeypatch.setattr(admission, "client_rate", 0.1)
+    monkeypatch.setattr(admission, "client_burst", 1)
+    monkeypatch.setattr(admission, "_clients", OrderedDict())
+
+
+def test_client_rate_answers_429_with_retry_after(client, limited):
+    assert client.get("/users", params={"limit": 1}).status_code == 200
+    response = client.get("/users", params={"limit": 1})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert "Rate limit exceeded" in response.json()["detail"]
+    assert admission.stats()["classes"]["read"]["rejected"]["client_rate"] >= 1
+
+
+@pytest.mark.parametrize("method,path", [("GET", "/health"), ("GET", "/metrics"), ("GET", "/openapi.json"),
+                                         ("OPTIONS", "/users")])
+def test_exempt_routes_are_not_limited(client, limited, method, path):
+    client.get("/users", params={"limit": 1})  # Takes the only token
+    assert client.request(method, path, headers={"Origin": "http://localhost:3000",
+                                                 "Access-Control-Request-Method": "GET"}).status_code == 200
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_global_rate_answers_503_with_retry_after():
+    controller = AdmissionController(global_rate=0.5, global_burst=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(ok_app, controller=controller))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return [await http.post("/users") for _ in range(2)]
+
+    admitted, rejected = asyncio.run(run())
+    assert admitted.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "2"
+    assert controller.rejected == {("write", "global_rate"): 1}
+
+
+def test_waiters_get_slots_in_fifo_order():
+    controller = AdmissionController(max_in_flight={"write": 1}, queue_budget=1.0)
+    admitted = []
+
+    async def waiter(name):
+        await controller.acquire("write", name)
+        admitted.append(name)
+
+    async def run():
+        await controller.acquire("write", "first")
+        tasks = []
+        for name in ("a", "b", "c"):
+            tasks.append(asyncio.create_task(waiter(name)))
+            await asyncio.sleep(0)  # Queue in this order
+        for _ in range(3):
+            controller.release("write", 0.001)
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert admitted == ["a", "b", "c"]
+    assert controller.stats()["classes"]["write"]["admitted_after_wait"] == 3
+
+
+def test_queue_budget_rejects_the_waiters_it_cannot_serve():
+    controller = AdmissionController(max_in_flight={"write": 1}, queue_budget=0.05)
+
+    async def run():
+        await controller.acquire("write", "holder")
+        with pytest.raises(Rejected) as timed_out:
+            await controller.acquire("write", "waiter")  # Nobody releases within the budget
+        assert (timed_out.value.status_code, timed_out.value.reason) == (503, "queue_timeout")
+
+        controller.release("write", 1.0)          # Slots are held 1 s on average
+        await controller.acquire("write", "holder")
+        with pytest.raises(Rejected) as overloaded:
+            await controller.acquire("write", "waiter")  # Expected wait over the budget: rejected at once
+        assert (overloaded.value.status_code, overloaded.value.reason) == (503, "overloaded")
+        assert overloaded.value.retry_after == pytest.approx(1.0)
+        assert not controller._lanes["write"].waiters
+
+    asyncio.run(run())
+
+
+def test_other_classes_keep_their_slots():
+    controller = AdmissionController(max_in_flight={"write": 1, "read": 1}, queue_budget=0.01)
+
+    async def run():
+        await controller.acquire("write", "writer")
+        await controller.acquire("read", "reader")  # Not queued behind the writes
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("method,path,route_class", [
+    ("GET", "/health", None), ("GET", "/users/changes", None), ("OPTIONS", "/users/1", None),
+    ("GET", "/users", "read"), ("POST", "/users/batch-get", "read"), ("POST", "/users", "write"),
+    ("POST", "/latency", "admin"), ("POST", "/users/reset", "admin"),
+])
+def test_classify(method, path, route_class):
+    assert AdmissionController.classify(method, path) == route_class
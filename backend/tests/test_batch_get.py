@@ -0,0 +1,85 @@
+"""
+Batch lookup: POST /users/batch-get and GET /users?ids=...
+"""
+import uuid
+
+import pytest
+
+from config import settings
+
+
+@pytest.fixture(scope="module")
+def users(client) -> list[dict]:
+    """Three users created for this module"""
+    return [client.post("/users", json={"name": f"Batch {index}", "email": f"{uuid.uuid4().hex}@test.example",
+                                        "role": "Tester"}).json() for index in range(3)]
+
+
+@pytest.fixture(scope="module")
+def missing_id(client, users) -> int:
+    user_id = client.post("/users", json={"name": "Gone", "email": f"{uuid.uuid4().hex}@test.example",
+                                          "role": "Tester"}).json()["id"]
+    client.delete(f"/users/{user_id}")
+    return user_id
+
+
+def lookups(client, ids: list[int]) -> list[dict]:
+    """The same lookup through both endpoints"""
+    posted = client.post("/users/batch-get", json={"ids": ids})
+    got = client.get("/users", params={"ids": ",".join(map(str, ids))})
+    assert posted.status_code == got.status_code == 200
+    return [posted.json(), got.json()]
+
+
+def test_request_order_and_missing(client, users, missing_id):
+    ids = [users[2]["id"], missing_id, users[0]["id"], users[1]["id"], users[2]["id"]]
+    for body in lookups(client, ids):
+        assert list(body["users"]) == [str(users[2]["id"]), str(users[0]["id"]), str(users[1]["id"])]
+        assert body["users"][str(users[0]["id"])] == users[0]
+        assert body["missing"] == [missing_id]
+
+
+def test_cached_rows_are_current(client, users):
+    user_id = users[0]["id"]
+    lookups(client, [user_id])
+    client.patch(f"/users/{user_id}", json={"role": "Manager"})
+    for body in lookups(client, [user_id]):
+        assert body["users"][str(user_id)]["role"] == "Manager"
+
+
+def test_id_limit(client):
+    too_many = list(range(1, settings.BATCH_GET_MAX_IDS + 2))
+    assert client.post("/users/batch-get", json={"ids": too_many}).status_code == 422
+    assert client.get("/users", params={"ids": ",".join(map(str, too_many))}).status_code == 422
+    at_limit = too_many[:-1]
+    assert client.post("/users/batch-get", json={"ids": at_limit}).status_code == 200
+    assert client.get("/users", params={"ids": ",".join(map(str, at_limit))}).status_code == 200
+
+
+@pytest.mark.parametrize("params", [
+    {"ids": "1,2", "limit": 5}, {"ids": "1", "after_id": 1}, {"ids": "1", "role": "Tester"},
+    {"ids": "1", "email_prefix": "a"}, {"ids": "1", "fields": "name"},
+])
+def test_ids_cannot_be_combined(client, params):
+    response = client.get("/users", params=params)
+    assert response.status_code == 422
+    assert "cannot be combined" in response.text
+
+
+@pytest.mark.parametrize("ids", ["", "1,x", ",,"])
+def test_invalid_ids(client, ids):
+    assert client.get("/users", params={"ids": ids}).status_code == 422
+
+
+def test_not_modified(client, users):
+    params = {"ids": ",".join(str(user["id"]) for user in users)}
+    first = client.get("/users", params=params)
+    etag = first.headers["ETag"]
+    cached = client.get("/users", params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client.patch(f"/users/{users[1]['id']}", json={"role": "Lead"})
+    changed = client.get("/users", params=params, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["users"][str(users[1]["id"])]["role"] == "Lead"
@@ -0,0 +1,92 @@
+"""
+Bulk endpoints (POST/PATCH/DELETE /users/bulk): per-item results and limits
+"""
+import uuid
+
+from sqlalchemy import event
+
+from config import settings
+
+
+def email() -> str:
+    return f"{uuid.uuid4().hex}@test.example"
+
+
+def user(**fields) -> dict:
+    return {"name": "Bulk", "email": email(), "role": "Tester", **fields}
+
+
+def test_create_reports_every_item(client):
+    taken = client.post("/users", json=user()).json()["email"]
+    repeated = email()
+    response = client.post("/users/bulk", json=[
+        user(), user(email=taken), user(email=repeated), user(email=repeated),
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"] == {"created": 2, "conflict": 2}
+    assert [item["status"] for item in body["results"]] == ["created", "conflict", "created", "conflict"]
+    assert [item["index"] for item in body["results"]] == [0, 1, 2, 3]
+    assert "already registered" in body["results"][1]["detail"]
+    assert "repeated in the batch" in body["results"][3]["detail"]
+    for item in body["results"][0::2]:
+        assert client.get(f"/users/{item['id']}").status_code == 200
+
+
+def test_update_reports_every_item(client):
+    first, second = client.post("/users/bulk", json=[user(), user()]).json()["results"]
+    taken = client.get(f"/users/{second['id']}").json()["email"]
+    deleted = client.post("/users", json=user()).json()["id"]
+    client.delete(f"/users/{deleted}")
+    response = client.patch("/users/bulk", json=[
+        {"id": first["id"], "role": "Manager"},
+        {"id": deleted, "role": "Manager"},
+        {"id": first["id"]},
+        {"id": first["id"], "email": taken},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["status"] for item in body["results"]] == ["updated", "not_found", "invalid", "conflict"]
+    assert body["summary"] == {"updated": 1, "not_found": 1, "invalid": 1, "conflict": 1}
+    assert client.get(f"/users/{first['id']}").json()["role"] == "Manager"
+
+
+def test_delete_reports_every_item(client):
+    created = [item["id"] for item in client.post("/users/bulk", json=[user(), user()]).json()["results"]]
+    response = client.request("DELETE", "/users/bulk", json={"ids": [created[0], created[1], created[0]]})
+    assert response.status_code == 200
+    assert [item["status"] for item in response.json()["results"]] == ["deleted", "deleted", "not_found"]
+    assert client.get(f"/users/{created[0]}").status_code == 404
+
+
+def test_size_limit(client, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    assert client.post("/users/bulk", json=[user(), user(), user()]).status_code == 413
+    assert client.patch("/users/bulk", json=[{"id": 1, "role": "x"}] * 3).status_code == 413
+    assert client.request("DELETE", "/users/bulk", json={"ids": [1, 2, 3]}).status_code == 413
+    assert client.post("/users/bulk", json=[user(), user()]).status_code == 200
+
+
+def test_create_racing_another_registration(client, sqlite):
+    """An email registered between the duplicate check and the insert is a conflict, not an error"""
+    from database import engine
+
+    racing = email()
+    registered = []
+
+    def register_first(conn, cursor, statement, *_):
+        if statement.startswith("INSERT INTO users") and not registered:
+            registered.append(racing)
+            sqlite.execute("INSERT INTO users (name, email, role) VALUES ('Racer', ?, 'Tester')", (racing,))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", register_first)
+    try:
+        response = client.post("/users/bulk", json=[user(), user(email=racing)])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", register_first)
+    assert registered
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [item["status"] for item in results] == ["created", "conflict"]
+    assert results[1]["detail"] == f"Email {racing} is already registered"
+    assert "id" in results[0]
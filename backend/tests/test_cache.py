@@ -0,0 +1,16 @@
+"""
+Read caches (utils/cache.py)
+"""
+import pytest
+
+from utils.cache import MISSING, LRUCache, RowBytesCache
+
+
+@pytest.mark.parametrize("cache", [LRUCache("test", 10, 60), RowBytesCache("test", 10)], ids=type)
+def test_miss_hit_and_invalidation(cache):
+    assert cache.get(1) is MISSING
+    cache.set(1, b"{}")
+    assert cache.get(1) == b"{}"
+    cache.invalidate(1)
+    assert cache.get(1) is MISSING
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
@@ -0,0 +1,55 @@
+"""
+Change feed (utils/changes.py): catch-up of clients resuming from before the log
+"""
+import asyncio
+
+import utils.changes
+from utils.changes import ChangeBatch, ChangeFeed
+
+HEAD = 50
+
+
+async def source(since, limit) -> ChangeBatch:
+    """Versions 1..HEAD, one updated event each"""
+    if since is None:
+        return ChangeBatch(HEAD, False, [], False)
+    changes = [(version, "updated", {"id": version, "name": "Zoë"}) for version in range(since + 1, HEAD + 1)]
+    page = changes[:limit]
+    has_more = len(changes) > limit
+    return ChangeBatch(page[-1][0] if has_more else HEAD, False, page, has_more)
+
+
+async def first_events(feed: ChangeFeed, last_event_id: int, count: int) -> list[bytes]:
+    """The first chunks a resuming client gets (after the retry hint)"""
+    stream = feed.subscribe(last_event_id)
+    try:
+        assert await anext(stream) == b"retry: 3000\n\n"
+        return [await asyncio.wait_for(anext(stream), 1) for _ in range(count)]
+    finally:
+        await stream.aclose()
+
+
+def test_catch_up_within_the_log_size():
+    feed = ChangeFeed(max_events=100, source=source)
+    chunk, = asyncio.run(first_events(feed, 45, 1))
+    assert chunk.count(b"event: updated") == 5
+    assert chunk.startswith(b'id: 46\nevent: updated\ndata: {"id":46,"name":"Zo\xc3\xab"}\n\n')
+
+
+def test_catch_up_too_far_behind_resets_at_the_head(monkeypatch):
+    monkeypatch.setattr(utils.changes, "READ_PAGE_SIZE", 5)
+    feed = ChangeFeed(max_events=10, source=source)
+    chunk, = asyncio.run(first_events(feed, 1, 1))
+    assert chunk == b"id: 50\nevent: reset\ndata: {}\n\n"
+    assert feed.stats()["catch_ups"] == 1
+
+
+def test_resume_ahead_of_the_database_resets():
+    async def resetting(since, limit):
+        if since is not None and since > HEAD:
+            return ChangeBatch(HEAD, True, [], False)
+        return await source(since, limit)
+
+    feed = ChangeFeed(max_events=10, source=resetting)
+    chunk, = asyncio.run(first_events(feed, HEAD + 10, 1))
+    assert chunk == b"id: 50\nevent: reset\ndata: {}\n\n"
@@ -0,0 +1,75 @@
+"""
+New database files start as a copy of the template, when it matches the schema
+"""
+import errno
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import database
+from config import settings
+
+
+@pytest.fixture
+def new_database(tmp_path, monkeypatch) -> str:
+    """Path of a database file that does not exist yet"""
+    path = tmp_path / "users.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    return str(path)
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch) -> str:
+    """Copy of the template the tests can change"""
+    path = tmp_path / "template.db"
+    shutil.copyfile(settings.DATABASE_TEMPLATE, path)
+    monkeypatch.setattr(settings, "DATABASE_TEMPLATE", str(path))
+    return str(path)
+
+
+def user_version(path: str) -> int:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_template_is_linked(new_database, template):
+    database._copy_template(database.schema_fingerprint())
+    assert user_version(new_database) == database.schema_fingerprint()
+    assert sorted(os.listdir(os.path.dirname(new_database))) == ["template.db", "users.db"]
+
+
+def test_template_is_renamed_without_hard_links(new_database, template, monkeypatch):
+    def no_link(source, destination):
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(os, "link", no_link)
+    database._copy_template(database.schema_fingerprint())
+    assert user_version(new_database) == database.schema_fingerprint()
+    assert sorted(os.listdir(os.path.dirname(new_database))) == ["template.db", "users.db"]
+
+
+def test_existing_file_is_kept(new_database, template):
+    with open(new_database, "wb") as file:
+        file.write(b"")
+    database._copy_template(database.schema_fingerprint())
+    assert os.path.getsize(new_database) == 0
+
+
+def test_outdated_template_is_skipped(new_database, template):
+    connection = sqlite3.connect(template)
+    connection.execute("PRAGMA user_version = 1")
+    connection.close()
+    database._copy_template(database.schema_fingerprint())
+    assert sorted(os.listdir(os.path.dirname(new_database))) == ["template.db"]
+
+
+def test_broken_template_is_skipped(new_database, template):
+    with open(template, "wb") as file:
+        file.write(b"not a database" * 100)
+    database._copy_template(database.schema_fingerprint())
+    assert sorted(os.listdir(os.path.dirname(new_database))) == ["template.db"]
@@ -0,0 +1,74 @@
+"""
+Group commit (utils/group_commit.py): one transaction per batch, one savepoint per write
+"""
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from services.user_service import user_write_queue
+from utils.group_commit import GroupCommitQueue
+
+
+def test_duplicate_emails_fail_alone(client, monkeypatch):
+    """Concurrent creates over a few emails: one 201 per email, 409 for the rest of each batch"""
+    monkeypatch.setattr(user_write_queue, "enabled", True)
+    batches = user_write_queue.batches
+    run = uuid.uuid4().hex
+    bodies = [{"name": f"Racer {index}", "email": f"racer{index % 5}.{run}@test.example", "role": "Tester"}
+              for index in range(20)]
+    with ThreadPoolExecutor(len(bodies)) as pool:
+        responses = list(pool.map(lambda body: client.post("/users", json=body), bodies))
+
+    statuses = [response.status_code for response in responses]
+    assert statuses.count(201) == 5
+    assert statuses.count(409) == 15
+    created = {response.json()["email"] for response in responses if response.status_code == 201}
+    assert len(created) == 5
+    assert user_write_queue.batches > batches
+    for email in created:
+        users = client.get("/users", params={"email_prefix": email}).json()
+        assert [user["email"] for user in users] == [email]
+
+
+class FailingCommitSession(AsyncSession):
+    """Session whose commit fails (e.g. disk full)"""
+
+    async def commit(self):
+        raise OperationalError("COMMIT", {}, Exception("disk I/O error"))
+
+
+def test_failed_commit_fails_every_caller(tmp_path):
+    committed = []
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writes.db'}")
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("CREATE TABLE writes (value INTEGER)")
+        queue = GroupCommitQueue("test", async_sessionmaker(engine, class_=FailingCommitSession),
+                                 enabled=True, max_delay=0.05)
+
+        def write(value):
+            async def operation(session):
+                await session.execute(text("INSERT INTO writes VALUES (:value)"), {"value": value})
+                return value, lambda: committed.append(value)
+            return operation
+
+        try:
+            results = await asyncio.gather(*(queue.submit(write(value)) for value in range(3)),
+                                           return_exceptions=True)
+            await queue.close()
+            async with engine.connect() as conn:
+                rows = (await conn.exec_driver_sql("SELECT count(*) FROM writes")).scalar()
+        finally:
+            await engine.dispose()
+        return results, rows, queue.stats()
+
+    results, rows, stats = asyncio.run(run())
+    assert all(isinstance(result, OperationalError) for result in results)
+    assert rows == 0
+    assert committed == []
+    assert (stats["failed"], stats["committed"]) == (3, 0)
@@ -0,0 +1,78 @@
+"""
+Idempotency keys: retries replay the stored outcome of a write, and only that
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from models import IdempotencyKeyDB
+from utils.admission import admission
+from utils.idempotency import IdempotencyMiddleware, IdempotencyStore
+
+
+def test_rejected_request_is_not_stored(client, monkeypatch):
+    """A 429 of admission control is not replayed: the retry runs the write"""
+    monkeypatch.setattr(admission, "client_rate", 5.0)
+    monkeypatch.setattr(admission, "client_burst", 1)
+    monkeypatch.setattr(admission, "_clients", OrderedDict())
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    body = {"name": "Retried", "email": f"{uuid.uuid4().hex}@test.example", "role": "Tester"}
+
+    assert client.get("/users", params={"limit": 1}).status_code == 200  # Takes the only token
+    rejected = client.post("/users", json=body, headers=headers)
+    assert rejected.status_code == 429
+    assert "Retry-After" in rejected.headers
+
+    time.sleep(0.25)  # One token back
+    retried = client.post("/users", json=body, headers=headers)
+    assert retried.status_code == 201
+    assert "Idempotent-Replayed" not in retried.headers
+
+    time.sleep(0.25)
+    replayed = client.post("/users", json=body, headers=headers)
+    assert replayed.status_code == 201
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == retried.json()
+
+
+def test_replay_keeps_headers(tmp_path):
+    """Location, ETag and Retry-After are replayed with the stored body"""
+    calls = 0
+
+    async def create(scope, receive, send):
+        nonlocal calls
+        calls += 1
+        scope["route"] = "POST /users"  # Set by the router when a route matches
+        await receive()
+        await send({"type": "http.response.start", "status": 201, "headers": [
+            (b"content-type", b"application/json"), (b"location", b"/users/7"), (b"etag", b'"7-1"'),
+            (b"x-other", b"not stored"),
+        ]})
+        await send({"type": "http.response.body", "body": b'{"id":7}'})
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'keys.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(IdempotencyKeyDB.__table__.create)
+        store = IdempotencyStore(async_sessionmaker(engine, expire_on_commit=False), IdempotencyKeyDB.__table__, 60)
+        transport = httpx.ASGITransport(app=IdempotencyMiddleware(create, store=store))
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                headers = {"Idempotency-Key": "key-1"}
+                first = await http.post("/users", json={"name": "A"}, headers=headers)
+                replayed = await http.post("/users", json={"name": "A"}, headers=headers)
+        finally:
+            await engine.dispose()
+        return first, replayed
+
+    first, replayed = asyncio.run(run())
+    assert calls == 1
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert (replayed.status_code, replayed.content) == (first.status_code, first.content)
+    for name in ("Content-Type", "Location", "ETag"):
+        assert replayed.headers[name] == first.headers[name]
+    assert "X-Other" not in replayed.headers
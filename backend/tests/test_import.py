@@ -0,0 +1,92 @@
+"""
+Import parsers (utils/streaming.py) and the export/import round trip
+"""
+import asyncio
+import json
+import uuid
+
+from utils.streaming import parse_csv, parse_ndjson
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def parse(parser, data: str, chunk_size: int = 7, max_line_length: int = 1000) -> list:
+    """All the parsed rows of an upload, sent in small chunks"""
+    async def run():
+        return [row async for row in parser(_chunks(data.encode(), chunk_size), max_line_length)]
+    return asyncio.run(run())
+
+
+def test_csv_row_starting_with_hash_is_data():
+    rows = parse(parse_csv, "name,email,role\n#tag,h@x.com,r\n#count,1\n")
+    assert rows == [(2, {"name": "#tag", "email": "h@x.com", "role": "r"}, None)]
+
+
+def test_csv_trailer_only_skipped_on_last_line():
+    rows = parse(parse_csv, "name,email,role\n#count,1\na,a@x.com,r\n")
+    assert rows[0] == (2, None, "Expected 3 values, got 2")
+    assert rows[1] == (3, {"name": "a", "email": "a@x.com", "role": "r"}, None)
+
+
+def test_csv_quoted_line_breaks():
+    rows = parse(parse_csv, 'name,email,role\n"two\nlines",a@x.com,r\nb,b@x.com,r\n')
+    assert rows == [
+        (2, {"name": "two\nlines", "email": "a@x.com", "role": "r"}, None),
+        (4, {"name": "b", "email": "b@x.com", "role": "r"}, None),
+    ]
+
+
+def test_csv_unterminated_quote_is_rejected():
+    rows = parse(parse_csv, 'name,email,role\n"open,a@x.com,r\n')
+    assert rows == [(2, None, "Unterminated quoted value")]
+
+
+def test_ndjson_trailer_only_skipped_when_alone_on_last_line():
+    rows = parse(parse_ndjson, '{"_count": 2}\n{"name": "a", "_count": 1}\n{"_count": 2}\n')
+    assert rows == [(1, {"_count": 2}, None), (2, {"name": "a", "_count": 1}, None)]
+
+
+def test_long_lines_are_rejected_without_being_kept():
+    data = '{"name": "a"}\n' + "x" * 5000 + '\n{"name": "b"}\n' + "y" * 5000
+    rows = parse(parse_ndjson, data, chunk_size=64, max_line_length=100)
+    assert rows == [
+        (1, {"name": "a"}, None),
+        (2, None, "Line longer than 100 characters"),
+        (3, {"name": "b"}, None),
+        (4, None, "Line longer than 100 characters"),
+    ]
+
+
+def test_export_imports_as_is(client):
+    run = uuid.uuid4().hex[:8]
+    names = ["#tag", "line\nbreak", 'say "hi", twice']
+    created = [client.post("/users", json={"name": name, "email": f"rt{index}.{run}@test.example",
+                                           "role": "Tester"}).json() for index, name in enumerate(names)]
+    ids = {user["id"] for user in created}
+
+    for file_format in ("csv", "ndjson"):
+        exported = client.get("/users/export", params={"format": file_format}).content
+        for user_id in ids:
+            assert client.delete(f"/users/{user_id}").status_code == 200
+        report = client.post("/users/import", params={"format": file_format}, content=exported).json()
+        assert report["rejected"] == 0, report["rejected_rows"]
+        assert report["created"] == len(names)
+        users = client.get("/users", params={"email_prefix": "rt"}).json()
+        imported = {user["email"]: user for user in users if run in user["email"]}
+        assert sorted(user["name"] for user in imported.values()) == sorted(names)
+        ids = {user["id"] for user in imported.values()}
+
+
+def test_unusable_lines_are_reported(client):
+    upload = "\n".join([
+        json.dumps({"name": "Ok", "email": f"{uuid.uuid4().hex}@test.example", "role": "Tester"}),
+        "not json",
+        json.dumps({"_count": 5, "name": "x"}),
+        json.dumps({"_count": 1}),
+    ])
+    report = client.post("/users/import", params={"format": "ndjson"}, content=upload).json()
+    assert (report["rows"], report["created"], report["rejected"]) == (3, 1, 2)
+    assert [row["line"] for row in report["rejected_rows"]] == [2, 3]
@@ -0,0 +1,84 @@
+"""
+Full-text search (GET /users/search): FTS5 prefix matching, ranking and paging
+"""
+import uuid
+
+import pytest
+
+from config import settings
+
+
+def token() -> str:
+    """A word no other user has (letters only: digits would match as words too)"""
+    return "".join(chr(ord("a") + int(digit, 16) % 26) for digit in uuid.uuid4().hex[:12])
+
+
+def new_user(client, name: str, role: str = "Tester") -> dict:
+    body = {"name": name, "email": f"{uuid.uuid4().hex}@test.example", "role": role}
+    return client.post("/users", json=body).json()
+
+
+def search(client, q: str, **params) -> dict:
+    response = client.get("/users/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_prefix_matching(client):
+    first, last = token(), token()
+    user = new_user(client, f"Zoë {first} {last}")
+    for q in (first, first[:4], f"{first[:3]} {last[:5]}", last.upper(), f"zoe {first}"):
+        assert [item["id"] for item in search(client, q)["items"]] == [user["id"]], q
+    assert search(client, first[1:])["items"] == []          # Prefix of a word, not a substring
+    assert search(client, f"{first} {token()}")["items"] == []  # Every word must match
+
+
+@pytest.mark.parametrize("q", ['"', 'a" OR "b', "NEAR(x y)", "name:*", "x AND NOT", "-", "^a", "*"])
+def test_fts_syntax_is_quoted(client, q):
+    """FTS5 operators in the input are searched as words, never parsed (no 500)"""
+    assert isinstance(search(client, q)["items"], list)
+
+
+def test_query_without_words(client):
+    assert search(client, "*** --") == {"items": [], "ranked": True, "has_more": False}
+
+
+def test_ranked_by_relevance(client):
+    word = token()
+    in_role = new_user(client, "Someone", role=word)
+    in_name = new_user(client, f"{word} Person")
+    body = search(client, word)
+    assert body["ranked"] is True
+    assert [item["id"] for item in body["items"]] == [in_name["id"], in_role["id"]]
+
+
+def test_broad_queries_page_in_id_order(client, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_RANK_WINDOW", 3)
+    word = token()
+    ids = [new_user(client, f"{word} {index}")["id"] for index in range(5)]
+
+    pages = [search(client, word, limit=2, offset=offset) for offset in (0, 2, 4)]
+    assert all(page["ranked"] is False for page in pages)
+    assert [item["id"] for page in pages for item in page["items"]] == ids
+    assert [page["has_more"] for page in pages] == [True, True, False]
+
+    monkeypatch.setattr(settings, "SEARCH_RANK_WINDOW", 5)
+    body = search(client, word, limit=10)
+    assert body["ranked"] is True
+    assert sorted(item["id"] for item in body["items"]) == ids
+
+
+def test_index_follows_updates_and_deletes(client):
+    old, new = token(), token()
+    user = new_user(client, f"{old} Person")
+    assert client.patch(f"/users/{user['id']}", json={"name": f"{new} Person"}).status_code == 200
+    assert search(client, old)["items"] == []
+    assert [item["id"] for item in search(client, new)["items"]] == [user["id"]]
+
+    replacement = token()
+    client.put(f"/users/{user['id']}", json={"name": "Other", "email": user["email"], "role": replacement})
+    assert search(client, new)["items"] == []
+    assert [item["id"] for item in search(client, replacement)["items"]] == [user["id"]]
+
+    assert client.delete(f"/users/{user['id']}").status_code == 200
+    assert search(client, replacement)["items"] == []
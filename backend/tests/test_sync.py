@@ -0,0 +1,109 @@
+"""
+Delta sync (GET /users/sync): versions, tombstones, paging and schema upgrades
+"""
+import sqlite3
+import uuid
+
+from sqlalchemy import create_engine
+
+import database
+
+
+def new_user(client) -> dict:
+    body = {"name": "Synced", "email": f"{uuid.uuid4().hex}@test.example", "role": "Tester"}
+    return client.post("/users", json=body).json()
+
+
+def current_version(sqlite) -> int:
+    return sqlite.execute("SELECT version FROM sync_state").fetchone()[0]
+
+
+def test_changes_and_tombstones(client, sqlite):
+    since = current_version(sqlite)
+    updated, deleted, short_lived = new_user(client), new_user(client), new_user(client)
+    client.patch(f"/users/{updated['id']}", json={"role": "Manager"})
+    client.delete(f"/users/{deleted['id']}")
+    client.delete(f"/users/{short_lived['id']}")
+
+    body = client.get("/users/sync", params={"since": since}).json()
+    assert (body["since"], body["reset"], body["has_more"]) == (since, False, False)
+    assert [user["id"] for user in body["changed"]] == [updated["id"]]
+    assert body["changed"][0]["role"] == "Manager"
+    assert body["changed"][0]["version"] == body["version"] - 2
+    assert body["deleted"] == [deleted["id"], short_lived["id"]]
+
+    again = client.get("/users/sync", params={"since": body["version"]}).json()
+    assert (again["changed"], again["deleted"], again["version"]) == ([], [], body["version"])
+
+
+def test_full_sync(client):
+    deleted = new_user(client)
+    client.delete(f"/users/{deleted['id']}")
+    body = client.get("/users/sync", params={"since": 0, "limit": 5000}).json()
+    assert body["reset"] is True
+    assert body["deleted"] == []
+    ids = [user["id"] for user in body["changed"]]
+    assert deleted["id"] not in ids
+    assert len(ids) == len(client.get("/users", params={"fields": "id", "limit": 1000}).json())
+
+
+def test_paging(client, sqlite):
+    since = current_version(sqlite)
+    created = [new_user(client)["id"] for _ in range(5)]
+    seen, version, pages = [], since, 0
+    while True:
+        body = client.get("/users/sync", params={"since": version, "limit": 2}).json()
+        seen += [user["id"] for user in body["changed"]]
+        version, pages = body["version"], pages + 1
+        if not body["has_more"]:
+            break
+    assert seen == created
+    assert pages == 3
+
+
+def test_pruned_tombstones_force_a_full_sync(client, sqlite):
+    since = current_version(sqlite)
+    deleted = new_user(client)
+    client.delete(f"/users/{deleted['id']}")
+    sqlite.execute("UPDATE user_tombstones SET deleted_at = '2000-01-01T00:00:00.000Z' WHERE id = ?",
+                   (deleted["id"],))
+    engine = create_engine(f"sqlite:///{sqlite.execute('PRAGMA database_list').fetchone()[2]}")
+    with engine.begin() as conn:
+        database._prune_tombstones(conn)
+    engine.dispose()
+
+    body = client.get("/users/sync", params={"since": since}).json()
+    assert body["reset"] is True
+    assert body["since"] == 0
+    assert client.get("/users/sync", params={"since": body["version"]}).json()["reset"] is False
+
+
+def test_ahead_of_the_database_forces_a_full_sync(client, sqlite):
+    assert client.get("/users/sync", params={"since": current_version(sqlite) + 100}).json()["reset"] is True
+
+
+def test_upgrade_backfills_existing_rows(tmp_path):
+    path = tmp_path / "old.db"
+    old = sqlite3.connect(path)
+    old.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, "
+                "email VARCHAR NOT NULL UNIQUE, role VARCHAR NOT NULL)")
+    old.executemany("INSERT INTO users (name, email, role) VALUES (?, ?, ?)",
+                    [("Ada", "ada@old.example", "Dev"), ("Alan", "alan@old.example", "Ops")])
+    old.commit()
+    old.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        database.upgrade_schema(conn)
+    with engine.begin() as conn:
+        rows = conn.exec_driver_sql("SELECT version, created_version, updated_at FROM users").all()
+        assert [row[:2] for row in rows] == [(1, 0), (1, 0)]
+        assert all(row[2] for row in rows)
+        assert conn.exec_driver_sql("SELECT version, min_version FROM sync_state").one() == (1, 0)
+
+        conn.exec_driver_sql("UPDATE users SET role = 'Lead' WHERE email = 'ada@old.example'")
+        conn.exec_driver_sql("DELETE FROM users WHERE email = 'alan@old.example'")
+        assert conn.exec_driver_sql("SELECT version FROM users").scalars().all() == [2]
+        assert conn.exec_driver_sql("SELECT id, version FROM user_tombstones").all() == [(2, 3)]
+        assert conn.exec_driver_sql("SELECT version FROM sync_state").scalar() == 3
+    engine.dispose()
@@ -0,0 +1,88 @@
+"""
+Single-user writes run one SQL statement (INSERT/UPDATE/DELETE ... RETURNING)
+
+The COMMIT is not a statement; the 404 and 409 failures take one statement too.
+"""
+import uuid
+
+import pytest
+
+
+def new_user(client, **fields) -> dict:
+    """Create a user with a unique email"""
+    body = {"name": "Target", "email": f"{uuid.uuid4().hex}@test.example", "role": "Tester", **fields}
+    response = client.post("/users", json=body)
+    assert response.status_code == 201
+    return response.json()
+
+
+@pytest.fixture(scope="module")
+def taken(client) -> str:
+    """Email of an existing user"""
+    return new_user(client)["email"]
+
+
+@pytest.fixture
+def target(client) -> int:
+    """ID of a fresh user"""
+    return new_user(client)["id"]
+
+
+@pytest.fixture
+def deleted(client) -> int:
+    """ID of a deleted user"""
+    user_id = new_user(client)["id"]
+    assert client.delete(f"/users/{user_id}").status_code == 200
+    return user_id
+
+
+def test_create(client, statements):
+    response = client.post("/users", json={"name": "New", "email": f"{uuid.uuid4().hex}@test.example",
+                                           "role": "Tester"})
+    assert response.status_code == 201
+    assert statements == ["INSERT"]
+
+
+def test_create_duplicate_email(client, taken, statements):
+    response = client.post("/users", json={"name": "Dup", "email": taken, "role": "Tester"})
+    assert response.status_code == 409
+    assert statements == ["INSERT"]
+
+
+def test_patch(client, target, statements):
+    response = client.patch(f"/users/{target}", json={"role": "Manager"})
+    assert response.status_code == 200
+    assert response.json()["role"] == "Manager"
+    assert statements == ["UPDATE"]
+
+
+def test_patch_email_taken(client, taken, target, statements):
+    response = client.patch(f"/users/{target}", json={"email": taken})
+    assert response.status_code == 409
+    assert statements == ["UPDATE"]
+
+
+def test_patch_unknown(client, deleted, statements):
+    response = client.patch(f"/users/{deleted}", json={"role": "Manager"})
+    assert response.status_code == 404
+    assert statements == ["UPDATE"]
+
+
+def test_put(client, target, statements):
+    body = {"name": "Replaced", "email": f"{uuid.uuid4().hex}@test.example", "role": "Developer"}
+    response = client.put(f"/users/{target}", json=body)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Replaced"
+    assert statements == ["UPDATE"]
+
+
+def test_delete(client, target, statements):
+    response = client.delete(f"/users/{target}")
+    assert response.status_code == 200
+    assert statements == ["DELETE"]
+
+
+def test_delete_unknown(client, deleted, statements):
+    response = client.delete(f"/users/{deleted}")
+    assert response.status_code == 404
+    assert statements == ["DELETE"]
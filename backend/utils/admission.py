@@ -0,0 +1,369 @@
+"""
+Admission control: rate limiting and load shedding
+
+Every request (except ADMISSION_EXEMPT_PATHS) goes through, in order:
+1. Token buckets: one per client and one global. An empty client bucket is
+   answered 429, an empty global bucket 503, both with Retry-After.
+2. Event loop lag: when the loop keeps running ready callbacks more than
+   ADMISSION_MAX_LOOP_LAG late (the CPU is saturated, every request waits
+   in the loop's own queue), new requests are answered 503.
+3. A bounded number of requests in flight per route class (read, write,
+   admin). When the class is full, the request waits for a slot in a FIFO
+   queue, but at most ADMISSION_QUEUE_BUDGET: it is rejected with 503 right
+   away if the expected wait (queue length / limit x mean service time) is
+   already over the budget, or when the budget runs out while waiting.
+
+Excess load is rejected in microseconds instead of piling up coroutines,
+DB sessions and simulated delays, so the admitted requests keep their
+latency. Limits are per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from starlette.responses import JSONResponse
+
+from config import settings
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Route classes (keys of ADMISSION_MAX_IN_FLIGHT)
+ROUTE_CLASSES = ("read", "write", "admin")
+READ_METHODS = frozenset(("GET", "HEAD"))
+
+# Period of the event loop lag measurement (seconds)
+LOOP_LAG_INTERVAL = 0.05
+
+
+class Rejected(Exception):
+    """Request not admitted: answered with status_code and Retry-After"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: float, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+# ============================================
+# Token bucket
+# ============================================
+
+class TokenBucket:
+    """
+    `rate` tokens per second, at most `burst` stored
+    A request takes one token; an empty bucket tells how long until the next one
+    """
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Refill, then return 0 if a token is available, else the seconds until one is"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """Consume a token (after wait_time returned 0)"""
+        self.tokens -= 1
+
+
+# ============================================
+# Concurrency limit per route class
+# ============================================
+
+class _Lane:
+    """Slots and FIFO wait queue of one route class"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.service_time = 0.0   # Moving average of the time a slot is held
+        self.admitted = 0
+        self.queued = 0           # Admitted after waiting
+        self.wait_seconds = 0.0
+
+    def expected_wait(self) -> float:
+        """Time until a new waiter gets a slot if the slots free up at the average pace"""
+        return (len(self.waiters) + 1) / self.limit * self.service_time
+
+    def release(self, held: float):
+        """Free a slot, or hand it to the first waiter still waiting"""
+        self.service_time = held if self.service_time == 0.0 else 0.8 * self.service_time + 0.2 * held
+        if self.waiters:
+            self.waiters.popleft().set_result(None)
+        else:
+            self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    Token buckets and per-class concurrency limits
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        client_rate: float = 0.0,
+        client_burst: int = 50,
+        global_rate: float = 0.0,
+        global_burst: int = 200,
+        max_in_flight: Optional[dict[str, int]] = None,
+        queue_budget: float = 1.0,
+        max_loop_lag: float = 0.0,
+        max_clients: int = 10_000,
+    ):
+        self.enabled = enabled
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.queue_budget = queue_budget
+        self.max_loop_lag = max_loop_lag
+        self.loop_lag = 0.0
+        self._monitor: Optional[asyncio.Task] = None
+        self._clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._global = TokenBucket(global_rate, global_burst, time.monotonic()) if global_rate > 0 else None
+        limits = max_in_flight or {}
+        self._lanes = {route_class: _Lane(limits.get(route_class, 64)) for route_class in ROUTE_CLASSES}
+        self.rejected: dict[tuple[str, str], int] = {}
+
+    @staticmethod
+    def classify(method: str, path: str) -> Optional[str]:
+        """
+        Route class of a request
+
+        Returns:
+            "admin", "read" or "write", or None if the path is never limited
+        """
+        def matches(prefixes):
+            return any(path == prefix or path.startswith(prefix + "/") for prefix in prefixes)
+
+        if method == "OPTIONS" or matches(settings.ADMISSION_EXEMPT_PATHS):
+            return None
+        if matches(settings.ADMISSION_ADMIN_PATHS):
+            return "admin"
+        if method in READ_METHODS or (method == "POST" and path in settings.ADMISSION_READ_POST_PATHS):
+            return "read"
+        return "write"
+
+    def _check_rate(self, client: str, route_class: str):
+        """Take a token from the client and global buckets, or raise Rejected"""
+        now = time.monotonic()
+        bucket = None
+        if self.client_rate > 0:
+            bucket = self._clients.get(client)
+            if bucket is None:
+                bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+                if len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+            wait = bucket.wait_time(now)
+            if wait > 0:
+                raise self._reject(route_class, Rejected(
+                    429, "client_rate", wait, f"Rate limit exceeded for client {client}"
+                ))
+        if self._global is not None:
+            wait = self._global.wait_time(now)
+            if wait > 0:
+                raise self._reject(route_class, Rejected(
+                    503, "global_rate", wait, "Server is over its request rate, retry later"
+                ))
+            self._global.take()
+        if bucket is not None:
+            bucket.take()
+
+    async def acquire(self, route_class: str, client: str):
+        """
+        Admit a request: rate limits, then a slot of its route class
+
+        Args:
+            route_class: "read", "write" or "admin"
+            client: Client identity (per-client token bucket)
+
+        Raises:
+            Rejected: Over a rate limit or over the queue budget
+        """
+        self._check_rate(client, route_class)
+        if self.max_loop_lag > 0:
+            self._ensure_monitor()
+            if self.loop_lag > self.max_loop_lag:
+                raise self._reject(route_class, Rejected(
+                    503, "loop_lag", self.loop_lag, "Server is overloaded, retry later"
+                ))
+        lane = self._lanes[route_class]
+        if lane.in_flight < lane.limit and not lane.waiters:
+            lane.in_flight += 1
+            lane.admitted += 1
+            return
+
+        expected = lane.expected_wait()
+        if expected > self.queue_budget:
+            raise self._reject(route_class, Rejected(
+                503, "overloaded", expected, f"Too many {route_class} requests in progress, retry later"
+            ))
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_budget)
+        except asyncio.CancelledError:
+            # Client went away: give back a slot handed over meanwhile
+            if waiter.done():
+                lane.release(lane.service_time)
+            else:
+                lane.waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            lane.waiters.remove(waiter)
+            raise self._reject(route_class, Rejected(
+                503, "queue_timeout", max(expected, self.queue_budget),
+                f"Too many {route_class} requests in progress, retry later"
+            ))
+        lane.admitted += 1
+        lane.queued += 1
+        lane.wait_seconds += time.monotonic() - start
+
+    def release(self, route_class: str, held: float):
+        """Free the slot taken by acquire() (held: seconds it was held)"""
+        self._lanes[route_class].release(held)
+
+    def _ensure_monitor(self):
+        """Start the loop lag monitor (again after close() or in a new event loop)"""
+        if self._monitor is None or self._monitor.done() or self._monitor.get_loop() is not asyncio.get_running_loop():
+            self.loop_lag = 0.0
+            self._monitor = asyncio.create_task(self._watch_loop_lag())
+
+    async def _watch_loop_lag(self):
+        """
+        Measure how late a short sleep wakes up
+        The lower of the last two samples is kept, so a single stall (e.g. a
+        garbage collection) does not reject the requests queued behind it;
+        a loop that stays late does.
+        """
+        loop = asyncio.get_running_loop()
+        previous = 0.0
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+            self.loop_lag = min(lag, previous)
+            previous = lag
+
+    async def close(self):
+        """Stop the loop lag monitor"""
+        if self._monitor is not None and not self._monitor.done():
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+        self._monitor = None
+
+    def _reject(self, route_class: str, rejection: Rejected) -> Rejected:
+        """Count a rejection and return it"""
+        key = (route_class, rejection.reason)
+        self.rejected[key] = self.rejected.get(key, 0) + 1
+        logger.debug("🚦 %s %s request rejected (%s)", rejection.status_code, route_class, rejection.reason)
+        return rejection
+
+    def stats(self) -> dict:
+        """Get slots, queues and rejections per route class"""
+        return {
+            "enabled": self.enabled,
+            "clients": len(self._clients),
+            "loop_lag_seconds": round(self.loop_lag, 6),
+            "classes": {
+                route_class: {
+                    "limit": lane.limit,
+                    "in_flight": lane.in_flight,
+                    "queued": len(lane.waiters),
+                    "admitted": lane.admitted,
+                    "admitted_after_wait": lane.queued,
+                    "wait_seconds": round(lane.wait_seconds, 6),
+                    "service_seconds": round(lane.service_time, 6),
+                    "rejected": {
+                        reason: count for (name, reason), count in self.rejected.items() if name == route_class
+                    },
+                }
+                for route_class, lane in self._lanes.items()
+            },
+        }
+
+
+# ============================================
+# Middleware
+# ============================================
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI middleware applying an AdmissionController
+    Rejected requests are answered like an HTTPException ({"detail": ...})
+    with a Retry-After header (whole seconds, at least 1)
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None, client_header: str = ""):
+        self.app = app
+        self.controller = controller or admission
+        self._client_header = client_header.lower().encode("latin-1")
+
+    def _client(self, scope) -> str:
+        """Client identity: the configured header if present, else the client address"""
+        if self._client_header:
+            for key, value in scope["headers"]:
+                if key == self._client_header:
+                    return value.decode("latin-1")[:128]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        route_class = None
+        if scope["type"] == "http" and self.controller.enabled:
+            route_class = self.controller.classify(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(route_class, self._client(scope))
+        except Rejected as rejection:
+            response = JSONResponse(
+                {"detail": rejection.detail},
+                status_code=rejection.status_code,
+                headers={"Retry-After": str(max(1, math.ceil(rejection.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class, time.monotonic() - started)
+
+
+# Global controller (per worker process)
+admission = AdmissionController(
+    enabled=settings.ADMISSION_CONTROL,
+    client_rate=settings.ADMISSION_CLIENT_RATE,
+    client_burst=settings.ADMISSION_CLIENT_BURST,
+    global_rate=settings.ADMISSION_GLOBAL_RATE,
+    global_burst=settings.ADMISSION_GLOBAL_BURST,
+    max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+    queue_budget=settings.ADMISSION_QUEUE_BUDGET,
+    max_loop_lag=settings.ADMISSION_MAX_LOOP_LAG,
+    max_clients=settings.ADMISSION_MAX_CLIENTS,
+)
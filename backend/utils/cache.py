@@ -0,0 +1,266 @@
+"""
+In-process read cache for users
+Bounded LRU cache with TTL plus a table version used for ETag/Last-Modified
+"""
+import time
+import uuid
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Any, Callable, Hashable, Iterable, Optional, Sequence
+
+from config import settings
+from utils.shared_state import SharedState, shared_state
+
+
+# Sentinel returned by the get() of every cache when the key is not cached
+MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded LRU cache with per-entry time to live
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value, or MISSING if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries if full"""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Remove one entry"""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """Remove all entries"""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get counters and size of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class RowBytesCache:
+    """
+    Encoded JSON object of each row, by row ID
+    
+    A plain dict without TTL or per-hit LRU bookkeeping: looking a row up
+    must cost less than encoding it again. When full, the oldest inserted
+    entries are evicted first. Entries are invalidated by writes.
+    """
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: dict[Hashable, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Get the encoded row, or MISSING if not cached"""
+        encoded = self._entries.get(key, MISSING)
+        if encoded is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return encoded
+
+    def set(self, key: Hashable, encoded: bytes):
+        """Store an encoded row, evicting the oldest entries if full"""
+        if self.max_entries <= 0:
+            return
+        entries = self._entries
+        entries[key] = encoded
+        while len(entries) > self.max_entries:
+            del entries[next(iter(entries))]
+            self.evictions += 1
+
+    def encode_rows(self, rows: Sequence[Sequence[Any]], encode: Callable[[Sequence[Any]], bytes],
+                    store: bool = True) -> list[bytes]:
+        """
+        Get the encoded rows, encoding (and storing) the missing ones
+        
+        Args:
+            rows: Rows whose first value is the row ID
+            encode: Encodes one row
+            store: Whether to cache newly encoded rows (False if the rows may be stale)
+            
+        Returns:
+            Encoded rows, in order
+        """
+        entries = self._entries
+        encoded_rows = []
+        missing = 0
+        for row in rows:
+            encoded = entries.get(row[0])
+            if encoded is None:
+                encoded = encode(row)
+                missing += 1
+                if store:
+                    self.set(row[0], encoded)
+            encoded_rows.append(encoded)
+        self.hits += len(encoded_rows) - missing
+        self.misses += missing
+        return encoded_rows
+
+    def invalidate(self, key: Hashable):
+        """Remove one entry"""
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        """Remove all entries"""
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get counters and size of the cache (same fields as LRUCache)"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": 0,
+            "invalidations": self.invalidations,
+        }
+
+
+class TableVersion:
+    """
+    Monotonically increasing version of the users table
+    Bumped after every committed write; used to build ETag and Last-Modified
+    
+    With shared state (multi-worker deployment) the version lives in the
+    shared file, so every worker serves the same ETag, and refresh() drops
+    the local caches when another worker has written.
+    """
+
+    def __init__(self, caches: Iterable[LRUCache] = (), shared: Optional[SharedState] = None):
+        self._caches = tuple(caches)
+        self._shared = shared
+        if shared is None:
+            # Distinguishes versions across restarts (the counter starts at 0 again)
+            self._boot_id = uuid.uuid4().hex[:8]
+            self._version = 0
+            self._last_modified = time.time()
+        else:
+            self._boot_id = shared.boot_id
+            self._version = shared.table_version()
+
+    @property
+    def version(self) -> int:
+        """Current version"""
+        if self._shared is None:
+            return self._version
+        return self._shared.table_version()
+
+    @property
+    def last_modified(self) -> float:
+        """Time of the last committed write"""
+        if self._shared is None:
+            return self._last_modified
+        return self._shared.last_modified()
+
+    def refresh(self):
+        """
+        Clear the local caches if another worker committed a write since the
+        last check (no-op in a single process)
+        """
+        if self._shared is not None:
+            version = self._shared.table_version()
+            if version != self._version:
+                self._version = version
+                for cache in self._caches:
+                    cache.clear()
+
+    def bump(self):
+        """Register a committed write"""
+        if self._shared is None:
+            self._version += 1
+            self._last_modified = time.time()
+            return
+        version = self._shared.bump_table_version()
+        if version != self._version + 1:
+            # Writes from other workers happened in between
+            for cache in self._caches:
+                cache.clear()
+        self._version = version
+
+    @property
+    def etag(self) -> str:
+        """Weak ETag for the current version"""
+        return f'W/"{self._boot_id}-{self.version}"'
+
+    @property
+    def last_modified_http(self) -> str:
+        """Last-Modified header value (HTTP date)"""
+        return formatdate(self.last_modified, usegmt=True)
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """Check an If-None-Match header against the current ETag"""
+        if not if_none_match:
+            return False
+        current = self.etag.removeprefix("W/")
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == current:
+                return True
+        return False
+
+
+# Global cache instances
+user_list_cache = LRUCache("user_list", settings.CACHE_MAX_ENTRIES, settings.CACHE_TTL_SECONDS)
+user_row_cache = RowBytesCache("user_json", settings.ROW_CACHE_MAX_ENTRIES)
+users_version = TableVersion(caches=(user_list_cache, user_row_cache), shared=shared_state)
@@ -0,0 +1,305 @@
+"""
+Change feed for users (GET /users/changes, Server-Sent Events)
+
+Events come from the database, not from the process that made the write:
+the delta sync triggers stamp every change with the next sync version, and
+event IDs are those versions. Every worker process sees the writes of every
+other worker, and a client resuming with Last-Event-ID may reconnect to any
+worker, or after a restart.
+
+While the feed has subscribers, one tail task per process reads the changes
+after the last version it has seen: at once when a write of this process
+commits (notify()), and when the probe (the table version shared by the
+workers) shows a write of another worker, checked every poll interval.
+Events are encoded once and kept in a bounded log; a client resuming from
+before the log reads the missing events from the database. All subscribers
+wait on one shared asyncio.Event (woken by publish() or by one shared
+keep-alive timer) and subscribers at the same position share the same
+encoded bytes, so fan-out does not re-encode or copy payloads per subscriber.
+"""
+import asyncio
+from bisect import bisect_right
+from collections import deque
+from itertools import islice
+from operator import itemgetter
+from typing import AsyncIterator, Awaitable, Callable, Hashable, Iterable, NamedTuple, Optional
+
+from utils.log import get_logger
+from utils.serialization import dumps
+
+logger = get_logger(__name__)
+
+# One change: (sync version, event type, payload)
+Change = tuple[int, str, dict]
+
+# Changes read per query (tail task and resuming clients)
+READ_PAGE_SIZE = 1000
+
+
+class ChangeBatch(NamedTuple):
+    """Changes after a version, read by a ChangeSource"""
+    version: int             # Version the batch ends at (the next read starts after it)
+    reset: bool              # The changes since the requested version are gone: reload everything
+    changes: list[Change]
+    has_more: bool
+
+
+# Reads at most `limit` changes after a version (None: only the current version)
+ChangeSource = Callable[[Optional[int], int], Awaitable[ChangeBatch]]
+
+
+class ChangeFeed:
+    """
+    Bounded log of encoded change events, by sync version
+    Without a source, events are only added with publish()
+    """
+
+    def __init__(
+        self,
+        max_events: int,
+        heartbeat: float = 15.0,
+        source: Optional[ChangeSource] = None,
+        probe: Optional[Callable[[], Hashable]] = None,
+        poll_interval: float = 0.1,
+    ):
+        self._events: deque[tuple[int, bytes]] = deque(maxlen=max_events)
+        self._floor = 0      # The log holds every event in (_floor, _last_id]
+        self._last_id = 0
+        self._head = 0       # Latest version seen in the database
+        self._wakeup = asyncio.Event()
+        self._heartbeat = heartbeat
+        self._heartbeat_timer: Optional[asyncio.TimerHandle] = None
+        self._heartbeat_loop: Optional[asyncio.AbstractEventLoop] = None
+        # last_id -> (new last_id, encoded events after it); reset on publish
+        self._pending_cache: dict[int, tuple[int, bytes]] = {}
+        self._source = source
+        self._probe = probe
+        self._poll_interval = poll_interval
+        self._tail_task: Optional[asyncio.Task] = None
+        self._tailing: Optional[asyncio.Future] = None   # Done once the tail task has its starting version
+        self._notified = asyncio.Event()
+        self.subscribers = 0
+        self.published = 0
+        self.reads = 0
+        self.catch_ups = 0
+
+    @property
+    def last_id(self) -> int:
+        """ID of the latest event (0 if none)"""
+        return self._last_id
+
+    @staticmethod
+    def _encode(version: int, event_type: str, payload: dict) -> bytes:
+        """Encode one event as a Server-Sent Events message"""
+        return b"id: %d\nevent: %s\ndata: %s\n\n" % (version, event_type.encode(), dumps(payload))
+
+    def publish(self, changes: Iterable[Change], version: int = 0):
+        """
+        Append changes newer than the log and wake up the subscribers
+
+        Args:
+            changes: (version, event type, payload) in version order; event
+                types are created, updated, deleted and reset
+            version: Version the log is up to date with (at least the last change)
+        """
+        count = 0
+        for change_version, event_type, payload in changes:
+            if change_version <= self._last_id:
+                continue
+            if len(self._events) == self._events.maxlen:
+                self._floor = self._events[0][0]
+            self._events.append((change_version, self._encode(change_version, event_type, payload)))
+            self._last_id = change_version
+            count += 1
+        if count:
+            self.published += count
+        if version > self._last_id:
+            # Versions without an event (changes overwritten by later ones)
+            self._last_id = version
+        elif not count:
+            return
+        self._pending_cache.clear()
+        self._wake()
+
+    def notify(self):
+        """A write of this process committed: read the new changes now"""
+        self._notified.set()
+
+    def _wake(self):
+        """Wake every waiter at once; new waiters use a fresh event"""
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def _on_heartbeat(self):
+        """Shared keep-alive timer: idle subscribers wake up and send a comment"""
+        self._heartbeat_timer = None
+        if self.subscribers:
+            self._wake()
+            self._schedule_heartbeat()
+
+    def _schedule_heartbeat(self):
+        """Start the keep-alive timer if it is not running (in this event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._heartbeat_timer is None or self._heartbeat_loop is not loop:
+            self._heartbeat_loop = loop
+            self._heartbeat_timer = loop.call_later(self._heartbeat, self._on_heartbeat)
+
+    def events_after(self, last_id: int) -> Optional[tuple[int, bytes]]:
+        """
+        Get the encoded events published after an event ID
+
+        Returns:
+            (ID of the latest event, encoded events), or None if last_id is
+            not covered by the log (older than it, or newer than its last event)
+        """
+        if last_id == self._last_id:
+            return last_id, b""
+        cached = self._pending_cache.get(last_id)
+        if cached is not None:
+            return cached
+        if last_id < self._floor or last_id > self._last_id:
+            return None
+        start = bisect_right(self._events, last_id, key=itemgetter(0))
+        chunk = b"".join(encoded for _, encoded in islice(self._events, start, None))
+        result = self._pending_cache[last_id] = (self._last_id, chunk)
+        return result
+
+    # ============================================
+    # Reading the source
+    # ============================================
+
+    async def _read(self, since: Optional[int], limit: int) -> ChangeBatch:
+        """Read the source and remember the latest version it has"""
+        self.reads += 1
+        batch = await self._source(since, limit)
+        self._head = max(self._head, batch.version)
+        return batch
+
+    def _ensure_tail(self) -> asyncio.Future:
+        """Start the tail task (again after the last subscriber left, or in a new event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._tail_task is None or self._tail_task.done() or self._tail_task.get_loop() is not loop:
+            self._tailing = loop.create_future()
+            self._notified = asyncio.Event()  # The new log starts at the current version
+            self._tail_task = asyncio.create_task(self._tail(self._tailing))
+        return self._tailing
+
+    async def _tail(self, tailing: asyncio.Future):
+        """
+        Follow the source while there are subscribers
+        The log starts at the current version: older positions are read from
+        the source by the subscribers that need them
+        """
+        try:
+            batch = await self._read(None, 0)
+            self._events.clear()
+            self._pending_cache.clear()
+            self._floor = self._last_id = batch.version
+            tailing.set_result(None)
+            probed = self._probe() if self._probe is not None else None
+            while self.subscribers:
+                try:
+                    await asyncio.wait_for(self._notified.wait(), self._poll_interval)
+                except asyncio.TimeoutError:
+                    if self._probe is None or self._probe() == probed:
+                        continue
+                self._notified.clear()
+                if self._probe is not None:
+                    probed = self._probe()
+                try:
+                    await self._pull()
+                except Exception as error:
+                    logger.warning("⚠️  Change feed read failed, retrying: %s", error)
+                    self._notified.set()
+        except Exception as error:
+            if not tailing.done():
+                tailing.set_exception(error)
+            raise
+
+    async def _pull(self):
+        """Publish the changes after the last event of the log"""
+        while True:
+            batch = await self._read(self._last_id, READ_PAGE_SIZE)
+            if batch.reset:
+                self.publish([(batch.version, "reset", {})])
+                return
+            self.publish(batch.changes, batch.version)
+            if not batch.has_more:
+                return
+
+    async def _catch_up(self, since: int) -> tuple[int, bytes]:
+        """
+        Events after a position older than the log, read from the source
+
+        Returns:
+            (position reached, encoded events), or a reset event at the
+            latest version if the changes since then are gone or would not
+            fit in the log (the client reloads everything, then follows on)
+        """
+        self.catch_ups += 1
+        if self._source is None:
+            return self._last_id, self._encode(self._last_id, "reset", {})
+        chunks = []
+        count = 0
+        while True:
+            batch = await self._read(since, READ_PAGE_SIZE)
+            count += len(batch.changes)
+            if batch.reset:
+                return batch.version, self._encode(batch.version, "reset", {})
+            if count > self._events.maxlen:
+                # batch.version is the end of this page: reset at the latest version
+                head = (await self._read(None, 0)).version
+                return head, self._encode(head, "reset", {})
+            chunks.extend(self._encode(*change) for change in batch.changes)
+            since = batch.version
+            if not batch.has_more:
+                return since, b"".join(chunks)
+
+    async def subscribe(self, last_event_id: Optional[int]) -> AsyncIterator[bytes]:
+        """
+        Stream encoded events for one client
+        A keep-alive comment is sent when a heartbeat passes without events
+
+        Args:
+            last_event_id: Resume after this event (None: only new events)
+        """
+        self.subscribers += 1
+        self._schedule_heartbeat()
+        try:
+            yield b"retry: 3000\n\n"
+            if self._source is not None:
+                await self._ensure_tail()
+            last_id = self._last_id if last_event_id is None else last_event_id
+            while True:
+                pending = self.events_after(last_id)
+                if pending is None:
+                    if self._last_id < last_id <= self._head:
+                        # Read by a catch-up before the tail task got there
+                        await self._wakeup.wait()
+                        continue
+                    last_id, chunk = await self._catch_up(last_id)
+                    if chunk:
+                        yield chunk
+                    continue
+                last_id, chunk = pending
+                if chunk:
+                    yield chunk
+                    continue
+
+                await self._wakeup.wait()
+                if last_id == self._last_id:
+                    yield b": keep-alive\n\n"
+        finally:
+            self.subscribers -= 1
+
+    def stats(self) -> dict:
+        """Get counters of the feed"""
+        return {
+            "last_event_id": self._last_id,
+            "logged_events": len(self._events),
+            "max_events": self._events.maxlen,
+            "published": self.published,
+            "subscribers": self.subscribers,
+            "source_reads": self.reads,
+            "catch_ups": self.catch_ups,
+        }
@@ -0,0 +1,98 @@
+"""
+Request coalescing (single-flight) for identical concurrent reads
+
+The first request for a key runs the work in a task; requests for the same
+key arriving before it finishes await that task instead of repeating the
+work, and all of them get the same result (or the same exception).
+Keys include the table version, so a read that starts after a committed
+write never joins a flight started before it.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from config import settings
+
+
+class _Flight:
+    """Work in progress for one key"""
+    __slots__ = ("task", "followers")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Share the result of in-flight work between callers with the same key
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._flights: dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+        self.saved_seconds = 0.0
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `work` for a key, or join the run already in flight
+
+        The work runs in its own task (with the first caller's context), so
+        a caller that disconnects does not cancel it for the others.
+
+        Args:
+            key: Identifies identical work
+            work: Coroutine function producing the result
+
+        Returns:
+            Result of the work
+        """
+        if not self.enabled:
+            return await work()
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(self._lead(key, work)))
+            flight.task.add_done_callback(_retrieve_exception)
+            self._flights[key] = flight
+            self.leaders += 1
+        else:
+            flight.followers += 1
+            self.followers += 1
+        return await asyncio.shield(flight.task)
+
+    async def _lead(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run the work, then close the flight (later callers start a new one)"""
+        start = time.perf_counter()
+        try:
+            return await work()
+        finally:
+            flight = self._flights.pop(key)
+            # Work that the followers did not have to repeat
+            self.saved_seconds += (time.perf_counter() - start) * flight.followers
+
+    def stats(self) -> dict:
+        """Get counters of the coalesced reads"""
+        requests = self.leaders + self.followers
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "executions": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_ratio": round(self.followers / requests, 4) if requests else 0.0,
+            "saved_seconds": round(self.saved_seconds, 6),
+        }
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """Mark the exception as retrieved if every caller went away before the end"""
+    if not task.cancelled():
+        task.exception()
+
+
+# Global flights (per worker process), one per read endpoint
+user_flight = SingleFlight("user", settings.COALESCE_READS)
+user_list_flight = SingleFlight("user_list", settings.COALESCE_READS)
@@ -0,0 +1,316 @@
+"""
+HTTP response compression (Accept-Encoding negotiation)
+
+gzip is always available; brotli (br) and zstd are used when the optional
+`brotli` / `zstandard` packages are installed. Bodies smaller than
+COMPRESSION_MIN_SIZE and event streams are sent as is.
+
+Cached response bodies are wrapped in PrecompressedBody, which keeps each
+compressed variant next to the raw bytes, so repeated requests do not
+compress the same body again.
+"""
+import time
+import zlib
+from functools import lru_cache
+from typing import Optional
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+
+# Content types worth compressing (prefix match); text/event-stream is excluded
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+NOT_COMPRESSIBLE_TYPES = ("text/event-stream",)
+
+
+# ============================================
+# Codecs
+# ============================================
+
+class _Compressor:
+    """Incremental compressor with one interface for every codec"""
+    __slots__ = ("_compress", "_flush", "_finish")
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == "gzip":
+            codec = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+            self._compress, self._finish = codec.compress, codec.flush
+            self._flush = lambda: codec.flush(zlib.Z_SYNC_FLUSH)
+        elif encoding == "br":
+            codec = brotli.Compressor(quality=level)
+            self._compress, self._flush, self._finish = codec.process, codec.flush, codec.finish
+        elif encoding == "zstd":
+            codec = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress, self._finish = codec.compress, codec.flush
+            self._flush = lambda: codec.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        """Feed data, return the compressed bytes available so far"""
+        return self._compress(data)
+
+    def flush(self) -> bytes:
+        """Return everything fed so far, decodable by the client now (the stream goes on)"""
+        return self._flush()
+
+    def finish(self) -> bytes:
+        """End the stream, return the remaining compressed bytes"""
+        return self._finish()
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Encodings supported here, in server preference order (COMPRESSION_ENCODINGS)"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return tuple(encoding for encoding in settings.COMPRESSION_ENCODINGS if installed.get(encoding))
+
+
+ENCODINGS = available_encodings()
+
+
+class CompressionStats:
+    """Bytes in/out and time spent per encoding (reported by /metrics)"""
+
+    def __init__(self):
+        self.input_bytes = dict.fromkeys(ENCODINGS, 0)
+        self.output_bytes = dict.fromkeys(ENCODINGS, 0)
+        self.seconds = dict.fromkeys(ENCODINGS, 0.0)
+        self.cached_hits = dict.fromkeys(ENCODINGS, 0)
+
+    def record(self, encoding: str, input_bytes: int, output_bytes: int, seconds: float):
+        """Add one compressed body"""
+        self.input_bytes[encoding] += input_bytes
+        self.output_bytes[encoding] += output_bytes
+        self.seconds[encoding] += seconds
+
+
+compression_stats = CompressionStats()
+
+
+def new_compressor(encoding: str, level: Optional[int] = None) -> _Compressor:
+    """Create an incremental compressor (level: COMPRESSION_LEVELS by default)"""
+    return _Compressor(encoding, settings.COMPRESSION_LEVELS[encoding] if level is None else level)
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    """
+    Compress a whole body
+
+    Args:
+        encoding: gzip, br or zstd (must be installed)
+        data: Raw body
+        level: Compression level (COMPRESSION_LEVELS by default)
+
+    Returns:
+        Compressed body
+    """
+    start = time.perf_counter()
+    compressor = new_compressor(encoding, level)
+    compressed = compressor.compress(data) + compressor.finish()
+    compression_stats.record(encoding, len(data), len(compressed), time.perf_counter() - start)
+    return compressed
+
+
+@lru_cache(maxsize=256)
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Choose the response encoding from an Accept-Encoding header
+
+    The server preference order wins among the encodings the client accepts
+    (q > 0, directly or through *).
+
+    Returns:
+        Encoding to use, or None to send the body as is
+    """
+    if not accept_encoding or not settings.COMPRESSION_ENABLED:
+        return None
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a content type is worth compressing"""
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(NOT_COMPRESSIBLE_TYPES)
+
+
+def _with_vary(headers: list[tuple[bytes, bytes]]) -> list[tuple[bytes, bytes]]:
+    """Add Accept-Encoding to the Vary header (the body depends on it)"""
+    for index, (name, value) in enumerate(headers):
+        if name == b"vary":
+            if b"accept-encoding" in value.lower() or value == b"*":
+                return headers
+            headers = list(headers)
+            headers[index] = (name, value + b", Accept-Encoding")
+            return headers
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+# ============================================
+# Cached bodies
+# ============================================
+
+class PrecompressedBody:
+    """
+    Response body with its compressed variants, compressed on first use
+    Stored in caches instead of the raw bytes
+    """
+    __slots__ = ("raw", "_variants")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._variants: dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+        """
+        Get the body for a negotiated encoding
+
+        Returns:
+            (body, Content-Encoding or None if sent as is)
+        """
+        if encoding is None or len(self.raw) < settings.COMPRESSION_MIN_SIZE:
+            return self.raw, None
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = self._variants[encoding] = compress(encoding, self.raw)
+        else:
+            compression_stats.cached_hits[encoding] += 1
+        return variant, encoding
+
+
+# ============================================
+# Middleware
+# ============================================
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses for clients that accept it
+
+    Whole bodies below COMPRESSION_MIN_SIZE are sent as is; streamed bodies
+    are compressed incrementally and flushed after every chunk, so each
+    chunk reaches the client at once. Responses that already have a
+    Content-Encoding (e.g. precompressed cached bodies) pass through.
+    Every compressible response carries Vary: Accept-Encoding, compressed
+    or not, so shared caches keep the variants apart.
+    """
+
+    def __init__(self, app, min_size: Optional[int] = None):
+        self.app = app
+        self.min_size = settings.COMPRESSION_MIN_SIZE if min_size is None else min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            async def send_vary(message):
+                if message["type"] == "http.response.start" and self._is_compressible(message["headers"]):
+                    message = {**message, "headers": _with_vary(message["headers"])}
+                await send(message)
+
+            await self.app(scope, receive, send_vary)
+            return
+
+        start_message = None
+        compressor = None
+        input_bytes = output_bytes = 0
+        seconds = 0.0
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, input_bytes, output_bytes, seconds
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if start_message is not None:
+                # First body message: decide whether to compress
+                start, start_message = start_message, None
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                headers = list(start["headers"])
+                if not self._is_compressible(headers):
+                    await send(start)
+                    await send(message)
+                    return
+                if not more_body and len(body) < self.min_size:
+                    await send({**start, "headers": _with_vary(headers)})
+                    await send(message)
+                    return
+                compressor = new_compressor(encoding)
+                headers = _with_vary([(name, value) for name, value in headers if name != b"content-length"])
+                headers.append((b"content-encoding", encoding.encode()))
+                started = time.perf_counter()
+                data = compressor.compress(body)
+                if more_body:
+                    data += compressor.flush()
+                else:
+                    data += compressor.finish()
+                    headers.append((b"content-length", str(len(data)).encode()))
+                seconds += time.perf_counter() - started
+                input_bytes += len(body)
+                output_bytes += len(data)
+                await send({**start, "headers": headers})
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+            elif compressor is not None:
+                body = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                started = time.perf_counter()
+                data = compressor.compress(body)
+                data += compressor.flush() if more_body else compressor.finish()
+                seconds += time.perf_counter() - started
+                input_bytes += len(body)
+                output_bytes += len(data)
+                if data or not more_body:
+                    await send({"type": "http.response.body", "body": data, "more_body": more_body})
+            else:
+                await send(message)
+
+            if compressor is not None and not message.get("more_body", False):
+                compression_stats.record(encoding, input_bytes, output_bytes, seconds)
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None:
+            # Response without a body message
+            await send(start_message)
+
+    @staticmethod
+    def _is_compressible(headers: list[tuple[bytes, bytes]]) -> bool:
+        """Compressible content type and no Content-Encoding yet"""
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return is_compressible(content_type.decode("latin-1"))
@@ -3,16 +3,43 @@ Utilities to simulate network/server latency
 Dynamic latency system configurable at runtime
 """
 import asyncio
+import math
+import random
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
+from typing import Optional
+from fastapi import HTTPException
 from config import LatencyMode, LatencyConfig, settings
+from schemas import LatencyDistribution, LatencyProfile, LatencyRule
+from utils.log import get_logger
+from utils.metrics import record_delay
+from utils.shared_state import shared_state
+
+logger = get_logger(__name__)
+
+# ASGI scope of the request being served (set by LatencyScopeMiddleware)
+# After routing, scope["route"] holds the matched route template
+_request_scope: ContextVar[Optional[dict]] = ContextVar("latency_request_scope", default=None)
+
+# Marker for "no rule matches this route/method" in the rule cache
+_NO_RULE = object()
 
 
 class LatencyManager:
     """
     Global latency manager
     Allows changing latency mode at runtime
+    
+    In a multi-worker deployment, changes are published to the shared state
+    and every worker picks them up on its next request (one sequence number
+    read per check).
     """
     _instance = None
     _current_mode:  LatencyMode = settings.DEFAULT_LATENCY_MODE
+    _profile: Optional[LatencyProfile] = None
+    _rule_cache: dict = {}
+    _random: random.Random = random.Random()
+    _shared_sequence: int = -1
     
     def __new__(cls):
         """Singleton pattern - only one instance"""
@@ -23,6 +50,7 @@ class LatencyManager:
     @property
     def current_mode(self) -> LatencyMode:
         """Get current latency mode"""
+        self._sync()
         return self._current_mode
     
     @current_mode.setter
@@ -31,33 +59,132 @@ class LatencyManager:
         if mode not in LatencyMode: 
             raise ValueError(f"Invalid mode: {mode}")
         
+        self._sync()
         old_mode = self._current_mode
         self._current_mode = mode
+        self._publish()
         
         config = LatencyConfig.get_delays(mode)
-        print(f"\n{'='*60}")
-        print(f"🎛️  Latency changed:  {old_mode.value} → {mode.value}")
-        print(f"   📖 Read (GET):     {config['read']*1000:.0f}ms")
-        print(f"   ✏️  Write (POST/PATCH/DELETE): {config['write']*1000:.0f}ms")
-        print(f"{'='*60}\n")
+        logger.info(
+            "🎛️  Latency changed: %s → %s (read %.0fms / write %.0fms)",
+            old_mode.value, mode.value, config['read'] * 1000, config['write'] * 1000
+        )
     
     def get_read_delay(self) -> float:
         """Get current delay for read operations (GET)"""
+        self._sync()
         config = LatencyConfig.get_delays(self._current_mode)
         return config['read']
     
     def get_write_delay(self) -> float:
         """Get current delay for write operations (POST/PATCH/DELETE)"""
+        self._sync()
         config = LatencyConfig.get_delays(self._current_mode)
         return config['write']
     
     def get_config(self) -> dict:
         """Get complete configuration of current mode"""
+        self._sync()
         return LatencyConfig.get_delays(self._current_mode)
     
     def get_all_modes(self) -> dict:
         """Get information about all available modes"""
         return LatencyConfig.LATENCY_MODES
+    
+    @property
+    def profile(self) -> Optional[LatencyProfile]:
+        """Get the active latency profile (None: only the mode applies)"""
+        self._sync()
+        return self._profile
+    
+    def set_profile(self, profile: Optional[LatencyProfile]):
+        """
+        Activate a latency profile, or remove it with None
+        The random generator is re-seeded so runs with the same seed are reproducible
+        """
+        self._sync()
+        self._apply_profile(profile)
+        self._publish()
+        if profile:
+            logger.info("🎛️  Latency profile: %s (%d rules, seed %s)", profile.name, len(profile.rules), profile.seed)
+        else:
+            logger.info("🎛️  Latency profile removed")
+    
+    def _apply_profile(self, profile: Optional[LatencyProfile]):
+        """Replace the profile and reset the rule cache and random generator"""
+        self._profile = profile
+        self._rule_cache = {}
+        self._random = random.Random(profile.seed if profile else None)
+    
+    def _publish(self):
+        """Share the mode and profile with the other workers"""
+        if shared_state is not None:
+            shared_state.update_config("latency", {
+                "mode": self._current_mode.value,
+                "profile": self._profile.model_dump() if self._profile else None,
+            })
+            self._shared_sequence = shared_state.config_sequence()
+    
+    def _sync(self):
+        """Apply a mode or profile published by another worker"""
+        if shared_state is None or shared_state.config_sequence() == self._shared_sequence:
+            return
+        self._shared_sequence = shared_state.config_sequence()
+        config = shared_state.read_config().get("latency")
+        if config is None:
+            return
+        self._current_mode = LatencyMode(config["mode"])
+        profile = config["profile"]
+        self._apply_profile(LatencyProfile.model_validate(profile) if profile else None)
+        logger.debug("🎛️  Latency settings loaded from shared state: %s", self._current_mode.value)
+    
+    def find_rule(self, method: str, route: str) -> Optional[LatencyRule]:
+        """
+        Get the first profile rule matching a request (memoized per route/method)
+        
+        Args:
+            method: HTTP method
+            route: Route template, e.g. /users/{user_id}
+        """
+        if self._profile is None:
+            return None
+        key = (method, route)
+        rule = self._rule_cache.get(key)
+        if rule is None:
+            rule = next(
+                (candidate for candidate in self._profile.rules
+                 if candidate.method in ("*", method) and fnmatchcase(route, candidate.route)),
+                _NO_RULE
+            )
+            self._rule_cache[key] = rule
+        return None if rule is _NO_RULE else rule
+    
+    def chance(self, probability: float) -> bool:
+        """Return True with the given probability (seeded generator)"""
+        return probability > 0 and self._random.random() < probability
+    
+    def sample(self, distribution: LatencyDistribution) -> float:
+        """
+        Draw a delay in seconds from a distribution
+        
+        Args:
+            distribution: Distribution and its parameters
+        """
+        rng = self._random
+        kind = distribution.type
+        if kind == "constant":
+            value = distribution.value
+        elif kind == "uniform":
+            value = rng.uniform(distribution.low, distribution.high)
+        elif kind == "normal":
+            value = rng.gauss(distribution.mean, distribution.stddev)
+        elif kind == "lognormal":
+            value = rng.lognormvariate(math.log(distribution.median), distribution.sigma)
+        else:
+            value = distribution.scale * rng.paretovariate(distribution.alpha)
+        if distribution.max is not None:
+            value = min(value, distribution.max)
+        return max(value, 0.0)
 
 
 # Global instance of the manager
@@ -73,28 +200,82 @@ async def simulate_delay(seconds: float):
     """
     if seconds > 0:
         await asyncio.sleep(seconds)
+        record_delay(seconds)
 
 
-async def delay_read():
+async def _simulate_request(kind: str, mode_delay: float):
     """
-    Delay for READ operations (GET)
-    Uses current latency mode
+    Apply the profile rule of the current request, or the mode delay
+    
+    Args:
+        kind: "READ" or "WRITE" (for logs)
+        mode_delay: Delay of the current mode, used without a rule or rule delay
+        
+    Raises:
+        HTTPException: Injected error (error_status) or timeout (504)
     """
-    delay = latency_manager.get_read_delay()
+    rule = None
+    scope = _request_scope.get()
+    if scope is not None and latency_manager.profile is not None:
+        route = scope.get("route")
+        rule = latency_manager.find_rule(scope["method"], getattr(route, "path", scope["path"]))
+    
+    if rule is None:
+        if mode_delay > 0:
+            logger.debug("⏳ [%s] Simulating latency: %.0fms", kind, mode_delay * 1000)
+            await simulate_delay(mode_delay)
+        return
+    
+    if latency_manager.chance(rule.timeout_probability):
+        logger.debug("⏳ [%s] Injected timeout after %.0fms", kind, rule.timeout_seconds * 1000)
+        await simulate_delay(rule.timeout_seconds)
+        raise HTTPException(status_code=504, detail="Injected timeout")
+    
+    delay = latency_manager.sample(rule.delay) if rule.delay else mode_delay
+    if latency_manager.chance(rule.spike_probability):
+        delay += latency_manager.sample(rule.spike)
     if delay > 0:
-        print(f"⏳ [READ] Simulating latency:  {delay*1000:.0f}ms")
+        logger.debug("⏳ [%s] Simulating latency: %.0fms", kind, delay * 1000)
         await simulate_delay(delay)
+    
+    if latency_manager.chance(rule.error_probability):
+        raise HTTPException(status_code=rule.error_status, detail="Injected error")
+
+
+async def delay_read():
+    """
+    Delay for READ operations (GET)
+    Uses the active profile rule, or the current latency mode
+    """
+    await _simulate_request("READ", latency_manager.get_read_delay())
 
 
 async def delay_write():
     """
     Delay for WRITE operations (POST/PATCH/DELETE)
-    Uses current latency mode
+    Uses the active profile rule, or the current latency mode
     """
-    delay = latency_manager.get_write_delay()
-    if delay > 0:
-        print(f"⏳ [WRITE] Simulating latency: {delay*1000:.0f}ms")
-        await simulate_delay(delay)
+    await _simulate_request("WRITE", latency_manager.get_write_delay())
+
+
+class LatencyScopeMiddleware:
+    """
+    Pure ASGI middleware exposing the request scope to the delay functions,
+    so profile rules can match the route template and method
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
 
 
 # Aliases for compatibility/clarity
@@ -0,0 +1,170 @@
+"""
+Group commit for single-row writes
+
+Write operations are put on a queue; one writer task takes them in
+micro-batches (up to GROUP_COMMIT_MAX_BATCH operations, waiting at most
+GROUP_COMMIT_MAX_DELAY for more) and runs the whole batch in one transaction
+with a single COMMIT, so concurrent writers share the commit (fsync) cost
+instead of queueing for the write lock one by one. With no delay, a batch
+holds the writes that arrived while the previous batch was being committed.
+
+Each operation runs in its own SAVEPOINT: an operation that fails (e.g. a
+duplicate email) is rolled back alone and its caller gets the exception,
+while the rest of the batch is committed.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Operation run by the writer: returns (result for the caller, action run after the commit or None)
+WriteOperation = Callable[[AsyncSession], Awaitable[tuple[Any, Optional[Callable[[], None]]]]]
+
+
+class GroupCommitQueue:
+    """
+    Queue of write operations committed in batches by a single writer task
+    """
+
+    def __init__(self, name: str, session_factory: async_sessionmaker, enabled: bool = False,
+                 max_batch: int = 64, max_delay: float = 0.0):
+        self.name = name
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.committed = 0
+        self.failed = 0
+        self.largest_batch = 0
+        self.commit_seconds = 0.0
+
+    async def submit(self, operation: WriteOperation) -> Any:
+        """
+        Queue a write operation and wait until its batch is committed
+
+        Args:
+            operation: Coroutine function applying the write to the writer's
+                session (flushed, not committed)
+
+        Returns:
+            Result of the operation, once committed
+
+        Raises:
+            Exception: Raised by the operation, or by the batch commit
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._ensure_writer()
+        self._queue.put_nowait((operation, future))
+        return await future
+
+    def _ensure_writer(self):
+        """Start the writer task (again after close() or in a new event loop)"""
+        if self._writer is None or self._writer.done() or self._writer.get_loop() is not asyncio.get_running_loop():
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run(self._queue))
+
+    async def _run(self, queue: asyncio.Queue):
+        """Writer loop: take a batch, commit it, repeat (until close() queues None)"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                await self._commit_batch(batch)
+            except Exception:  # Never let the writer die: callers are already answered
+                logger.exception("❌ Group commit writer error (%s)", self.name)
+
+    async def _commit_batch(self, batch: list[tuple[WriteOperation, asyncio.Future]]):
+        """Run every operation in its own savepoint, commit once, then answer the callers"""
+        start = time.perf_counter()
+        applied: list[tuple[asyncio.Future, Any, Optional[Callable[[], None]]]] = []
+        async with self._session_factory() as db:
+            try:
+                # Take the write lock now: the driver would otherwise open the
+                # transaction lazily and the first RELEASE would commit on its own
+                connection = await db.connection()
+                await connection.exec_driver_sql("BEGIN IMMEDIATE")
+                for operation, future in batch:
+                    if future.done():  # Caller went away before its write started
+                        continue
+                    try:
+                        async with db.begin_nested():
+                            result, on_commit = await operation(db)
+                    except Exception as exc:
+                        self.failed += 1
+                        if not future.done():
+                            future.set_exception(exc)
+                    else:
+                        applied.append((future, result, on_commit))
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                self.failed += len(applied)
+                for future, _, _ in applied:
+                    if not future.done():
+                        future.set_exception(exc)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                logger.error("❌ Group commit of %d operations failed (%s): %r", len(batch), self.name, exc)
+                return
+
+        self.batches += 1
+        self.committed += len(applied)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.commit_seconds += time.perf_counter() - start
+        for future, result, on_commit in applied:
+            # The write is committed even if its caller went away
+            if on_commit is not None:
+                on_commit()
+            if not future.done():
+                future.set_result(result)
+        logger.debug("📦 Group commit: %d operations in one transaction (%s)", len(batch), self.name)
+
+    async def close(self):
+        """Commit the operations already queued, then stop the writer"""
+        if self._writer is None or self._writer.done():
+            return
+        self._queue.put_nowait(None)
+        await self._writer
+        self._writer = None
+
+    def stats(self) -> dict:
+        """Get counters of the batched writes"""
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "committed": self.committed,
+            "failed": self.failed,
+            "average_batch": round(self.committed / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "commit_seconds": round(self.commit_seconds, 6),
+        }
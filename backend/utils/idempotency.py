@@ -0,0 +1,332 @@
+"""
+Idempotency keys for writes (Idempotency-Key header)
+
+A client that retries a write (after a timeout, a dropped connection...)
+sends the same Idempotency-Key. The first request with a key runs and its
+response is stored; a retry gets the stored response back (with
+`Idempotent-Replayed: true`) without running the write again, and a
+duplicate arriving while the original is still running waits for it.
+
+Keys live in a SQLite table (shared by the worker processes) until
+IDEMPOTENCY_TTL_SECONDS after the response; expired keys are purged
+periodically. A key reused with another method, path or body is answered
+422. Only outcomes of the write are stored: server errors (5xx), 429 and
+responses that did not come from a route (admission control rejections run
+before routing) release the key, so a retry runs the write again.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import Table, delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import JSONResponse
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Stored response: (status code, content type, replayed headers, body)
+StoredResponse = tuple[int, Optional[str], list[tuple[str, str]], bytes]
+
+# Response headers stored and replayed besides Content-Type
+REPLAYED_HEADERS = (b"location", b"etag", b"retry-after")
+
+# Interval between checks of an original running in another worker process
+POLL_INTERVAL = 0.05
+
+# Writes accepting an Idempotency-Key: POST /users, PATCH/PUT/DELETE /users/{id}
+_USER_PATH = re.compile(r"/users/\d+")
+
+
+def is_idempotent_write(method: str, path: str) -> bool:
+    """True for the routes that accept an Idempotency-Key"""
+    if method == "POST":
+        return path == "/users"
+    return method in ("PATCH", "PUT", "DELETE") and _USER_PATH.fullmatch(path) is not None
+
+
+class IdempotencyError(Exception):
+    """The key cannot be used for this request (answered with status_code)"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class IdempotencyStore:
+    """
+    Idempotency keys and their stored responses in a database table
+
+    Duplicates in the same process wait on a future of the original;
+    duplicates in other worker processes poll the row until it has a response.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        table: Table,
+        ttl: float,
+        lock_seconds: float = 60.0,
+        wait_seconds: float = 30.0,
+        purge_seconds: float = 60.0,
+    ):
+        self.session_factory = session_factory
+        self.table = table
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self.purge_seconds = purge_seconds
+        # key -> (fingerprint, future of the response; None if the original failed)
+        self._in_flight: dict[str, tuple[bytes, asyncio.Future]] = {}
+        self._last_purge = 0.0
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+        self.mismatched = 0
+        self.timed_out = 0
+        self.purged = 0
+
+    async def begin(self, key: str, fingerprint: bytes) -> Optional[StoredResponse]:
+        """
+        Claim a key, or get the response of the request that claimed it
+
+        Args:
+            key: Idempotency-Key of the request
+            fingerprint: Hash of the method, path and body of the request
+
+        Returns:
+            None if the caller owns the key and must run the request (then
+            call complete() or abandon()), else the stored response to replay
+
+        Raises:
+            IdempotencyError: Key used for another request (422), or the
+                original did not finish within wait_seconds (409)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_seconds
+        while True:
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                # Original running in this process: wait for its response
+                self._check_fingerprint(in_flight[0], fingerprint)
+                self.joined += 1
+                done, _ = await asyncio.wait({in_flight[1]}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    raise self._timeout(key)
+                response = in_flight[1].result()
+                if response is not None:
+                    self.replayed += 1
+                    return response
+                continue  # The original failed: claim the key again
+
+            async with self.session_factory() as db:
+                row = (await db.execute(
+                    select(self.table.c.fingerprint, self.table.c.status_code, self.table.c.content_type,
+                           self.table.c.headers, self.table.c.body, self.table.c.expires_at)
+                    .where(self.table.c.key == key)
+                )).first()
+                now = time.time()
+                if row is None or row.expires_at < now:
+                    if await self._claim(db, key, fingerprint, now):
+                        self._in_flight[key] = (fingerprint, loop.create_future())
+                        self.executed += 1
+                        return None
+                    continue  # Claimed by another worker first
+            self._check_fingerprint(row.fingerprint, fingerprint)
+            if row.status_code is not None:
+                self.replayed += 1
+                headers = [tuple(header) for header in json.loads(row.headers)] if row.headers else []
+                return row.status_code, row.content_type, headers, row.body
+            # Original running in another worker process
+            if loop.time() >= deadline:
+                raise self._timeout(key)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _claim(self, db: AsyncSession, key: str, fingerprint: bytes, now: float) -> bool:
+        """Insert the key as in progress (or take over an expired one); False if it is taken"""
+        values = {"fingerprint": fingerprint, "status_code": None, "content_type": None, "headers": None,
+                  "body": None, "expires_at": now + self.lock_seconds}
+        statement = sqlite_insert(self.table).values(key=key, **values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_=values,
+            where=self.table.c.expires_at < now,
+        )
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount == 1
+
+    async def complete(self, key: str, response: StoredResponse):
+        """Store the response of the original request and wake up its duplicates"""
+        now = time.time()
+        status_code, content_type, headers, body = response
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(self.table).where(self.table.c.key == key)
+                    .values(status_code=status_code, content_type=content_type,
+                            headers=json.dumps(headers) if headers else None, body=body,
+                            expires_at=now + self.ttl)
+                )
+                if now - self._last_purge >= self.purge_seconds:
+                    self._last_purge = now
+                    result = await db.execute(delete(self.table).where(self.table.c.expires_at < now))
+                    self.purged += result.rowcount
+                await db.commit()
+        finally:
+            self._finish(key, response)
+
+    async def abandon(self, key: str):
+        """Release the key of a failed original, so a retry runs the request again"""
+        try:
+            async with self.session_factory() as db:
+                await db.execute(
+                    delete(self.table).where(self.table.c.key == key, self.table.c.status_code.is_(None))
+                )
+                await db.commit()
+        finally:
+            self._finish(key, None)
+
+    def _finish(self, key: str, response: Optional[StoredResponse]):
+        """Resolve the future duplicates in this process wait on"""
+        in_flight = self._in_flight.pop(key, None)
+        if in_flight is not None and not in_flight[1].done():
+            in_flight[1].set_result(response)
+
+    def _check_fingerprint(self, stored: bytes, fingerprint: bytes):
+        """Raise if the key was first used for a different request"""
+        if stored != fingerprint:
+            self.mismatched += 1
+            raise IdempotencyError(422, "Idempotency-Key was already used for a different request")
+
+    def _timeout(self, key: str) -> IdempotencyError:
+        """Error for a duplicate whose original is still running after wait_seconds"""
+        self.timed_out += 1
+        logger.warning("⏳ Request with Idempotency-Key %s still in progress", key)
+        return IdempotencyError(409, "A request with this Idempotency-Key is still in progress, retry later")
+
+    def stats(self) -> dict:
+        """Get counters of the keyed requests"""
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined": self.joined,
+            "mismatched": self.mismatched,
+            "timed_out": self.timed_out,
+            "purged": self.purged,
+        }
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware applying an IdempotencyStore to the writes that
+    accept an Idempotency-Key (requests without the header pass through)
+    """
+
+    def __init__(self, app, store: IdempotencyStore, header_name: str = "Idempotency-Key",
+                 max_key_length: int = 255):
+        self.app = app
+        self.store = store
+        self.max_key_length = max_key_length
+        self._header_key = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        key = None
+        if scope["type"] == "http" and is_idempotent_write(scope["method"], scope["path"]):
+            for name, value in scope["headers"]:
+                if name == self._header_key:
+                    key = value.decode("latin-1")
+                    break
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > self.max_key_length:
+            detail = f"Idempotency-Key must be at most {self.max_key_length} characters"
+            await _error(scope, receive, send, 400, detail)
+            return
+
+        # The body is part of the fingerprint: read it, then hand it to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(b"\n".join((scope["method"].encode(), scope["path"].encode(), body))).digest()
+
+        try:
+            stored = await self.store.begin(key, fingerprint)
+        except IdempotencyError as error:
+            await _error(scope, receive, send, error.status_code, error.detail)
+            return
+        if stored is not None:
+            status_code, content_type, stored_headers, stored_body = stored
+            headers = [(b"content-length", str(len(stored_body)).encode()), (b"idempotent-replayed", b"true")]
+            if content_type:
+                headers.append((b"content-type", content_type.encode("latin-1")))
+            headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored_headers)
+            await send({"type": "http.response.start", "status": status_code, "headers": headers})
+            await send({"type": "http.response.body", "body": stored_body})
+            return
+
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = None
+        content_type = None
+        response_headers = []
+        response_body = []
+
+        async def send_capture(message):
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    name = name.lower()
+                    if name == b"content-type":
+                        content_type = value.decode("latin-1")
+                    elif name in REPLAYED_HEADERS:
+                        response_headers.append((name.decode("latin-1"), value.decode("latin-1")))
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_capture)
+        except BaseException:
+            await self.store.abandon(key)
+            raise
+        if status_code is None or not self._is_outcome(scope, status_code):
+            await self.store.abandon(key)
+        else:
+            await self.store.complete(key, (status_code, content_type, response_headers, b"".join(response_body)))
+
+    @staticmethod
+    def _is_outcome(scope, status_code: int) -> bool:
+        """
+        Whether a response is the outcome of the write, to replay on retries:
+        answered by a route (not rejected before routing, e.g. by admission
+        control), and neither a server error nor 429 (both say "retry later")
+        """
+        return scope.get("route") is not None and status_code < 500 and status_code != 429
+
+
+async def _error(scope, receive, send, status_code: int, detail: str):
+    """Answer like an HTTPException ({"detail": ...})"""
+    await JSONResponse({"detail": detail}, status_code=status_code)(scope, receive, send)
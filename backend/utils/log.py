@@ -0,0 +1,146 @@
+"""
+Application logging
+Records are handed to a background thread through a queue, so the event loop
+never blocks on stdout. Messages use lazy %-formatting: a disabled level costs
+one cached level check.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+# Correlation ID of the request being served ("-" outside of requests)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+class _RequestQueueHandler(QueueHandler):
+    """
+    Queue handler that attaches the request ID on the calling thread
+    (context variables are not visible from the listener thread) and leaves
+    message formatting to the listener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        if record.exc_info:
+            # Tracebacks are rendered here while the frames are still alive
+            return super().prepare(record)
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(level: str = "INFO", json_output: bool = False):
+    """
+    Configure the "app" logger hierarchy (idempotent)
+
+    Args:
+        level: Minimum level (DEBUG, INFO, WARNING, ERROR)
+        json_output: Write JSON lines instead of text
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_output:
+        stream_handler.setFormatter(JSONFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger = logging.getLogger("app")
+    logger.setLevel(level.upper())
+    logger.addHandler(_RequestQueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger of the application hierarchy
+
+    Args:
+        name: Module name (usually __name__)
+    """
+    return logging.getLogger(f"app.{name}")
+
+
+# ============================================
+# Correlation IDs
+# ============================================
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware assigning a correlation ID to every request
+    Reuses the incoming request ID header when present and echoes it back
+    """
+
+    def __init__(self, app, header_name: str = "X-Request-ID"):
+        self.app = app
+        self.header_name = header_name
+        self._header_key = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == self._header_key:
+                # Bounded so clients cannot inflate every log line
+                request_id = value.decode("latin-1")[:64]
+                break
+        if not request_id:
+            request_id = os.urandom(8).hex()
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (self._header_key, request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,443 @@
+"""
+Server-side metrics in Prometheus text format
+Per-route latency histograms split into simulated delay, DB and app time
+"""
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from sqlalchemy import event
+
+
+# Latency buckets in seconds (upper bounds, +Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ============================================
+# Metric types
+# ============================================
+# Each worker process aggregates its own values.
+
+def _escape(value) -> str:
+    """Escape a label value (backslash, double quote and newline)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple) -> str:
+    """Render a label set: {a="x",b="y"}"""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1.0):
+        """Add to the value of a label set"""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, labels: tuple, value: float):
+        """Set the value of a label set (collectors mirroring an external counter)"""
+        self._values[labels] = value
+
+    def render(self) -> list[str]:
+        """Sample lines in Prometheus text format"""
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1.0):
+        """Subtract from the value of a label set"""
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, labels: tuple, value: float):
+        """Record one observation"""
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list[str]:
+        """Sample lines in Prometheus text format"""
+        lines = []
+        for labels, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Set of metrics rendered by GET /metrics
+    Collectors are callables run at scrape time to refresh gauges
+    (pool and cache stats), so they cost nothing per request
+    """
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric):
+        """Add a metric and return it"""
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Add a callable run before every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in Prometheus text exposition format"""
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Total request latency by route and status code",
+    ("method", "route", "status"),
+))
+REQUEST_PHASE = registry.register(Histogram(
+    "http_request_phase_seconds",
+    "Request latency split into simulated delay, database and app (framework + serialization) time",
+    ("method", "route", "phase"),
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight",
+    "Requests currently being served",
+))
+DB_POOL_CONNECTIONS = registry.register(Gauge(
+    "db_pool_connections",
+    "Database connections by pool state (checked_in, checked_out, overflow, size)",
+    ("state",),
+))
+CACHE_EVENTS = registry.register(Counter(
+    "cache_events_total",
+    "Read cache counters (hits, misses, evictions, expirations, invalidations)",
+    ("cache", "event"),
+))
+CACHE_SIZE = registry.register(Gauge(
+    "cache_entries",
+    "Entries currently held by each read cache",
+    ("cache",),
+))
+
+CHANGE_FEED_SUBSCRIBERS = registry.register(Gauge(
+    "change_feed_subscribers",
+    "Clients connected to GET /users/changes",
+))
+CHANGE_FEED_EVENTS = registry.register(Counter(
+    "change_feed_events_total",
+    "Change events published",
+))
+
+COALESCED_READS = registry.register(Counter(
+    "coalesced_reads_total",
+    "Identical concurrent reads by role (leader: executed, follower: joined a read in flight)",
+    ("endpoint", "role"),
+))
+COALESCE_SAVED_SECONDS = registry.register(Counter(
+    "coalesce_saved_seconds_total",
+    "Execution time (delay, query, serialization) not repeated thanks to coalescing",
+    ("endpoint",),
+))
+COMPRESSION_BYTES = registry.register(Counter(
+    "compression_bytes_total",
+    "Response bytes before (in) and after (out) compression",
+    ("encoding", "direction"),
+))
+COMPRESSION_SECONDS = registry.register(Counter(
+    "compression_seconds_total",
+    "Time spent compressing responses",
+    ("encoding",),
+))
+COMPRESSION_CACHED = registry.register(Counter(
+    "compression_cached_total",
+    "Responses sent from a cached compressed body (no compression)",
+    ("encoding",),
+))
+GROUP_COMMIT_BATCHES = registry.register(Counter(
+    "group_commit_batches_total",
+    "Transactions committed by the group commit writer",
+    ("queue",),
+))
+GROUP_COMMIT_OPERATIONS = registry.register(Counter(
+    "group_commit_operations_total",
+    "Writes handled by the group commit writer by outcome (committed or failed)",
+    ("queue", "outcome"),
+))
+GROUP_COMMIT_QUEUED = registry.register(Gauge(
+    "group_commit_queued",
+    "Writes waiting for the group commit writer",
+    ("queue",),
+))
+
+ADMISSION_REQUESTS = registry.register(Counter(
+    "admission_requests_total",
+    "Requests by route class and outcome (admitted, admitted_after_wait, or the rejection reason)",
+    ("route_class", "outcome"),
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight",
+    "Admitted requests in progress by route class",
+    ("route_class",),
+))
+ADMISSION_QUEUED = registry.register(Gauge(
+    "admission_queued",
+    "Requests waiting for a slot by route class",
+    ("route_class",),
+))
+ADMISSION_LOOP_LAG = registry.register(Gauge(
+    "admission_loop_lag_seconds",
+    "Event loop lag seen by admission control (new requests are rejected above ADMISSION_MAX_LOOP_LAG)",
+))
+ADMISSION_WAIT_SECONDS = registry.register(Counter(
+    "admission_wait_seconds_total",
+    "Time admitted requests spent waiting for a slot",
+    ("route_class",),
+))
+IDEMPOTENCY_REQUESTS = registry.register(Counter(
+    "idempotency_requests_total",
+    "Writes sent with an Idempotency-Key by outcome (executed, replayed, joined an original in progress, "
+    "mismatched, timed_out)",
+    ("outcome",),
+))
+IDEMPOTENCY_IN_FLIGHT = registry.register(Gauge(
+    "idempotency_in_flight",
+    "Keyed writes in progress in this worker",
+))
+
+
+def add_pool_collector(engine):
+    """Report connection pool usage of an engine at scrape time"""
+    pool = engine.sync_engine.pool
+
+    def collect():
+        for state, method in (("size", "size"), ("checked_in", "checkedin"),
+                              ("checked_out", "checkedout"), ("overflow", "overflow")):
+            # Not every pool class implements all of them (e.g. StaticPool)
+            getter = getattr(pool, method, None)
+            if getter is not None:
+                # QueuePool.overflow() starts at -pool_size; report extra connections only
+                DB_POOL_CONNECTIONS.set((state,), max(0, getter()))
+
+    registry.add_collector(collect)
+
+
+def add_cache_collector(*caches):
+    """Report LRUCache counters at scrape time"""
+    def collect():
+        for cache in caches:
+            stats = cache.stats()
+            CACHE_SIZE.set((cache.name,), stats["size"])
+            for event_name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+                CACHE_EVENTS.set((cache.name, event_name), stats[event_name])
+
+    registry.add_collector(collect)
+
+
+def add_change_feed_collector(feed):
+    """Report ChangeFeed subscribers and published events at scrape time"""
+    def collect():
+        stats = feed.stats()
+        CHANGE_FEED_SUBSCRIBERS.set((), stats["subscribers"])
+        CHANGE_FEED_EVENTS.set((), stats["published"])
+
+    registry.add_collector(collect)
+
+
+def add_coalescing_collector(*flights):
+    """Report SingleFlight counters at scrape time"""
+    def collect():
+        for flight in flights:
+            stats = flight.stats()
+            COALESCED_READS.set((flight.name, "leader"), stats["executions"])
+            COALESCED_READS.set((flight.name, "follower"), stats["coalesced"])
+            COALESCE_SAVED_SECONDS.set((flight.name,), stats["saved_seconds"])
+
+    registry.add_collector(collect)
+
+
+def add_compression_collector(stats):
+    """Report CompressionStats at scrape time"""
+    def collect():
+        for encoding, input_bytes in stats.input_bytes.items():
+            COMPRESSION_BYTES.set((encoding, "in"), input_bytes)
+            COMPRESSION_BYTES.set((encoding, "out"), stats.output_bytes[encoding])
+            COMPRESSION_SECONDS.set((encoding,), round(stats.seconds[encoding], 6))
+            COMPRESSION_CACHED.set((encoding,), stats.cached_hits[encoding])
+
+    registry.add_collector(collect)
+
+
+def add_group_commit_collector(*queues):
+    """Report GroupCommitQueue counters at scrape time"""
+    def collect():
+        for queue in queues:
+            stats = queue.stats()
+            GROUP_COMMIT_BATCHES.set((queue.name,), stats["batches"])
+            GROUP_COMMIT_OPERATIONS.set((queue.name, "committed"), stats["committed"])
+            GROUP_COMMIT_OPERATIONS.set((queue.name, "failed"), stats["failed"])
+            GROUP_COMMIT_QUEUED.set((queue.name,), stats["queued"])
+
+    registry.add_collector(collect)
+
+
+def add_admission_collector(controller):
+    """Report AdmissionController slots, queues and rejections at scrape time"""
+    def collect():
+        stats = controller.stats()
+        ADMISSION_LOOP_LAG.set((), stats["loop_lag_seconds"])
+        for route_class, stats in stats["classes"].items():
+            ADMISSION_IN_FLIGHT.set((route_class,), stats["in_flight"])
+            ADMISSION_QUEUED.set((route_class,), stats["queued"])
+            ADMISSION_WAIT_SECONDS.set((route_class,), stats["wait_seconds"])
+            ADMISSION_REQUESTS.set((route_class, "admitted"), stats["admitted"])
+            ADMISSION_REQUESTS.set((route_class, "admitted_after_wait"), stats["admitted_after_wait"])
+            for reason, count in stats["rejected"].items():
+                ADMISSION_REQUESTS.set((route_class, reason), count)
+
+    registry.add_collector(collect)
+
+
+def add_idempotency_collector(store):
+    """Report IdempotencyStore counters at scrape time"""
+    def collect():
+        stats = store.stats()
+        IDEMPOTENCY_IN_FLIGHT.set((), stats["in_flight"])
+        for outcome in ("executed", "replayed", "joined", "mismatched", "timed_out"):
+            IDEMPOTENCY_REQUESTS.set((outcome,), stats[outcome])
+
+    registry.add_collector(collect)
+
+
+# ============================================
+# Per-request timing
+# ============================================
+
+class RequestTiming:
+    """Time accumulated by the current request outside of the app code"""
+    __slots__ = ("delay", "db")
+
+    def __init__(self):
+        self.delay = 0.0
+        self.db = 0.0
+
+
+_request_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def record_delay(seconds: float):
+    """Add simulated latency to the current request (called by utils.delay)"""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.delay += seconds
+
+
+def instrument_engine(engine):
+    """
+    Measure time spent in database statements for the current request
+
+    Args:
+        engine: Async engine (its sync_engine receives the cursor events)
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_start"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timing = _request_timing.get()
+        started = conn.info.pop("query_start", None)
+        if timing is not None and started is not None:
+            timing.db += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency per route and status code
+    Adds a few microseconds per request (no locks, no allocations beyond
+    the timing object)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _request_timing.set(timing)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec()
+            _request_timing.reset(token)
+
+            # Route template (e.g. /users/{user_id}) keeps label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_DURATION.observe((method, route_path, str(status_code)), elapsed)
+            REQUEST_PHASE.observe((method, route_path, "delay"), timing.delay)
+            REQUEST_PHASE.observe((method, route_path, "db"), timing.db)
+            REQUEST_PHASE.observe((method, route_path, "app"), max(0.0, elapsed - timing.delay - timing.db))
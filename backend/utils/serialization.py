@@ -0,0 +1,64 @@
+"""
+Fast JSON encoding of API responses
+
+Handlers on the hot read paths return pre-encoded bytes in a raw Response
+instead of going through response_model validation and jsonable_encoder.
+orjson (pinned in requirements.txt) does the encoding; in an environment
+installed without it, the standard json module produces the same compact
+UTF-8 output as FastAPI's JSONResponse, only slower.
+Read models (slotted dataclasses such as models.UserRow) are encoded as objects.
+"""
+import dataclasses
+import json
+from typing import Any, Iterable, Sequence
+
+try:
+    import orjson
+except ImportError:  # Not installed: fall back to the standard library
+    orjson = None
+
+# Name of the encoder in use (shown by the benchmarks)
+JSON_ENCODER = "orjson" if orjson is not None else "json"
+
+
+def _encode_dataclass(value: Any) -> dict:
+    """json fallback for dataclass instances (orjson encodes them natively)"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode JSON-compatible content (dicts, lists, str, int, float, bool, None,
+    dataclass instances)
+
+    Args:
+        content: Value to encode
+
+    Returns:
+        Compact UTF-8 JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_encode_dataclass).encode("utf-8")
+
+
+def encode_rows(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """
+    Encode row tuples as a JSON array of objects
+
+    Args:
+        columns: Key of each tuple position
+        rows: Rows as tuples (e.g. SQLAlchemy Row objects)
+
+    Returns:
+        JSON array, one object per row
+    """
+    return dumps([dict(zip(columns, row)) for row in rows])
+
+
+def join_array(items: Iterable[bytes]) -> bytes:
+    """Build a JSON array from already encoded items"""
+    return b"[" + b",".join(items) + b"]"
@@ -0,0 +1,183 @@
+"""
+Runtime state shared by worker processes through a memory-mapped file
+Holds the users table version (ETag / cache coherence) and a small JSON
+document of runtime configuration (latency mode and profile).
+
+Readers only do a struct.unpack_from() on the map on the hot path; the JSON
+document is parsed again only when its sequence number changes. Writers
+serialize with an advisory file lock and publish configuration with a
+seqlock (odd sequence = write in progress).
+
+The file lock needs fcntl (POSIX). Where it is missing (Windows), the
+workers cannot share state and every process keeps its own, in memory.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from config import settings
+from utils.log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+# File layout (little endian)
+MAGIC = b"WSHARED1"
+_MAGIC_OFFSET = 0       # 8 bytes
+_BOOT_ID_OFFSET = 8     # 8 ASCII hex characters
+_VERSION_OFFSET = 16    # uint64 users table version
+_MODIFIED_OFFSET = 24   # double, last write (unix time)
+_SEQUENCE_OFFSET = 32   # uint64 configuration seqlock
+_LENGTH_OFFSET = 40     # uint32 configuration length
+_CONFIG_OFFSET = 48
+CONFIG_MAX_BYTES = 64 * 1024
+FILE_SIZE = _CONFIG_OFFSET + CONFIG_MAX_BYTES
+
+
+class SharedState:
+    """
+    Memory-mapped state file shared by the workers of one deployment
+    Created by the launcher (serve.py); workers attach to it through SHARED_STATE_PATH
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size < FILE_SIZE:
+                os.ftruncate(self._fd, FILE_SIZE)
+            self._map = mmap.mmap(self._fd, FILE_SIZE)
+            if self._map[_MAGIC_OFFSET:_MAGIC_OFFSET + 8] != MAGIC:
+                self._initialize()
+        self.boot_id = self._map[_BOOT_ID_OFFSET:_BOOT_ID_OFFSET + 8].decode("ascii")
+
+        # Last configuration read by this process
+        self._config_sequence = -1
+        self._config: dict = {}
+
+    @classmethod
+    def create(cls, path: str) -> "SharedState":
+        """Create a fresh state file (new boot ID, version 0, empty configuration)"""
+        if os.path.exists(path):
+            os.remove(path)
+        return cls(path)
+
+    def _initialize(self):
+        """Write the header of a new file (called with the lock held)"""
+        self._map[_BOOT_ID_OFFSET:_BOOT_ID_OFFSET + 8] = uuid.uuid4().hex[:8].encode("ascii")
+        struct.pack_into("<QdQI", self._map, _VERSION_OFFSET, 0, time.time(), 0, 0)
+        self._map[_MAGIC_OFFSET:_MAGIC_OFFSET + 8] = MAGIC
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across processes (writers only)"""
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self):
+        """Unmap and close the file"""
+        self._map.close()
+        os.close(self._fd)
+
+    # ============================================
+    # Table version
+    # ============================================
+
+    def table_version(self) -> int:
+        """Current users table version"""
+        return struct.unpack_from("<Q", self._map, _VERSION_OFFSET)[0]
+
+    def last_modified(self) -> float:
+        """Time of the last committed write"""
+        return struct.unpack_from("<d", self._map, _MODIFIED_OFFSET)[0]
+
+    def bump_table_version(self) -> int:
+        """Register a committed write and return the new version"""
+        with self._locked():
+            version = self.table_version() + 1
+            struct.pack_into("<Qd", self._map, _VERSION_OFFSET, version, time.time())
+        return version
+
+    # ============================================
+    # Runtime configuration
+    # ============================================
+
+    def config_sequence(self) -> int:
+        """Sequence number of the configuration (changes on every update)"""
+        return struct.unpack_from("<Q", self._map, _SEQUENCE_OFFSET)[0]
+
+    def read_config(self) -> dict:
+        """
+        Get the configuration document
+        Parsed again only when another process has published a new one
+        """
+        sequence = self.config_sequence()
+        if sequence == self._config_sequence:
+            return self._config
+
+        while True:
+            sequence = self.config_sequence()
+            if sequence % 2:
+                # A writer is publishing; retry
+                time.sleep(0)
+                continue
+            length = struct.unpack_from("<I", self._map, _LENGTH_OFFSET)[0]
+            raw = self._map[_CONFIG_OFFSET:_CONFIG_OFFSET + length]
+            if self.config_sequence() == sequence:
+                break
+
+        self._config = json.loads(raw) if raw else {}
+        self._config_sequence = sequence
+        return self._config
+
+    def update_config(self, key: str, value) -> None:
+        """
+        Set one key of the configuration document for every worker
+
+        Raises:
+            ValueError: If the document exceeds CONFIG_MAX_BYTES
+        """
+        with self._locked():
+            config = dict(self.read_config())
+            config[key] = value
+            raw = json.dumps(config, separators=(",", ":")).encode()
+            if len(raw) > CONFIG_MAX_BYTES:
+                raise ValueError(f"Shared configuration exceeds {CONFIG_MAX_BYTES} bytes")
+
+            sequence = self.config_sequence()
+            struct.pack_into("<Q", self._map, _SEQUENCE_OFFSET, sequence + 1)
+            struct.pack_into("<I", self._map, _LENGTH_OFFSET, len(raw))
+            self._map[_CONFIG_OFFSET:_CONFIG_OFFSET + len(raw)] = raw
+            struct.pack_into("<Q", self._map, _SEQUENCE_OFFSET, sequence + 2)
+
+
+def is_supported() -> bool:
+    """True if this platform can lock the state file (fcntl)"""
+    return fcntl is not None
+
+
+def _attach() -> Optional[SharedState]:
+    """Attach to the deployment's state file, if any and if the platform supports it"""
+    if not settings.SHARED_STATE_PATH:
+        return None
+    if not is_supported():
+        logger.warning("⚠️  Shared state needs fcntl, not available on this platform: state stays per process")
+        return None
+    return SharedState(settings.SHARED_STATE_PATH)
+
+
+# State of the current deployment (None: single process, state stays in memory)
+shared_state: Optional[SharedState] = _attach()
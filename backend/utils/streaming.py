@@ -0,0 +1,213 @@
+"""
+Utilities to stream users as NDJSON or CSV
+Used by GET /users/export and POST /users/import
+"""
+import codecs
+import csv
+import io
+import json
+import re
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence
+
+# A parsed row of an upload: (line number, row data, parse error)
+ParsedRow = tuple[int, Optional[dict], Optional[str]]
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+async def ndjson_stream(batches: AsyncIterator[Iterable[Sequence[Any]]], fields: list[str]) -> AsyncIterator[str]:
+    """
+    Encode batches of row tuples as NDJSON (one JSON object per line)
+
+    The last line is a trailer with the number of rows: {"_count": N}
+    """
+    count = 0
+    async for batch in batches:
+        lines = [json.dumps(dict(zip(fields, row)), ensure_ascii=False) for row in batch]
+        count += len(lines)
+        if lines:
+            yield "\n".join(lines) + "\n"
+    yield json.dumps({"_count": count}) + "\n"
+
+
+async def csv_stream(batches: AsyncIterator[Iterable[Sequence[Any]]], fields: list[str]) -> AsyncIterator[str]:
+    """
+    Encode batches of row tuples (in the order of fields) as CSV with a header line
+
+    The last line is a trailer with the number of rows: #count,N
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    # Send the header right away, before the first batch is fetched
+    yield buffer.getvalue()
+
+    count = 0
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            writer.writerow(row)
+            count += 1
+        yield buffer.getvalue()
+    yield f"#count,{count}\n"
+
+
+# ============================================
+# Import parsers
+# ============================================
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_length: int) -> AsyncIterator[tuple[int, Optional[str]]]:
+    """
+    Split a stream of bytes into numbered text lines
+
+    Only the current incomplete line is kept in memory, and each chunk is
+    searched once. Lines longer than max_length characters are not kept:
+    they come out as None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    parts: list[str] = []
+    size = 0
+    too_long = False
+    line_number = 0
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        start = 0
+        while (end := text.find("\n", start)) >= 0:
+            line_number += 1
+            if too_long or size + end - start > max_length:
+                yield line_number, None
+            else:
+                parts.append(text[start:end])
+                yield line_number, "".join(parts).rstrip("\r")
+            parts, size, too_long = [], 0, False
+            start = end + 1
+        if not too_long and start < len(text):
+            size += len(text) - start
+            if size > max_length:
+                parts, too_long = [], True
+            else:
+                parts.append(text[start:])
+    rest = decoder.decode(b"", final=True)
+    if too_long or size + len(rest) > max_length:
+        yield line_number + 1, None
+    elif parts or rest:
+        parts.append(rest)
+        yield line_number + 1, "".join(parts).rstrip("\r")
+
+
+def _is_ndjson_trailer(data: dict) -> bool:
+    """The export trailer: {"_count": N} and nothing else"""
+    return data.keys() == {"_count"} and type(data["_count"]) is int
+
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[ParsedRow]:
+    """
+    Parse an NDJSON upload incrementally
+
+    Blank lines are skipped, and so is the export trailer ({"_count": N}) on
+    the last line. Every other line is a row: unusable ones come with an error.
+    """
+    trailer: Optional[ParsedRow] = None
+    async for line_number, line in _iter_lines(chunks, max_line_length):
+        if line is not None and not line.strip():
+            continue
+        if trailer is not None:
+            yield trailer  # Not the last line: a row like any other
+            trailer = None
+        if line is None:
+            yield line_number, None, f"Line longer than {max_line_length} characters"
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, None, f"Invalid JSON: {exc.msg}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Each line must be a JSON object"
+        elif _is_ndjson_trailer(data):
+            trailer = (line_number, data, None)
+        else:
+            yield line_number, data, None
+
+
+# Export trailer of a CSV file
+_CSV_TRAILER = re.compile(r"#count,\d+")
+
+
+async def _csv_records(chunks: AsyncIterator[bytes], max_length: int) -> AsyncIterator[tuple[int, Optional[str]]]:
+    """
+    Group the lines of a CSV upload into records (quoted values may contain
+    line breaks), numbered by their first line
+
+    Records longer than max_length characters come out as None; a line too
+    long to keep ends its record.
+    """
+    parts: list[str] = []
+    size = 0
+    quotes = 0
+    too_long = False
+    first_line = 0
+    async for line_number, line in _iter_lines(chunks, max_length):
+        if not parts and not too_long:
+            first_line = line_number
+        if line is not None:
+            quotes += line.count('"')
+            size += len(line) + 1
+            if too_long or size > max_length:
+                parts, too_long = [], True
+            else:
+                parts.append(line)
+        if line is None or quotes % 2 == 0:
+            yield first_line, None if too_long or line is None else "\n".join(parts)
+            parts, size, quotes, too_long = [], 0, 0, False
+    if parts or too_long:
+        # Unterminated quoted value at the end of the upload
+        yield first_line, None if too_long else "\n".join(parts)
+
+
+async def parse_csv(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[ParsedRow]:
+    """
+    Parse a CSV upload incrementally (first record is the header)
+
+    Quoted values may contain line breaks. Blank lines are skipped, and so is
+    the export trailer (#count,N) on the last line. Every other record is a
+    row: unusable ones come with an error.
+    """
+    header: Optional[list[str]] = None
+    trailer: Optional[tuple[int, str]] = None
+    async for line_number, record in _csv_records(chunks, max_line_length):
+        if record is not None and not record.strip():
+            continue
+        if trailer is not None:
+            # Not the last line: a row like any other
+            yield _csv_row(header, *trailer)
+            trailer = None
+        if record is None:
+            yield line_number, None, f"Record longer than {max_line_length} characters"
+        elif header is None:
+            try:
+                header = [name.strip() for name in next(csv.reader([record]))]
+            except csv.Error as exc:
+                yield line_number, None, f"Invalid CSV header: {exc}"
+        elif _CSV_TRAILER.fullmatch(record):
+            trailer = (line_number, record)
+        else:
+            yield _csv_row(header, line_number, record)
+
+
+def _csv_row(header: list[str], line_number: int, record: str) -> ParsedRow:
+    """Map one CSV record onto the header"""
+    if record.count('"') % 2:
+        return line_number, None, "Unterminated quoted value"
+    try:
+        values = next(csv.reader([record]))
+    except csv.Error as exc:
+        return line_number, None, f"Invalid CSV: {exc}"
+    if len(values) != len(header):
+        return line_number, None, f"Expected {len(header)} values, got {len(values)}"
+    return line_number, dict(zip(header, values)), None